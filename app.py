@@ -1,17 +1,82 @@
 # app.py
-from flask import Flask, request, jsonify, render_template
-import os, joblib, pandas as pd
+from flask import Flask, Response, g, request, jsonify, render_template, send_file, url_for
+import os
+import sqlite3
+import threading
+import time
+from src.prediction_cache import PredictionCache
+from src.payload import safe_float, build_raw_from_payload, validate_payload
+from src import metrics
+from src.warmup import init_loader
+from src.artifact_store import ArtifactStore, ArtifactStoreConfig
+from src.job_store import JobStore, JobStoreConfig
+from src.exception import ErrorCode
+from src.logger import get_logger
+
+logger = get_logger(__name__)
 
 app = Flask(__name__)
 
 # ====== Paths (adjust if your structure differs) ======
 BASE = os.path.abspath(".")
+ARTIFACTS_DIR = os.path.join(BASE, "artifacts")
 MODEL_PATH = os.path.join(BASE, "artifacts", "models", "random_forest.joblib")
 PREPROCESSOR_PATH = os.path.join(BASE, "artifacts", "transformer", "preprocessor.joblib")
+COMPILED_MODEL_DIR = os.path.join(BASE, "artifacts", "models", "random_forest_compiled")
+
+# MODEL_BACKEND=compiled serves from the flat-array forest store, which is
+# memory-mapped read-only: with `gunicorn --preload` all workers share the
+# same physical pages instead of each holding a private copy of the forest.
+# MODEL_BACKEND=compact serves the smaller forest written by train_pipeline --compact.
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "sklearn")
+MMAP_MODE = os.environ.get("ARTIFACT_MMAP_MODE", "r") or None
+GRID_MODE = os.environ.get("PREDICTION_GRID_MODE") or None  # "exact" / "interpolate"; needs train_pipeline --grid
 
 # ====== Load artifacts ======
-model = joblib.load(MODEL_PATH)
-preprocessor = joblib.load(PREPROCESSOR_PATH)
+# Same inference core as batch scoring: PredictPipeline owns the preprocessor,
+# the model backend and the precomputed column order/dtypes.
+# pandas/sklearn and the artifacts are loaded by the warm-up (WARMUP_MODE, see
+# src/warmup.py), not at import; /readyz reports when they are in place.
+# When training publishes a new artifact version (src/artifact_store.py) it is
+# loaded in the background and swapped in without a restart (CURRENT is polled
+# every ARTIFACT_WATCH_SECONDS, default 10; 0 turns the watcher off).
+def load_pipeline(artifacts_dir):
+    from src.predict_pipeline import PredictPipeline
+    return PredictPipeline(artifacts_dir=artifacts_dir, backend=MODEL_BACKEND, mmap_mode=MMAP_MODE,
+                           grid_mode=GRID_MODE)
+
+loader = init_loader(load_pipeline, warmup_payload={}, store=ArtifactStore(ArtifactStoreConfig(root=ARTIFACTS_DIR)))
+
+# ====== Prediction cache ======
+# Keyed on the normalized raw row; PREDICTION_CACHE_SIZE=0 disables it.
+# Entries are dropped when the model or preprocessor file changes on disk.
+prediction_cache = PredictionCache(
+    maxsize=int(os.environ.get("PREDICTION_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("PREDICTION_CACHE_TTL", 300)),
+    watch_paths=(MODEL_PATH, PREPROCESSOR_PATH, os.path.join(COMPILED_MODEL_DIR, "meta.json")),
+)
+loader.on_swap(prediction_cache.invalidate)
+
+# ====== Bulk scoring jobs ======
+# Large files go to POST /jobs instead of /predict: the upload is stored and
+# queued, and `python -m src.job_worker` (the Procfile's worker process) scores
+# it in the background. The web worker is free again as soon as the upload is
+# on disk; clients poll GET /jobs/<id> and download GET /jobs/<id>/result.
+# Like the pipeline, the store (and its SQLite file) is opened on first use, not at import.
+JOBS_DIR = os.environ.get("JOBS_DIR", os.path.join(ARTIFACTS_DIR, "jobs"))
+_job_store = None
+_job_store_lock = threading.Lock()
+
+def get_job_store():
+    global _job_store
+    if _job_store is None:
+        with _job_store_lock:
+            if _job_store is None:
+                _job_store = JobStore(JobStoreConfig(jobs_dir=JOBS_DIR))
+    return _job_store
+
+JOB_CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "jsonl", "application/jsonl": "jsonl",
+                     "application/json-lines": "jsonl"}
 
 # ====== Language mapping (code -> full name) ======
 LANGUAGE_FULL = {
@@ -30,42 +95,86 @@ GENRES = [
 ]
 
 # ====== Helpers ======
-def safe_float(x):
-    try: return float(x)
-    except: return 0.0
-
-def safe_int(x):
-    try: return int(x)
-    except: return 0
-
-def build_raw_from_payload(payload):
-    """Construct the raw row expected by preprocessor from partial payload dict."""
-    raw = {
-        "id": 0,
-        "title": payload.get("title", ""),
-        "vote_average": safe_float(payload.get("vote_average", 0)),
-        "vote_count": safe_int(payload.get("vote_count", 0)),
-        "status": "Released",
-        "release_date": "",
-        "runtime": safe_float(payload.get("runtime", 0)),
-        "budget": safe_float(payload.get("budget", 0)),
-        "original_language": payload.get("original_language", ""),
-        "original_title": payload.get("title", ""),
-        "overview": "",
-        "genres": payload.get("genres", ""),
-        "production_companies": "",
-        "production_countries": ""
-    }
-    # compose release_date if parts provided
-    y = payload.get("release_year", "")
-    m = payload.get("release_month", "")
-    d = payload.get("release_day", "")
-    if y and m and d:
+# Each request takes the pipeline from loader.get() once and passes it down, so
+# a version swap mid-request cannot mix columns of one version with another's
+# model. Cache keys carry the version's artifacts dir for the same reason.
+def predict_rows(rows, pipeline):
+    """Transform + predict a list of row tuples (expected_columns order) in one call."""
+    return [float(p) for p in pipeline.predict_rows(rows)]
+
+def predict_one(payload, pipeline):
+    with metrics.timer("predict_stage_seconds", stage="build_raw"):
+        raw = build_raw_from_payload(payload)
+    row = PredictionCache.make_key(raw, pipeline.expected_columns)
+    key = (pipeline.artifacts_dir, row)
+    pred = prediction_cache.get(key)
+    if pred is None:
+        pred = predict_rows([row], pipeline)[0]
+        prediction_cache.set(key, pred)
+    return pred
+
+def predict_batch(items, pipeline):
+    """
+    Score a list of payloads with a single transform + predict call.
+    Returns (predictions, errors): predictions keeps input order with None for
+    rejected items, errors lists {"index", "errors"} for each rejected item.
+    Cached rows are answered from the prediction cache and skipped in the batch.
+    """
+    expected_columns = pipeline.expected_columns
+    predictions = [None] * len(items)
+    errors = []
+    miss_idx, rows = [], []
+    for i, item in enumerate(items):
+        problems = validate_payload(item)
+        if problems:
+            errors.append({"index": i, "errors": problems})
+            continue
+        with metrics.timer("predict_stage_seconds", stage="build_raw"):
+            row = PredictionCache.make_key(build_raw_from_payload(item), expected_columns)
+        cached = prediction_cache.get((pipeline.artifacts_dir, row))
+        if cached is not None:
+            predictions[i] = cached
+            continue
+        miss_idx.append(i)
+        rows.append(row)
+
+    if rows:
         try:
-            raw["release_date"] = f"{int(y):04d}-{int(m):02d}-{int(d):02d}"
-        except:
-            raw["release_date"] = ""
-    return raw
+            preds = predict_rows(rows, pipeline)
+        except Exception:
+            # one row the model cannot take fails the vectorized call; score each
+            # row on its own so only that item gets an error
+            logger.warning(f"Batch of {len(rows)} rows failed; scoring rows one by one")
+            preds = []
+            for i, row in zip(miss_idx, rows):
+                try:
+                    preds.append(predict_rows([row], pipeline)[0])
+                except Exception as e:
+                    preds.append(None)
+                    errors.append({"index": i, "errors": [str(e).splitlines()[0]]})
+            errors.sort(key=lambda err: err["index"])
+        for i, row, pred in zip(miss_idx, rows, preds):
+            if pred is None:
+                continue
+            predictions[i] = pred
+            prediction_cache.set((pipeline.artifacts_dir, row), pred)
+    return predictions, errors
+
+# ====== Request metrics ======
+# METRICS_ENABLED=0 skips all of this (and every timer in the inference path)
+@app.before_request
+def _start_timer():
+    if metrics.enabled():
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe("http_request_seconds", time.perf_counter() - start, route=route)
+        metrics.inc("http_requests_total", route=route, status=response.status_code)
+    return response
 
 # ====== Routes ======
 @app.route("/", methods=["GET"])
@@ -83,6 +192,53 @@ def home():
         LANGUAGE_FULL=LANGUAGE_FULL
     )
 
+
+def _request_payload():
+    """JSON body, an 'input_json' form field, or the plain form fields, in that order of preference."""
+    # 1) Prefer proper JSON (AJAX)
+    payload = None
+    if request.is_json:
+        # get_json(silent=True) returns None instead of raising if body isn't valid JSON
+        payload = request.get_json(silent=True)
+
+    # 2) If no JSON, look for an 'input_json' field in form (some forms use this)
+    if payload is None:
+        raw_input_json = request.form.get("input_json")
+        if raw_input_json:
+            try:
+                import json
+                payload = json.loads(raw_input_json)
+            except Exception:
+                # ignore parse error and fallback to form fields
+                payload = None
+
+    # 3) Fall back to regular form fields (common when browser does a normal POST)
+    if payload is None:
+        # Collect expected keys from form
+        form = request.form
+        # If the form is empty, also check request.data as a last resort
+        if not form or len(form) == 0:
+            # try to parse body as JSON silently (some clients set wrong header)
+            payload = request.get_json(silent=True)
+            if payload is None:
+                # last resort: parse urlencoded body manually
+                # but usually form will have data
+                payload = {}
+        else:
+            payload = {
+                "title": form.get("title", ""),
+                "budget": form.get("budget", ""),
+                "runtime": form.get("runtime", ""),
+                "vote_average": form.get("vote_average", ""),
+                "vote_count": form.get("vote_count", ""),
+                "original_language": form.get("original_language", ""),
+                "genres": form.get("genres", ""),
+                "release_year": form.get("release_year", ""),
+                "release_month": form.get("release_month", ""),
+                "release_day": form.get("release_day", "")
+            }
+    return payload
+
 @app.route("/predict", methods=["POST"])
 def predict():
     """
@@ -96,68 +252,18 @@ def predict():
     """
     try:
         is_json_req = request.is_json
-
-        # 1) Prefer proper JSON (AJAX)
-        payload = None
-        if request.is_json:
-            # get_json(silent=True) returns None instead of raising if body isn't valid JSON
-            payload = request.get_json(silent=True)
-
-        # 2) If no JSON, look for an 'input_json' field in form (some forms use this)
-        if payload is None:
-            raw_input_json = request.form.get("input_json")
-            if raw_input_json:
-                try:
-                    import json
-                    payload = json.loads(raw_input_json)
-                except Exception:
-                    # ignore parse error and fallback to form fields
-                    payload = None
-
-        # 3) Fall back to regular form fields (common when browser does a normal POST)
-        if payload is None:
-            # Collect expected keys from form
-            form = request.form
-            # If the form is empty, also check request.data as a last resort
-            if not form or len(form) == 0:
-                # try to parse body as JSON silently (some clients set wrong header)
-                payload = request.get_json(silent=True)
-                if payload is None:
-                    # last resort: parse urlencoded body manually
-                    # but usually form will have data
-                    payload = {}
-            else:
-                payload = {
-                    "title": form.get("title", ""),
-                    "budget": form.get("budget", ""),
-                    "runtime": form.get("runtime", ""),
-                    "vote_average": form.get("vote_average", ""),
-                    "vote_count": form.get("vote_count", ""),
-                    "original_language": form.get("original_language", ""),
-                    "genres": form.get("genres", ""),
-                    "release_year": form.get("release_year", ""),
-                    "release_month": form.get("release_month", ""),
-                    "release_day": form.get("release_day", "")
-                }
+        with metrics.timer("predict_stage_seconds", stage="parse"):
+            payload = _request_payload()
 
         # Now payload should be a dict or list
         if isinstance(payload, list):
-            results = []
-            for item in payload:
-                raw = build_raw_from_payload(item)
-                # ensure DataFrame columns match preprocessor
-                expected = list(preprocessor.feature_names_in_)
-                ordered = {c: raw.get(c, "") for c in expected}
-                df = pd.DataFrame([ordered], columns=expected)
-                X = preprocessor.transform(df)
-                pred = float(model.predict(X)[0])
-                results.append(pred)
+            results, errors = predict_batch(payload, loader.get())
             if is_json_req:
-                return jsonify({"predictions": results})
-            # form submit: show first
-            first = results[0] if results else None
+                return jsonify({"predictions": results, "errors": errors})
+            # form submit: show first successful prediction
+            first = next((r for r in results if r is not None), None)
             return render_template("index.html",
-                                   result=f"${first:,.2f}",
+                                   result=(f"${first:,.2f}" if first is not None else None),
                                    revenue_millions=(round(first/1e6,2) if first else None),
                                    roi=None,
                                    category=None,
@@ -168,12 +274,15 @@ def predict():
                                    LANGUAGE_FULL=LANGUAGE_FULL)
 
         if isinstance(payload, dict):
-            raw = build_raw_from_payload(payload)
-            expected = list(preprocessor.feature_names_in_)
-            ordered = {c: raw.get(c, "") for c in expected}
-            df = pd.DataFrame([ordered], columns=expected)
-            X = preprocessor.transform(df)
-            pred = float(model.predict(X)[0])
+            # same check as batch items and asgi_app: a bad field is a 400, not a failed transform
+            problems = validate_payload(payload)
+            if problems:
+                metrics.inc("errors_total", route="/predict", error=ErrorCode.VALIDATION)
+                if is_json_req:
+                    return jsonify({"error": "; ".join(problems), "code": ErrorCode.VALIDATION}), 400
+                return render_template("index.html", error="; ".join(problems), genres=GENRES, languages=LANGUAGES,
+                                       LANGUAGE_FULL=LANGUAGE_FULL), 400
+            pred = predict_one(payload, loader.get())
 
             if is_json_req:
                 return jsonify({"prediction": pred})
@@ -211,11 +320,109 @@ def predict():
         return render_template("index.html", error="Invalid payload type"), 400
 
     except Exception as e:
-        # Log traceback to console (helpful in dev)
-        import traceback; traceback.print_exc()
+        logger.exception("Prediction request failed")
+        code = ErrorCode.of(e)
+        metrics.inc("errors_total", route="/predict", error=code)
         if request.is_json:
-            return jsonify({"error": str(e)}), 500
-        return render_template("index.html", error=str(e), genres=GENRES, languages=LANGUAGES, LANGUAGE_FULL=LANGUAGE_FULL), 500
+            return jsonify({"error": str(e), "code": code}), ErrorCode.http_status(code)
+        return render_template("index.html", error=str(e), genres=GENRES, languages=LANGUAGES,
+                               LANGUAGE_FULL=LANGUAGE_FULL), ErrorCode.http_status(code)
+
+
+def _job_status(job):
+    status = {k: job[k] for k in ("id", "status", "format", "rows_done", "rows_total", "bytes_done", "bytes_total",
+                                  "artifact_version", "error", "created_at", "started_at", "finished_at")}
+    # progress is by bytes of the upload: the row count is only known once the file is read
+    status["progress"] = round(job["bytes_done"] / job["bytes_total"], 4) if job["bytes_total"] else 0.0
+    if job["report"] is not None:
+        status["report"] = job["report"]
+    if job["status"] == "done":
+        status["result_url"] = url_for("job_result", job_id=job["id"])
+    return status
+
+
+def _stream_to(stream, path, block_size=1 << 20):
+    with open(path, "wb") as f:
+        for block in iter(lambda: stream.read(block_size), b""):
+            f.write(block)
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """
+    Queue a bulk scoring job. The file is a multipart field named "file" (format
+    from its .csv / .jsonl extension) or the raw request body (format from the
+    Content-Type: text/csv or application/x-ndjson). Returns 202 with the job id.
+    """
+    try:
+        upload = request.files.get("file")
+        if upload is not None:
+            fmt = os.path.splitext(upload.filename or "")[1].lstrip(".").lower()
+            fmt = {"ndjson": "jsonl"}.get(fmt, fmt) or JOB_CONTENT_TYPES.get(upload.mimetype)
+            write_input = upload.save
+        else:
+            fmt = JOB_CONTENT_TYPES.get(request.mimetype)
+            write_input = lambda path: _stream_to(request.stream, path)  # noqa: E731
+        job_id = get_job_store().create(fmt, write_input)
+        status_url = url_for("job_status", job_id=job_id)
+        return jsonify({"job_id": job_id, "status": "queued", "status_url": status_url}), 202, {"Location": status_url}
+    except Exception as e:
+        logger.exception("Job submission failed")
+        code = ErrorCode.of(e)
+        metrics.inc("errors_total", route="/jobs", error=code)
+        return jsonify({"error": str(e).splitlines()[0], "code": code}), ErrorCode.http_status(code)
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(_job_status(job))
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = get_job_store().get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    if job["status"] != "done":
+        return jsonify({**_job_status(job), "error": job["error"] or f"Job {job_id} is {job['status']}"}), 409
+    return send_file(job["output_path"], mimetype="text/csv", as_attachment=True,
+                     download_name=f"predictions-{job_id}.csv")
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(prediction_cache.stats())
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up and serving requests, whether or not the model is loaded yet."""
+    return jsonify({"status": "ok"})
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: 200 once the pipeline is loaded and warmed up, 503 while loading or after a failed load."""
+    status = loader.status()
+    return jsonify(status), (200 if loader.ready else 503)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    cache = prediction_cache.stats()
+    gauges = {f"prediction_cache_{k}": v for k, v in cache.items() if isinstance(v, (int, float))}
+    gauges["pipeline_ready"] = int(loader.ready)
+    # a scrape must not create the jobs database: report counts only once it exists
+    if _job_store is not None or os.path.exists(os.path.join(JOBS_DIR, "jobs.sqlite3")):
+        try:
+            for status, n in get_job_store().counts().items():
+                gauges[f"jobs_{status}"] = n
+        except sqlite3.Error:
+            logger.warning("Job counts unavailable for /metrics", exc_info=True)
+    return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
 
 
 # ====== Run ======
@@ -0,0 +1,172 @@
+# asgi_app.py
+"""
+Async serving mode: an alternative entry point to app.py for high-concurrency
+JSON traffic. Concurrent /predict requests are queued and coalesced into
+micro-batches (src/micro_batcher.py), so one vectorized transform + predict
+serves many callers instead of one sync worker handling one movie at a time.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port $PORT
+
+Env:
+    MICRO_BATCH_MAX_SIZE  (default 64)  rows per batch
+    MICRO_BATCH_WAIT_MS   (default 5)   max time the first row waits for company
+    MODEL_BACKEND / ARTIFACT_MMAP_MODE / WARMUP_MODE / PREDICTION_GRID_MODE /
+    ARTIFACT_WATCH_SECONDS  same as app.py
+"""
+import asyncio
+import json
+import os
+import time
+from src.micro_batcher import MicroBatcher
+from src.payload import build_raw_from_payload, validate_payload
+from src import metrics
+from src.warmup import init_loader
+from src.artifact_store import ArtifactStore, ArtifactStoreConfig
+from src.exception import ErrorCode
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+BASE = os.path.abspath(".")
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "sklearn")
+MMAP_MODE = os.environ.get("ARTIFACT_MMAP_MODE", "r") or None
+GRID_MODE = os.environ.get("PREDICTION_GRID_MODE") or None
+
+
+def load_pipeline(artifacts_dir):
+    from src.predict_pipeline import PredictPipeline
+    return PredictPipeline(artifacts_dir=artifacts_dir, backend=MODEL_BACKEND, mmap_mode=MMAP_MODE,
+                           grid_mode=GRID_MODE)
+
+
+# loaded by the warm-up (WARMUP_MODE, src/warmup.py) rather than at import;
+# published artifact versions are swapped in without a restart
+loader = init_loader(load_pipeline, warmup_payload={},
+                     store=ArtifactStore(ArtifactStoreConfig(root=os.path.join(BASE, "artifacts"))))
+
+
+def predict_rows(items):
+    """items are (pipeline, row) pairs; a batch straddling a version swap is scored per version."""
+    groups = {}
+    for i, (pipeline, _) in enumerate(items):
+        groups.setdefault(id(pipeline), (pipeline, []))[1].append(i)
+    results = [None] * len(items)
+    for pipeline, idx in groups.values():
+        for i, pred in zip(idx, pipeline.predict_rows([items[i][1] for i in idx])):
+            results[i] = float(pred)
+    return results
+
+
+batcher = MicroBatcher(
+    predict_rows,
+    max_batch_size=int(os.environ.get("MICRO_BATCH_MAX_SIZE", 64)),
+    max_wait_ms=float(os.environ.get("MICRO_BATCH_WAIT_MS", 5)),
+)
+
+
+def to_row(payload, pipeline):
+    with metrics.timer("predict_stage_seconds", stage="build_raw"):
+        raw = build_raw_from_payload(payload)
+    return pipeline, tuple(raw.get(c, "") for c in pipeline.expected_columns)
+
+
+async def read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, status, obj):
+    await send_bytes(send, status, json.dumps(obj).encode(), b"application/json")
+
+
+async def send_bytes(send, status, body, content_type):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def handle_predict(payload):
+    if not loader.ready:
+        # wait for the warm-up off the event loop so /healthz and /readyz keep answering
+        await asyncio.to_thread(loader.get)
+    pipeline = loader.get()
+    if isinstance(payload, dict):
+        # checked before submit(): a bad row never reaches a batch shared with other callers
+        problems = validate_payload(payload)
+        if problems:
+            return 400, {"error": "; ".join(problems), "code": ErrorCode.VALIDATION}
+        return 200, {"prediction": await batcher.submit(to_row(payload, pipeline))}
+    if isinstance(payload, list):
+        predictions = [None] * len(payload)
+        errors, waits = [], []
+        for i, item in enumerate(payload):
+            problems = validate_payload(item)
+            if problems:
+                errors.append({"index": i, "errors": problems})
+            else:
+                waits.append((i, batcher.submit(to_row(item, pipeline))))
+        results = await asyncio.gather(*(w for _, w in waits), return_exceptions=True)
+        for (i, _), pred in zip(waits, results):
+            if isinstance(pred, Exception):
+                errors.append({"index": i, "errors": [str(pred).splitlines()[0]]})
+            else:
+                predictions[i] = pred
+        errors.sort(key=lambda err: err["index"])
+        return 200, {"predictions": predictions, "errors": errors}
+    return 400, {"error": "Invalid payload type; must be JSON object or list"}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await batcher.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await batcher.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    path, method = scope["path"], scope["method"]
+    if path == "/predict" and method == "POST":
+        start = time.perf_counter()
+        status, body = await predict_route(receive)
+        if metrics.enabled():
+            metrics.observe("http_request_seconds", time.perf_counter() - start, route=path)
+            metrics.inc("http_requests_total", route=path, status=status)
+        return await send_json(send, status, body)
+    if path == "/batcher/stats" and method == "GET":
+        return await send_json(send, 200, batcher.stats())
+    if path == "/healthz" and method == "GET":
+        return await send_json(send, 200, {"status": "ok"})
+    if path == "/readyz" and method == "GET":
+        return await send_json(send, 200 if loader.ready else 503, loader.status())
+    if path == "/metrics" and method == "GET":
+        gauges = {f"batcher_{k}": v for k, v in batcher.stats().items()}
+        gauges["pipeline_ready"] = int(loader.ready)
+        return await send_bytes(send, 200, metrics.render(gauges).encode(), b"text/plain; version=0.0.4")
+    return await send_json(send, 404, {"error": "Not found"})
+
+
+async def predict_route(receive):
+    body = await read_body(receive)
+    try:
+        with metrics.timer("predict_stage_seconds", stage="parse"):
+            payload = json.loads(body or b"null")
+    except ValueError:
+        return 400, {"error": "Request body must be JSON"}
+    try:
+        return await handle_predict(payload)
+    except Exception as e:
+        logger.exception("Prediction request failed")
+        code = ErrorCode.of(e)
+        metrics.inc("errors_total", route="/predict", error=code)
+        return ErrorCode.http_status(code), {"error": str(e), "code": code}
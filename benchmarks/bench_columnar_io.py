@@ -0,0 +1,58 @@
+# benchmarks/bench_columnar_io.py
+"""
+Intermediate train/test split format: CSV vs Parquet vs Feather.
+Runs DataIngestion (raw CSV -> split files) and the DataTransformation read
+(split files -> typed frames) on a scaled copy of the dataset and reports
+write/read time, disk footprint and whether the frames come back with the schema dtypes.
+
+    python benchmarks/bench_columnar_io.py --rows 10000 --scale 10
+"""
+import argparse
+import json
+import os
+import tempfile
+from common import make_movies, Timer
+from src.data_ingestion import DataIngestion, DataIngestionConfig
+from src.schema import MOVIE_SCHEMA
+from src.utils import read_table
+
+FORMATS = ("csv", "parquet", "feather")
+
+
+def run(rows, scale):
+    n_rows = rows * scale
+    results = {"rows": n_rows}
+    with tempfile.TemporaryDirectory() as workdir:
+        raw_path = os.path.join(workdir, "raw.csv")
+        make_movies(n_rows).to_csv(raw_path, index=False)
+        results["raw_csv_mb"] = round(os.path.getsize(raw_path) / 1e6, 2)
+        for fmt in FORMATS:
+            train_path = os.path.join(workdir, fmt, f"train.{fmt}")
+            test_path = os.path.join(workdir, fmt, f"test.{fmt}")
+            ingestion = DataIngestion(DataIngestionConfig(raw_data_path=raw_path, train_data_path=train_path,
+                                                          test_data_path=test_path))
+            with Timer() as t_ingest:
+                ingestion.initiate_data_ingestion()
+            # what DataTransformation does first: read both splits back
+            with Timer() as t_read:
+                train_df = read_table(train_path, schema=MOVIE_SCHEMA)
+                read_table(test_path, schema=MOVIE_SCHEMA)
+            results[fmt] = {
+                "ingestion_s": round(t_ingest.seconds, 3),
+                "read_splits_s": round(t_read.seconds, 3),
+                "disk_mb": round((os.path.getsize(train_path) + os.path.getsize(test_path)) / 1e6, 2),
+                "dtypes_match_schema": all(str(train_df[c].dtype) == d for c, d in MOVIE_SCHEMA.items()
+                                           if c in train_df.columns),
+            }
+    base = results["csv"]["read_splits_s"]
+    for fmt in FORMATS[1:]:
+        results[fmt]["read_speedup_vs_csv"] = round(base / results[fmt]["read_splits_s"], 2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000, help="base dataset size")
+    parser.add_argument("--scale", type=int, default=10, help="multiplier applied to --rows")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.scale), indent=2))
@@ -0,0 +1,121 @@
+# benchmarks/bench_dirty_inputs.py
+"""
+Batch scoring throughput when some rows carry unparseable numeric fields
+("n/a", "12abc", "inf", ...).
+
+Strategies:
+  row_fallback    score each batch with predict_frame; when it raises, retry the
+                  batch row by row with predict_single and skip the rows that raise
+                  (the only way to isolate bad rows before ValidationReport)
+  validated       predict_frame_validated: bad cells are coerced, their rows skipped
+                  and recorded in a ValidationReport; one transform + predict per batch
+  validated_csv   the same through predict_from_csv(..., report=...) on a CSV file
+
+Also times building + raising one failure through three wrapping CustomException
+layers, with and without rendering it as a string.
+
+    python benchmarks/bench_dirty_inputs.py --rows 5000 --dirty 0 0.01 0.05
+"""
+import argparse
+import json
+import os
+import tempfile
+import numpy as np
+from common import make_movies, train_artifacts, Timer
+from src.predict_pipeline import PredictPipeline
+from src.exception import CustomException
+
+BAD_VALUES = ["n/a", "12abc", "inf", "1,000", "unknown"]
+NUMERIC = ["budget", "runtime", "vote_average", "vote_count"]
+
+
+def dirty_frame(rows, fraction, seed=11):
+    df = make_movies(rows, seed=seed, with_target=False)
+    rng = np.random.default_rng(seed)
+    df[NUMERIC] = df[NUMERIC].astype(object)
+    for i in np.flatnonzero(rng.random(rows) < fraction):
+        df.at[i, NUMERIC[i % len(NUMERIC)]] = BAD_VALUES[i % len(BAD_VALUES)]
+    return df
+
+
+def row_fallback(pipeline, df, batch_size):
+    preds = np.full(len(df), np.nan)
+    failed = 0
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size]
+        try:
+            preds[start:start + len(batch)] = pipeline.predict_frame(batch)
+        except Exception:
+            for offset, record in enumerate(batch.to_dict("records")):
+                try:
+                    preds[start + offset] = pipeline.predict_single(record)
+                except Exception:
+                    failed += 1
+    return preds, failed
+
+
+def validated(pipeline, df, batch_size):
+    from src.validation import ValidationReport
+    report = ValidationReport()
+    preds = np.concatenate([pipeline.predict_frame_validated(df.iloc[s:s + batch_size], report, row_offset=s)
+                            for s in range(0, len(df), batch_size)])
+    return preds, report.n_invalid
+
+
+def exception_cost(n=2000):
+    def layer(depth):
+        if depth == 0:
+            float("n/a")
+        try:
+            layer(depth - 1)
+        except Exception as e:
+            raise CustomException(f"layer {depth} failed", e)
+
+    results = {}
+    for render in (False, True):
+        with Timer() as t:
+            for _ in range(n):
+                try:
+                    layer(3)
+                except CustomException as e:
+                    if render:
+                        str(e)
+        results["raise_and_str_us" if render else "raise_us"] = round(t.seconds / n * 1e6, 1)
+    return results
+
+
+def run(rows, fractions, batch_size, n_estimators):
+    results = {"exception": exception_cost()}
+    has_validation = hasattr(PredictPipeline, "predict_frame_validated")
+    with tempfile.TemporaryDirectory() as workdir:
+        pipeline = PredictPipeline(artifacts_dir=train_artifacts(workdir, 20000, n_estimators))
+        for fraction in fractions:
+            df = dirty_frame(rows, fraction)
+            entry = {}
+            strategies = [("row_fallback", row_fallback)] + ([("validated", validated)] if has_validation else [])
+            for name, fn in strategies:
+                with Timer() as t:
+                    _, failed = fn(pipeline, df, batch_size)
+                entry[name] = {"seconds": round(t.seconds, 3), "rows_per_s": round(rows / t.seconds),
+                               "rows_skipped": int(failed)}
+            if has_validation:
+                from src.validation import ValidationReport
+                csv_path = os.path.join(workdir, "dirty.csv")
+                df.to_csv(csv_path, index=False)
+                report = ValidationReport()
+                with Timer() as t:
+                    pipeline.predict_from_csv(csv_path, chunksize=batch_size, report=report)
+                entry["validated_csv"] = {"seconds": round(t.seconds, 3), "rows_per_s": round(rows / t.seconds),
+                                          "rows_skipped": report.n_invalid}
+            results[f"dirty_{fraction}"] = entry
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--dirty", type=float, nargs="+", default=[0.0, 0.01, 0.05])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--n-estimators", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.dirty, args.batch_size, args.n_estimators), indent=2))
@@ -0,0 +1,81 @@
+# benchmarks/bench_feature_store.py
+"""
+Re-scoring a catalogue CSV with and without the transformed-feature store.
+
+Runs, on the same catalogue:
+  no_store      predict_from_csv, every row transformed
+  cold          first run with an empty store (transform + write every row)
+  warm          second run, nothing changed
+  churn_<f>     a fraction f of the movies changed (budget edited), plus f new ids
+
+Each run reports wall time, the time spent getting features (store lookup +
+transform; CSV parsing and predict are the same either way), rows transformed,
+and the max difference from the no_store predictions (should be 0).
+
+    python benchmarks/bench_feature_store.py --rows 100000 --churn 0.01 0.1
+"""
+import argparse
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from common import make_movies, train_artifacts, Timer
+from src.predict_pipeline import PredictPipeline
+from src import metrics
+
+
+def score(pipeline, csv_path, chunksize, store=None):
+    misses = store.misses if store else 0
+    metrics.REGISTRY.reset()
+    with Timer() as t:
+        preds = pipeline.predict_from_csv(csv_path, chunksize=chunksize, feature_store=store)
+    stages = metrics.REGISTRY.summary("predict_stage_seconds")
+    features = sum(stages.get(s, {}).get("total_s", 0.0) for s in ("feature_store", "transform"))
+    transformed = store.misses - misses if store else len(preds)
+    return preds, {"seconds": round(t.seconds, 3), "features_seconds": round(features, 3),
+                   "rows_transformed": int(transformed)}
+
+
+def run(rows, churn, chunksize, n_estimators):
+    results = {"rows": rows}
+    with tempfile.TemporaryDirectory() as workdir:
+        pipeline = PredictPipeline(artifacts_dir=train_artifacts(workdir, 20000, n_estimators), backend="compiled")
+        catalogue = make_movies(rows, seed=5, with_target=False)
+        csv_path = os.path.join(workdir, "catalogue.csv")
+        catalogue.to_csv(csv_path, index=False)
+        store_dir = os.path.join(workdir, "feature_store")
+
+        reference, results["no_store"] = score(pipeline, csv_path, chunksize)
+        store = pipeline.open_feature_store(store_dir)
+        for name in ("cold", "warm"):
+            preds, results[name] = score(pipeline, csv_path, chunksize, store)
+            results[name]["max_abs_diff"] = float(np.max(np.abs(preds - reference)))
+
+        rng = np.random.default_rng(0)
+        for fraction in churn:
+            changed = catalogue.copy()
+            idx = rng.choice(rows, int(rows * fraction), replace=False)
+            changed.loc[idx, "budget"] = changed.loc[idx, "budget"] * 1.5
+            new = make_movies(int(rows * fraction), seed=9, with_target=False)
+            new["id"] += catalogue["id"].max()
+            changed = pd.concat([changed, new], ignore_index=True)
+            changed.to_csv(csv_path, index=False)
+            expected, plain = score(pipeline, csv_path, chunksize)
+            preds, entry = score(pipeline, csv_path, chunksize, store)
+            entry["no_store_seconds"] = plain["seconds"]
+            entry["no_store_features_seconds"] = plain["features_seconds"]
+            entry["max_abs_diff"] = float(np.max(np.abs(preds - expected)))
+            results[f"churn_{fraction}"] = entry
+        results["store"] = store.stats()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--churn", type=float, nargs="+", default=[0.01, 0.1])
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--n-estimators", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.churn, args.chunksize, args.n_estimators), indent=2))
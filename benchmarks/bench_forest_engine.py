@@ -0,0 +1,59 @@
+# benchmarks/bench_forest_engine.py
+"""
+sklearn RandomForestRegressor.predict vs the compiled flat-array engine
+at batch sizes 1, 32 and 10k (predict only, on already transformed rows).
+
+    python benchmarks/bench_forest_engine.py --rows 20000 --n-estimators 100
+"""
+import argparse
+import json
+import os
+import numpy as np
+from common import make_movies, Timer
+from sklearn.ensemble import RandomForestRegressor
+from src.column_profiler import ColumnProfiler
+from src.data_transformation import DataTransformation, DataTransformationConfig
+from src.forest_engine import CompiledForest
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        with Timer() as t:
+            fn()
+        times.append(t.seconds)
+    return min(times)
+
+
+def run(rows, n_estimators, batch_sizes, repeat):
+    df = make_movies(rows)
+    X, y = df.drop(columns=["revenue"]), df["revenue"]
+    dt = DataTransformation(DataTransformationConfig(preprocessor_path=os.devnull), "revenue")
+    pre = dt.get_profiled_preprocessor(ColumnProfiler().profile(X)).fit(X, y)
+    Xt = pre.transform(X).tocsr()
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1).fit(Xt, y)
+    engine = CompiledForest.from_sklearn(model)
+
+    ref = model.predict(Xt)
+    got = engine.predict(Xt)
+    results = {"n_estimators": n_estimators, "max_depth": engine.max_depth,
+               "n_nodes": int(len(engine.feature)),
+               "max_abs_diff": float(np.max(np.abs(ref - got))),
+               "identical": bool(np.array_equal(ref, got)), "batches": {}}
+    for bs in batch_sizes:
+        batch = Xt[:bs]
+        t_sk = best_of(lambda: model.predict(batch), repeat)
+        t_cf = best_of(lambda: engine.predict(batch), repeat)
+        results["batches"][bs] = {"sklearn_ms": round(t_sk * 1e3, 3), "compiled_ms": round(t_cf * 1e3, 3),
+                                  "speedup": round(t_sk / t_cf, 2)}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.n_estimators, args.batch_sizes, args.repeat), indent=2))
@@ -0,0 +1,86 @@
+# benchmarks/bench_out_of_core.py
+"""
+Peak memory of the in-memory training pipeline vs OutOfCoreTrainer on the same
+raw CSV. Each mode runs in its own process so ru_maxrss is a clean per-mode peak.
+
+    python benchmarks/bench_out_of_core.py --rows 500000 --budget-mb 256
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from common import ROOT, make_movies, Timer
+from src.out_of_core import OutOfCoreTrainer, OutOfCoreConfig, peak_rss_mb
+
+
+MODES = ("in_memory", "out_of_core")
+
+
+def write_raw_csv(path, rows, chunk=100_000):
+    """Written chunk by chunk so the benchmark itself never holds the whole file."""
+    for i, start in enumerate(range(0, rows, chunk)):
+        df = make_movies(min(chunk, rows - start), seed=i)
+        df["id"] += start
+        df.to_csv(path, mode="a" if i else "w", header=not i, index=False)
+
+
+def run_mode(mode, raw_path, workdir, budget_mb, n_estimators):
+    artifacts = os.path.join(workdir, mode)
+    with Timer() as t:
+        if mode == "in_memory":
+            from src.data_ingestion import DataIngestion, DataIngestionConfig
+            from src.data_transformation import DataTransformation, DataTransformationConfig
+            from src.model_trainer import ModelTrainer, ModelTrainerConfig
+            train_path, test_path = DataIngestion(DataIngestionConfig(
+                raw_data_path=raw_path, train_data_path=os.path.join(artifacts, "train.parquet"),
+                test_data_path=os.path.join(artifacts, "test.parquet"))).initiate_data_ingestion()
+            X_train, y_train, X_test, y_test = DataTransformation(
+                DataTransformationConfig(preprocessor_path=os.path.join(artifacts, "preprocessor.joblib")),
+                "revenue").initiate_data_transformation(train_path, test_path)
+            result = ModelTrainer(ModelTrainerConfig(model_path=os.path.join(artifacts, "model.joblib"),
+                                                     n_estimators=n_estimators)).initiate_model_trainer(
+                X_train, y_train, X_test, y_test)
+        else:
+            result = OutOfCoreTrainer(OutOfCoreConfig(
+                raw_data_path=raw_path, work_dir=os.path.join(artifacts, "matrices"),
+                preprocessor_path=os.path.join(artifacts, "preprocessor.joblib"),
+                model_path=os.path.join(artifacts, "model.joblib"),
+                memory_budget_mb=budget_mb, n_estimators=n_estimators)).initiate_out_of_core_training()
+    return {"seconds": round(t.seconds, 2), "peak_rss_mb": round(peak_rss_mb(), 1),
+            "r2": round(result["r2"], 4)}
+
+
+def run(rows, budget_mb, n_estimators, modes=MODES):
+    results = {"rows": rows, "budget_mb": budget_mb}
+    with tempfile.TemporaryDirectory() as workdir:
+        raw_path = os.path.join(workdir, "raw.csv")
+        write_raw_csv(raw_path, rows)
+        results["raw_csv_mb"] = round(os.path.getsize(raw_path) / 1e6, 1)
+        # interpreter + numpy/pandas/sklearn imports, the floor both modes share
+        results["import_floor_rss_mb"] = json.loads(subprocess.check_output(
+            [sys.executable, "-c", "import json, sklearn.ensemble, pandas, src.out_of_core as m;"
+                                   "print(json.dumps(m.peak_rss_mb()))"],
+            cwd=ROOT, stderr=subprocess.DEVNULL))
+        for mode in modes:
+            out = subprocess.check_output([sys.executable, __file__, "--child", mode, raw_path, workdir,
+                                           "--budget-mb", str(budget_mb), "--n-estimators", str(n_estimators)],
+                                          stderr=subprocess.DEVNULL)
+            results[mode] = json.loads(out.decode().strip().splitlines()[-1])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--budget-mb", type=int, default=256)
+    parser.add_argument("--n-estimators", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES),
+                        help="in_memory fits the forest on sparse CSR and gets slow past ~100k rows")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "RAW_CSV", "WORKDIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(run_mode(*args.child, args.budget_mb, args.n_estimators)))
+    else:
+        print(json.dumps(run(args.rows, args.budget_mb, args.n_estimators, args.modes), indent=2))
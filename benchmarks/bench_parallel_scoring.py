@@ -0,0 +1,66 @@
+# benchmarks/bench_parallel_scoring.py
+"""
+Throughput of ParallelScorer.score_csv for increasing worker counts,
+checked against single-process PredictPipeline predictions.
+
+Each run also splits CPU time between the parent (finding shard boundaries,
+collecting and writing results: the serial part) and the pool workers
+(reading, parsing and scoring). parent_cpu_share bounds the speedup on any
+number of cores (Amdahl): max_speedup = 1 / parent_cpu_share. Wall-clock
+speedup needs as many cores as workers; cpu_count is in the output.
+
+    python benchmarks/bench_parallel_scoring.py --rows 500000 --workers 1 2 4 8 16 32
+"""
+import argparse
+import json
+import os
+import resource
+import tempfile
+import numpy as np
+from common import make_movies, Timer
+from bench_worker_memory import build_artifacts
+from src.parallel_scoring import ParallelScorer, ParallelScoringConfig
+from src.predict_pipeline import PredictPipeline
+
+
+def cpu_seconds(who):
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(rows, workers, chunksize, n_estimators):
+    with tempfile.TemporaryDirectory() as workdir:
+        build_artifacts(workdir, 20000, n_estimators)
+        artifacts_dir = os.path.join(workdir, "artifacts")
+        csv_path = os.path.join(workdir, "score.csv")
+        make_movies(rows, seed=1, with_target=False).to_csv(csv_path, index=False)
+
+        with Timer() as t_serial:
+            reference = PredictPipeline(artifacts_dir=artifacts_dir).predict_from_csv(csv_path, chunksize=chunksize)
+        results = {"rows": rows, "cpu_count": os.cpu_count(),
+                   "serial": {"seconds": round(t_serial.seconds, 3), "rows_per_s": round(rows / t_serial.seconds)}}
+        for n in workers:
+            scorer = ParallelScorer(ParallelScoringConfig(artifacts_dir=artifacts_dir, n_workers=n, chunksize=chunksize))
+            parent_cpu, workers_cpu = cpu_seconds(resource.RUSAGE_SELF), cpu_seconds(resource.RUSAGE_CHILDREN)
+            with Timer() as t:
+                preds = scorer.score_csv(csv_path)
+            # pool processes have exited (and been waited for) once score_csv returns
+            parent_cpu = cpu_seconds(resource.RUSAGE_SELF) - parent_cpu
+            workers_cpu = cpu_seconds(resource.RUSAGE_CHILDREN) - workers_cpu
+            share = parent_cpu / (parent_cpu + workers_cpu)
+            results[f"workers_{n}"] = {"seconds": round(t.seconds, 3), "rows_per_s": round(rows / t.seconds),
+                                       "speedup_vs_serial": round(t_serial.seconds / t.seconds, 2),
+                                       "parent_cpu_s": round(parent_cpu, 3), "workers_cpu_s": round(workers_cpu, 3),
+                                       "parent_cpu_share": round(share, 4), "max_speedup": round(1 / share, 1),
+                                       "matches_serial": bool(np.allclose(preds, reference))}
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chunksize", type=int, default=20000)
+    parser.add_argument("--n-estimators", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.workers, args.chunksize, args.n_estimators), indent=2))
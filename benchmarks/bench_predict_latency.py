@@ -0,0 +1,79 @@
+# benchmarks/bench_predict_latency.py
+"""
+p50/p99 latency of single-movie /predict: the previous route (per-request
+DataFrame + separately loaded model/preprocessor) vs the current app.py
+built on PredictPipeline. The prediction cache is disabled for both.
+
+    python benchmarks/bench_predict_latency.py --requests 2000
+"""
+import argparse
+import json
+import os
+import tempfile
+import numpy as np
+from common import Timer, payloads, percentiles
+from bench_worker_memory import build_artifacts
+
+
+def legacy_app(artifacts_dir):
+    """The /predict route as it was before it moved onto PredictPipeline."""
+    import joblib
+    import pandas as pd
+    from flask import Flask, request, jsonify
+    from src.payload import build_raw_from_payload
+    model = joblib.load(os.path.join(artifacts_dir, "models", "random_forest.joblib"))
+    preprocessor = joblib.load(os.path.join(artifacts_dir, "transformer", "preprocessor.joblib"))
+    legacy = Flask("legacy")
+
+    @legacy.route("/predict", methods=["POST"])
+    def predict():
+        raw = build_raw_from_payload(request.get_json(silent=True))
+        expected = list(preprocessor.feature_names_in_)
+        ordered = {c: raw.get(c, "") for c in expected}
+        df = pd.DataFrame([ordered], columns=expected)
+        return jsonify({"prediction": float(model.predict(preprocessor.transform(df))[0])})
+    return legacy
+
+
+def measure(client, items, warmup=20):
+    for item in items[:warmup]:
+        client.post("/predict", json=item)
+    samples, preds = [], []
+    for item in items:
+        with Timer() as t:
+            resp = client.post("/predict", json=item)
+        samples.append(t.seconds)
+        preds.append(resp.get_json()["prediction"])
+    return samples, preds
+
+
+def run(n_requests, n_estimators, backend):
+    with tempfile.TemporaryDirectory() as workdir:
+        build_artifacts(workdir, 20000, n_estimators)
+        os.chdir(workdir)
+        os.environ.update({"PREDICTION_CACHE_SIZE": "0", "MODEL_BACKEND": backend})
+        import app as current
+        items = payloads(n_requests)
+        old_samples, old_preds = measure(legacy_app(os.path.join(workdir, "artifacts")).test_client(), items)
+        new_samples, new_preds = measure(current.app.test_client(), items)
+
+        # core only (no HTTP): one payload through build + transform + predict
+        core = []
+        for item in items:
+            with Timer() as t:
+                current.predict_rows([current.PredictionCache.make_key(
+                    current.build_raw_from_payload(item), current.EXPECTED_COLUMNS)])
+            core.append(t.seconds)
+        return {"requests": n_requests, "backend": backend,
+                "previous_route": percentiles(old_samples), "pipeline_route": percentiles(new_samples),
+                "pipeline_core_only": percentiles(core),
+                "same_predictions": bool(np.allclose(old_preds, new_preds))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--n-estimators", type=int, default=50)
+    parser.add_argument("--backend", default="sklearn")
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, args.n_estimators, args.backend), indent=2))
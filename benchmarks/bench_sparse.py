@@ -0,0 +1,53 @@
+# benchmarks/bench_sparse.py
+"""
+Dense vs sparse (CSR) one-hot output: matrix memory, transform/fit/predict time.
+
+    python benchmarks/bench_sparse.py --rows 20000
+"""
+import argparse
+import json
+import os
+import pickle
+from common import make_movies, Timer, matrix_nbytes
+from sklearn.ensemble import RandomForestRegressor
+from src.data_transformation import DataTransformation, DataTransformationConfig
+
+
+def run(rows, n_estimators):
+    df = make_movies(rows)
+    X, y = df.drop(columns=["revenue"]), df["revenue"]
+    num_cols = X.select_dtypes(include=["int64", "float64"]).columns.tolist()
+    cat_cols = X.select_dtypes(include=["object", "string"]).columns.tolist()
+    results = {}
+    for mode in ("dense", "sparse"):
+        dt = DataTransformation(DataTransformationConfig(preprocessor_path=os.devnull,
+                                                         sparse_output=(mode == "sparse")), "revenue")
+        pre = dt.get_preprocessor(num_cols, cat_cols)
+        with Timer() as t_fit_pre:
+            pre.fit(X)
+        with Timer() as t_transform:
+            Xt = pre.transform(X)
+        model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1)
+        with Timer() as t_fit:
+            model.fit(Xt, y)
+        with Timer() as t_predict:
+            model.predict(Xt)
+        results[mode] = {
+            "shape": list(Xt.shape),
+            "matrix_mb": round(matrix_nbytes(Xt) / 1e6, 2),
+            "preprocessor_pickle_mb": round(len(pickle.dumps(pre)) / 1e6, 2),
+            "preprocessor_fit_s": round(t_fit_pre.seconds, 3),
+            "transform_s": round(t_transform.seconds, 3),
+            "transform_rows_per_s": round(rows / t_transform.seconds),
+            "model_fit_s": round(t_fit.seconds, 3),
+            "predict_s": round(t_predict.seconds, 3),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--n-estimators", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.n_estimators), indent=2))
@@ -0,0 +1,72 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start cost of the Flask serving process per WARMUP_MODE: time to import
+app.py, to the first /healthz answer, and to the first /predict response,
+plus the log files the process leaves behind. Every sample is a fresh
+interpreter, so no module is already imported.
+
+    python benchmarks/bench_startup.py --rows 20000 --repeats 5
+
+"eager" is the pre-warm-up behaviour (artifacts loaded during import).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from common import ROOT, train_artifacts, Timer
+
+MODES = ("eager", "background", "lazy")
+
+# runs in the child; imports nothing from benchmarks/ so the measured import is app.py alone
+CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+client = app.app.test_client()
+assert client.get("/healthz").status_code == 200
+t2 = time.perf_counter()
+resp = client.post("/predict", json={"budget": 5e7, "runtime": 120, "genres": "Drama", "original_language": "en"})
+assert resp.status_code == 200, resp.get_data(as_text=True)
+t3 = time.perf_counter()
+print(json.dumps({"import_s": t1 - t0, "healthz_s": t2 - t0, "first_predict_s": t3 - t0,
+                  "ready": app.loader.status()}))
+"""
+
+
+def run_child(workdir, mode, log_dir):
+    env = dict(os.environ, WARMUP_MODE=mode, LOG_DIR=log_dir, PYTHONPATH=ROOT, PREDICTION_CACHE_SIZE="0")
+    with Timer() as t:
+        out = subprocess.run([sys.executable, "-c", CHILD], cwd=workdir, env=env, check=True,
+                             capture_output=True, text=True).stdout
+    sample = json.loads(out.strip().splitlines()[-1])
+    sample["process_s"] = t.seconds
+    return sample
+
+
+def run(rows, n_estimators, repeats, modes=MODES):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        train_artifacts(workdir, rows, n_estimators)
+        for mode in modes:
+            log_dir = os.path.join(workdir, f"logs_{mode}")
+            samples = [run_child(workdir, mode, log_dir) for _ in range(repeats)]
+            med = {k: round(float(np.median([s[k] for s in samples])), 4)
+                   for k in ("import_s", "healthz_s", "first_predict_s", "process_s")}
+            med["log_files_per_process"] = len(os.listdir(log_dir)) / repeats if os.path.isdir(log_dir) else 0
+            med["load_seconds"] = samples[-1]["ready"].get("load_seconds")
+            results[mode] = med
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--n-estimators", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.n_estimators, args.repeats, args.modes), indent=2))
@@ -0,0 +1,123 @@
+# benchmarks/bench_worker_memory.py
+"""
+Per-worker memory and boot time of `gunicorn app:app` with private joblib
+copies vs a memory-mapped compiled forest shared through --preload.
+
+Trains a synthetic model into a temporary artifacts dir, starts gunicorn for
+each scenario, waits for the first successful /predict and then reads
+RSS / PSS / USS of every worker from /proc/<pid>/smaps_rollup (Linux only).
+PSS splits shared pages between the processes mapping them, so it is the
+number to compare.
+
+    python benchmarks/bench_worker_memory.py --rows 20000 --n-estimators 100
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from common import ROOT, make_movies
+from src.data_transformation import DataTransformation, DataTransformationConfig
+from src.model_trainer import ModelTrainer, ModelTrainerConfig
+
+SCENARIOS = {
+    "joblib_private": {"env": {"MODEL_BACKEND": "sklearn", "ARTIFACT_MMAP_MODE": ""}, "preload": False},
+    "joblib_preload": {"env": {"MODEL_BACKEND": "sklearn", "ARTIFACT_MMAP_MODE": ""}, "preload": True},
+    "compiled_mmap_preload": {"env": {"MODEL_BACKEND": "compiled", "ARTIFACT_MMAP_MODE": "r"}, "preload": True},
+}
+
+
+def build_artifacts(workdir, rows, n_estimators):
+    df = make_movies(rows)
+    data_dir = os.path.join(workdir, "artifacts", "data")
+    os.makedirs(data_dir, exist_ok=True)
+    train_csv, test_csv = os.path.join(data_dir, "train.csv"), os.path.join(data_dir, "test.csv")
+    df.iloc[: int(rows * 0.8)].to_csv(train_csv, index=False)
+    df.iloc[int(rows * 0.8):].to_csv(test_csv, index=False)
+    dt = DataTransformation(DataTransformationConfig(
+        preprocessor_path=os.path.join(workdir, "artifacts", "transformer", "preprocessor.joblib")), "revenue")
+    X_train, y_train, X_test, y_test = dt.initiate_data_transformation(train_csv, test_csv)
+    ModelTrainer(ModelTrainerConfig(
+        model_path=os.path.join(workdir, "artifacts", "models", "random_forest.joblib"),
+        compiled_model_dir=os.path.join(workdir, "artifacts", "models", "random_forest_compiled"),
+        n_estimators=n_estimators)).initiate_model_trainer(X_train, y_train, X_test, y_test)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def smaps_rollup(pid):
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                out[parts[0].rstrip(":")] = int(parts[1])
+    uss = out.get("Private_Clean", 0) + out.get("Private_Dirty", 0)
+    return {"rss_mb": out.get("Rss", 0) / 1024, "pss_mb": out.get("Pss", 0) / 1024, "uss_mb": uss / 1024}
+
+
+def children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def post_predict(port):
+    req = urllib.request.Request(f"http://127.0.0.1:{port}/predict", data=json.dumps({"budget": 1e8}).encode(),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        return resp.status
+
+
+def run_scenario(workdir, workers, scenario, timeout=120):
+    port = free_port()
+    cmd = [sys.executable, "-m", "gunicorn", "app:app", "--workers", str(workers),
+           "--bind", f"127.0.0.1:{port}", "--pythonpath", ROOT, "--chdir", workdir]
+    if scenario["preload"]:
+        cmd.append("--preload")
+    env = dict(os.environ, **scenario["env"])
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if time.perf_counter() - start > timeout:
+                raise TimeoutError("gunicorn did not come up")
+            try:
+                post_predict(port)
+                break
+            except OSError:
+                time.sleep(0.05)
+        boot_s = time.perf_counter() - start
+        for _ in range(workers * 10):  # touch every worker
+            post_predict(port)
+        mem = [smaps_rollup(pid) for pid in children(proc.pid)]
+        return {
+            "time_to_first_prediction_s": round(boot_s, 3),
+            "workers": len(mem),
+            "rss_mb_per_worker": round(sum(m["rss_mb"] for m in mem) / max(len(mem), 1), 1),
+            "pss_mb_per_worker": round(sum(m["pss_mb"] for m in mem) / max(len(mem), 1), 1),
+            "uss_mb_per_worker": round(sum(m["uss_mb"] for m in mem) / max(len(mem), 1), 1),
+            "master": {k: round(v, 1) for k, v in smaps_rollup(proc.pid).items()},
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        build_artifacts(workdir, args.rows, args.n_estimators)
+        results = {name: run_scenario(workdir, args.workers, sc) for name, sc in SCENARIOS.items()}
+    print(json.dumps(results, indent=2))
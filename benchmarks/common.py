@@ -0,0 +1,104 @@
+# benchmarks/common.py
+"""Shared helpers for the benchmark scripts: synthetic movie data and timing."""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+GENRES = ["Action", "Adventure", "Comedy", "Drama", "Horror",
+          "Romance", "Thriller", "Science Fiction", "Fantasy"]
+LANGUAGES = ["en", "hi", "fr", "de", "es", "it", "ja", "ko", "zh", "ar",
+             "pt", "ru", "da", "el", "nl", "ta", "te", "ml"]
+COUNTRIES = ["United States of America", "United Kingdom", "France", "India",
+             "Germany", "Japan", "South Korea", "Canada", "Spain", "Italy"]
+
+
+def make_movies(n_rows, seed=0, with_target=True):
+    """
+    Synthetic movies with the raw schema used by the preprocessor
+    (same columns as app.build_raw_from_payload plus the revenue target).
+    Titles/overviews are near-unique like the real catalogue.
+    """
+    rng = np.random.default_rng(seed)
+    budget = rng.lognormal(16, 1.2, n_rows).round()
+    vote_average = rng.uniform(1, 10, n_rows).round(1)
+    days = rng.integers(0, 16000, n_rows)
+    df = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "title": [f"Movie {i}" for i in rng.permutation(n_rows)],
+        "vote_average": vote_average,
+        "vote_count": rng.integers(0, 25000, n_rows),
+        "status": rng.choice(["Released", "Post Production", "Rumored"], n_rows, p=[0.96, 0.03, 0.01]),
+        "release_date": (np.datetime64("1980-01-01") + days).astype(str),
+        "runtime": rng.normal(110, 20, n_rows).clip(60, 240).round(),
+        "budget": budget,
+        "original_language": rng.choice(LANGUAGES, n_rows),
+        "original_title": [f"Original {i}" for i in rng.permutation(n_rows)],
+        "overview": [f"Overview {i} {j}" for i, j in zip(rng.permutation(n_rows), rng.integers(0, 1000, n_rows))],
+        "genres": rng.choice(GENRES, n_rows),
+        "production_companies": [f"Studio {k}" for k in rng.zipf(1.5, n_rows) % 5000],
+        "production_countries": rng.choice(COUNTRIES, n_rows),
+    })
+    df.loc[rng.random(n_rows) < 0.03, "runtime"] = np.nan
+    if with_target:
+        df["revenue"] = (budget * rng.uniform(0.3, 3.5, n_rows) * (1 + vote_average / 10)).round()
+    return df
+
+
+def train_artifacts(workdir, rows, n_estimators=10):
+    """Run ingestion -> transformation -> training on synthetic movies; artifacts land in <workdir>/artifacts."""
+    from src.data_ingestion import DataIngestion, DataIngestionConfig
+    from src.data_transformation import DataTransformation, DataTransformationConfig
+    from src.model_trainer import ModelTrainer, ModelTrainerConfig
+    artifacts = os.path.join(workdir, "artifacts")
+    raw_path = os.path.join(workdir, "movies.csv")
+    make_movies(rows).to_csv(raw_path, index=False)
+    train_path, test_path = DataIngestion(DataIngestionConfig(
+        raw_data_path=raw_path, train_data_path=os.path.join(artifacts, "data", "train.parquet"),
+        test_data_path=os.path.join(artifacts, "data", "test.parquet"))).initiate_data_ingestion()
+    X_train, y_train, X_test, y_test = DataTransformation(DataTransformationConfig(
+        preprocessor_path=os.path.join(artifacts, "transformer", "preprocessor.joblib")),
+        "revenue").initiate_data_transformation(train_path, test_path)
+    ModelTrainer(ModelTrainerConfig(
+        model_path=os.path.join(artifacts, "models", "random_forest.joblib"),
+        compiled_model_dir=os.path.join(artifacts, "models", "random_forest_compiled"),
+        n_estimators=n_estimators)).initiate_model_trainer(X_train, y_train, X_test, y_test)
+    return artifacts
+
+
+def payloads(n, seed=3):
+    """/predict JSON bodies built from synthetic movies (the fields the web form sends)."""
+    df = make_movies(n, seed=seed, with_target=False)
+    return [{"title": r.title, "budget": r.budget, "runtime": r.runtime if r.runtime == r.runtime else "",
+             "vote_average": r.vote_average, "vote_count": int(r.vote_count), "genres": r.genres,
+             "original_language": r.original_language} for r in df.itertuples()]
+
+
+def percentiles(samples):
+    """p50/p99/mean in milliseconds from a list of durations in seconds."""
+    arr = np.asarray(samples) * 1e3
+    return {"p50_ms": round(float(np.percentile(arr, 50)), 3), "p99_ms": round(float(np.percentile(arr, 99)), 3),
+            "mean_ms": round(float(arr.mean()), 3)}
+
+
+class Timer:
+    """Context manager recording wall time in seconds."""
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+        return False
+
+
+def matrix_nbytes(X):
+    """Bytes held by a dense ndarray or a scipy sparse matrix."""
+    if hasattr(X, "nnz"):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
@@ -0,0 +1,100 @@
+# benchmarks/load_test.py
+"""
+Local load test: sync gunicorn `app:app` vs async `asgi_app:app` (uvicorn,
+micro-batched) under concurrent single-movie /predict requests.
+
+Trains a synthetic model into a temporary artifacts dir, starts each server,
+fires requests from `--concurrency` client threads (keep-alive connections)
+and reports throughput and latency percentiles.
+
+    python benchmarks/load_test.py --concurrency 32 --requests 4000
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from common import ROOT, payloads
+from bench_worker_memory import build_artifacts, free_port
+
+
+def server_cmd(kind, port, workers):
+    if kind == "gunicorn_sync":
+        return [sys.executable, "-m", "gunicorn", "app:app", "--workers", str(workers), "--preload",
+                "--bind", f"127.0.0.1:{port}", "--pythonpath", ROOT]
+    return [sys.executable, "-m", "uvicorn", "asgi_app:app", "--workers", str(workers),
+            "--host", "127.0.0.1", "--port", str(port), "--app-dir", ROOT, "--log-level", "warning"]
+
+
+def wait_ready(port, timeout=120):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("POST", "/predict", body=json.dumps({"budget": 1e8}),
+                         headers={"Content-Type": "application/json"})
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError("server did not come up")
+
+
+def client(port, items):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies = []
+    for item in items:
+        body = json.dumps(item)
+        start = time.perf_counter()
+        conn.request("POST", "/predict", body=body, headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        latencies.append(time.perf_counter() - start)
+        if resp.status != 200:
+            raise RuntimeError(f"HTTP {resp.status}")
+    conn.close()
+    return latencies
+
+
+def run_server(kind, workdir, port, items, concurrency, workers, env):
+    proc = subprocess.Popen(server_cmd(kind, port, workers), cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        shards = [items[i::concurrency] for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = [t for part in pool.map(lambda s: client(port, s), shards) for t in part]
+        elapsed = time.perf_counter() - start
+        arr = np.asarray(latencies) * 1e3
+        return {"requests_per_s": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(float(np.percentile(arr, 50)), 2),
+                "p99_ms": round(float(np.percentile(arr, 99)), 2)}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--n-estimators", type=int, default=50)
+    parser.add_argument("--backend", default="sklearn")
+    parser.add_argument("--batch-wait-ms", default="5")
+    args = parser.parse_args()
+    env = dict(os.environ, MODEL_BACKEND=args.backend, PREDICTION_CACHE_SIZE="0",
+               MICRO_BATCH_WAIT_MS=args.batch_wait_ms, PYTHONPATH=ROOT)
+    items = payloads(args.requests)
+    with tempfile.TemporaryDirectory() as workdir:
+        build_artifacts(workdir, 20000, args.n_estimators)
+        results = {"concurrency": args.concurrency, "workers": args.workers, "backend": args.backend}
+        for kind in ("gunicorn_sync", "uvicorn_micro_batch"):
+            results[kind] = run_server(kind, workdir, free_port(), items, args.concurrency, args.workers, env)
+    print(json.dumps(results, indent=2))
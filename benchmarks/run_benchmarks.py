@@ -0,0 +1,228 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmark harness for the training and inference hot paths.
+
+Generates a synthetic raw CSV with the schema build_raw_from_payload produces,
+then times every stage on it:
+  ingestion       DataIngestion: raw CSV -> typed train/test splits
+  transform       DataTransformation: fit + transform the splits
+  fit             ModelTrainer: forest fit + compiled export
+  predict_single  PredictPipeline.predict_rows on one row at a time
+  predict_batch   PredictPipeline.predict_frame on fixed-size batches
+  http_predict    POST /predict through the Flask test client (cache disabled)
+
+Results are written as JSON and compared against a stored baseline. A metric
+that is worse than the baseline by more than --tolerance is flagged as a
+regression (exit code 1 with --fail-on-regression).
+
+    python benchmarks/run_benchmarks.py --rows 20000
+    python benchmarks/run_benchmarks.py --rows 20000 --save-baseline
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from common import ROOT, make_movies, payloads, percentiles, Timer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(HERE, "results", "latest.json")
+STAGES = ("ingestion", "transform", "fit", "predict_single", "predict_batch", "http_predict")
+
+
+def check_schema(df):
+    """The generator must keep producing exactly the columns the serving path builds."""
+    from src.payload import build_raw_from_payload
+    expected = set(build_raw_from_payload({})) | {"revenue"}
+    if set(df.columns) != expected:
+        raise SystemExit(f"make_movies columns drifted from build_raw_from_payload: "
+                         f"missing {sorted(expected - set(df.columns))}, extra {sorted(set(df.columns) - expected)}")
+
+
+def median_seconds(fn, repeats):
+    times = []
+    result = None
+    for _ in range(repeats):
+        with Timer() as t:
+            result = fn()
+        times.append(t.seconds)
+    return float(np.median(times)), result
+
+
+def environment():
+    import pandas, sklearn
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pandas.__version__,
+            "sklearn": sklearn.__version__, "cpu_count": os.cpu_count(), "machine": platform.machine(),
+            "commit": commit, "timestamp": datetime.datetime.now().isoformat(timespec="seconds")}
+
+
+def run(rows, n_estimators, repeats, single_requests, batch_size, stages):
+    from src.data_ingestion import DataIngestion, DataIngestionConfig
+    from src.data_transformation import DataTransformation, DataTransformationConfig
+    from src.model_trainer import ModelTrainer, ModelTrainerConfig
+    from src.predict_pipeline import PredictPipeline
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        artifacts = os.path.join(workdir, "artifacts")
+        raw_path = os.path.join(workdir, "data", "movies.csv")
+        os.makedirs(os.path.dirname(raw_path))
+        df = make_movies(rows)
+        check_schema(df)
+        df.to_csv(raw_path, index=False)
+
+        # the training stages always run (later stages need their artifacts); only selected ones are timed
+        ingestion = DataIngestion(DataIngestionConfig(
+            raw_data_path=raw_path,
+            train_data_path=os.path.join(artifacts, "data", "train.parquet"),
+            test_data_path=os.path.join(artifacts, "data", "test.parquet")))
+        seconds, (train_path, test_path) = median_seconds(ingestion.initiate_data_ingestion, repeats)
+        results["ingestion"] = {"seconds": round(seconds, 4), "rows_per_s": round(rows / seconds)}
+
+        transformation = DataTransformation(DataTransformationConfig(
+            preprocessor_path=os.path.join(artifacts, "transformer", "preprocessor.joblib")), "revenue")
+        seconds, (X_train, y_train, X_test, y_test) = median_seconds(
+            lambda: transformation.initiate_data_transformation(train_path, test_path), repeats)
+        results["transform"] = {"seconds": round(seconds, 4), "rows_per_s": round(rows / seconds),
+                                "n_features": int(X_train.shape[1])}
+
+        trainer = ModelTrainer(ModelTrainerConfig(
+            model_path=os.path.join(artifacts, "models", "random_forest.joblib"),
+            compiled_model_dir=os.path.join(artifacts, "models", "random_forest_compiled"),
+            n_estimators=n_estimators))
+        seconds, metrics = median_seconds(lambda: trainer.initiate_model_trainer(X_train, y_train, X_test, y_test),
+                                          repeats)
+        results["fit"] = {"seconds": round(seconds, 4), "r2": round(metrics["r2"], 4)}
+
+        items = payloads(single_requests)
+        if "predict_single" in stages or "predict_batch" in stages:
+            pipeline = PredictPipeline(artifacts_dir=artifacts)
+            from src.payload import build_raw_from_payload
+            rows_single = [tuple(build_raw_from_payload(item)[c] for c in pipeline.expected_columns)
+                           for item in items]
+            if "predict_single" in stages:
+                for row in rows_single[:20]:
+                    pipeline.predict_rows([row])
+                samples = []
+                for row in rows_single:
+                    with Timer() as t:
+                        pipeline.predict_rows([row])
+                    samples.append(t.seconds)
+                results["predict_single"] = percentiles(samples)
+            if "predict_batch" in stages:
+                batch = make_movies(batch_size, seed=7, with_target=False)
+                seconds, _ = median_seconds(lambda: pipeline.predict_frame(batch), max(repeats, 5))
+                results["predict_batch"] = {"batch_size": batch_size, "seconds": round(seconds, 4),
+                                            "rows_per_s": round(batch_size / seconds)}
+
+        if "http_predict" in stages:
+            # app.py resolves artifacts relative to the working directory at import time
+            cwd = os.getcwd()
+            os.chdir(workdir)
+            os.environ["PREDICTION_CACHE_SIZE"] = "0"
+            try:
+                sys.modules.pop("app", None)
+                import app
+                client = app.app.test_client()
+                for item in items[:20]:
+                    client.post("/predict", json=item)
+                samples = []
+                for item in items:
+                    with Timer() as t:
+                        resp = client.post("/predict", json=item)
+                    if resp.status_code != 200:
+                        raise SystemExit(f"/predict returned {resp.status_code}: {resp.get_data(as_text=True)}")
+                    samples.append(t.seconds)
+                results["http_predict"] = percentiles(samples)
+            finally:
+                os.chdir(cwd)
+    return {stage: results[stage] for stage in STAGES if stage in stages and stage in results}
+
+
+def lower_is_better(metric):
+    return metric.endswith("_s") and not metric.endswith("per_s") or metric.endswith("_ms") or metric == "seconds"
+
+
+def compare(current, baseline, tolerance, tail_tolerance):
+    """
+    Rows of (stage, metric, baseline, current, change, status) for every timed metric present in both.
+    Tail latencies (p99) swing far more between runs on a shared machine, so they get their own tolerance.
+    """
+    rows = []
+    for stage, metrics in current["results"].items():
+        for metric, value in metrics.items():
+            base = baseline["results"].get(stage, {}).get(metric)
+            if base in (None, 0) or not (lower_is_better(metric) or metric.endswith("per_s")):
+                continue
+            change = value / base - 1.0
+            limit = tail_tolerance if metric.startswith("p99") else tolerance
+            worse = change > limit if lower_is_better(metric) else change < -limit
+            better = change < -limit if lower_is_better(metric) else change > limit
+            rows.append((stage, metric, base, value, change, "REGRESSION" if worse else ("improved" if better else "ok")))
+    return rows
+
+
+def print_comparison(rows, current, baseline):
+    env_diff = {k: (baseline["env"].get(k), current["env"].get(k)) for k in ("cpu_count", "machine", "python",
+                                                                            "numpy", "pandas", "sklearn")
+                if baseline["env"].get(k) != current["env"].get(k)}
+    if env_diff:
+        print(f"warning: environment differs from the baseline {env_diff}; timings may not be comparable")
+    if baseline["params"] != current["params"]:
+        # earlier stages leave state behind (heap, caches), so a stage subset is not a like-for-like comparison
+        print(f"warning: parameters differ from the baseline {baseline['params']} vs {current['params']}")
+    print(f"{'stage':<16}{'metric':<12}{'baseline':>12}{'current':>12}{'change':>9}  status")
+    for stage, metric, base, value, change, status in rows:
+        print(f"{stage:<16}{metric:<12}{base:>12.4g}{value:>12.4g}{change:>+9.1%}  {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--n-estimators", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3, help="median of this many runs for the batch stages")
+    parser.add_argument("--requests", type=int, default=1000, help="single-row / HTTP requests to time")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.15, help="relative slowdown flagged as a regression")
+    parser.add_argument("--tail-tolerance", type=float, default=0.75, help="same for p99 latencies")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    params = {"rows": args.rows, "n_estimators": args.n_estimators, "repeats": args.repeats,
+              "requests": args.requests, "batch_size": args.batch_size, "stages": args.stages}
+    report = {"env": environment(), "params": params,
+              "results": run(args.rows, args.n_estimators, args.repeats, args.requests, args.batch_size, args.stages)}
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance, args.tail_tolerance)
+        print_comparison(rows, report, baseline)
+        regressions = [r for r in rows if r[-1] == "REGRESSION"]
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
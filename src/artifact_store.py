@@ -0,0 +1,177 @@
+# src/artifact_store.py
+"""
+Versioned model artifacts, published atomically.
+
+Layout under the artifacts root:
+    versions/<version>/transformer/preprocessor.joblib
+    versions/<version>/models/random_forest.joblib   (+ compiled / compact / grid exports)
+    versions/<version>/manifest.json                 content hash and source files
+    CURRENT                                          name of the version to serve
+
+A version is assembled under versions/.staging-*, renamed into place and only
+then made current by replacing CURRENT with os.replace. Readers see the old or
+the new version, never a mix of both or a half-written file. Serving processes
+poll CURRENT (src/warmup.py) and swap a new version in without a restart.
+Without CURRENT the flat artifacts/transformer + artifacts/models files are
+served, as before versioning.
+
+    python -m src.artifact_store list
+    python -m src.artifact_store publish            # snapshot the flat artifacts as a new version
+    python -m src.artifact_store rollback <version>
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from src.logger import get_logger
+from src.exception import CustomException, ErrorCode
+
+logger = get_logger(__name__)
+
+# relative paths copied into a version; the first two are required
+PUBLISHED = (
+    os.path.join("transformer", "preprocessor.joblib"),
+    os.path.join("models", "random_forest.joblib"),
+    os.path.join("models", "random_forest_compiled"),
+    os.path.join("models", "random_forest_compact"),
+    os.path.join("models", "prediction_grid"),
+)
+
+
+@dataclass
+class ArtifactStoreConfig:
+    root: str                  # the artifacts directory
+    keep_versions: int = 3     # older versions are deleted after a publish (never the current one)
+
+
+def _files(path):
+    if os.path.isfile(path):
+        return [path]
+    return sorted(os.path.join(d, f) for d, _, files in os.walk(path) for f in files)
+
+
+class ArtifactStore:
+    # import cost matters here: serving processes load this module at startup, so
+    # src.utils (pandas / joblib) is only imported by the publishing side
+    def __init__(self, config: ArtifactStoreConfig):
+        self.config = config
+        self.versions_dir = os.path.join(config.root, "versions")
+        self.pointer_path = os.path.join(config.root, "CURRENT")
+
+    def current(self):
+        """Name of the current version, or None for the flat (unversioned) layout."""
+        try:
+            with open(self.pointer_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def path(self, version=None):
+        """Artifacts dir of `version`; the flat root for None. Same layout either way, so PredictPipeline takes both."""
+        return os.path.join(self.versions_dir, version) if version else self.config.root
+
+    def versions(self):
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(v for v in os.listdir(self.versions_dir) if not v.startswith("."))
+
+    def set_current(self, version):
+        """Point CURRENT at an existing version (publish, rollback) with one atomic rename."""
+        try:
+            if not os.path.isfile(os.path.join(self.path(version), "manifest.json")):
+                raise FileNotFoundError(f"No published version '{version}' in {self.versions_dir}")
+            tmp_path = f"{self.pointer_path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w") as f:
+                f.write(version + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.pointer_path)
+            logger.info(f"CURRENT -> {version}")
+        except Exception as e:
+            raise CustomException(f"Failed to switch to artifact version {version}", e, code=ErrorCode.ARTIFACT)
+
+    def publish(self, source_dir=None):
+        """
+        Snapshot the artifacts in source_dir (default: the flat layout under root) as a
+        new version and make it current. Returns the version name; when the content
+        equals the current version nothing is written and that version is returned.
+        """
+        from src.utils import file_sha256, save_json
+        try:
+            source_dir = source_dir or self.config.root
+            for required in PUBLISHED[:2]:
+                if not os.path.exists(os.path.join(source_dir, required)):
+                    raise FileNotFoundError(f"Cannot publish without {required} in {source_dir}")
+            entries = [rel for rel in PUBLISHED if os.path.exists(os.path.join(source_dir, rel))]
+            files = {os.path.relpath(f, source_dir): file_sha256(f)
+                     for rel in entries for f in _files(os.path.join(source_dir, rel))}
+            content = hashlib.sha256(repr(sorted(files.items())).encode()).hexdigest()
+
+            current = self.current()
+            if current and self._manifest(current).get("content_sha256") == content:
+                logger.info(f"Artifacts unchanged since version {current}; nothing to publish")
+                return current
+            version = f"{time.strftime('%Y%m%d-%H%M%S')}-{content[:8]}"
+            target = self.path(version)
+            if not os.path.exists(target):
+                staging = os.path.join(self.versions_dir, f".staging-{os.getpid()}-{version}")
+                shutil.rmtree(staging, ignore_errors=True)
+                for rel in entries:
+                    src, dst = os.path.join(source_dir, rel), os.path.join(staging, rel)
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    # copies, not hard links: exports such as CompiledForest.save rewrite files in place
+                    if os.path.isdir(src):
+                        shutil.copytree(src, dst)
+                    else:
+                        shutil.copy2(src, dst)
+                save_json(os.path.join(staging, "manifest.json"),
+                          {"version": version, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                           "content_sha256": content, "files": files})
+                os.replace(staging, target)
+            self.set_current(version)
+            self.prune()
+            logger.info(f"Published artifact version {version} ({len(files)} files)")
+            return version
+        except Exception as e:
+            raise CustomException("Failed to publish artifacts", e, code=ErrorCode.ARTIFACT)
+
+    def _manifest(self, version):
+        from src.utils import load_json
+        path = os.path.join(self.path(version), "manifest.json")
+        return load_json(path) if os.path.exists(path) else {}
+
+    def prune(self):
+        """Delete the oldest versions beyond keep_versions. Processes still serving one keep their open/mapped files."""
+        current = self.current()
+        others = [v for v in self.versions() if v != current]
+        keep_others = max(self.config.keep_versions - 1, 0)
+        for version in others[:len(others) - keep_others]:
+            shutil.rmtree(self.path(version), ignore_errors=True)
+            logger.info(f"Removed old artifact version {version}")
+
+
+def main(argv=None):
+    base = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Manage versioned model artifacts.")
+    parser.add_argument("command", choices=("list", "publish", "rollback"))
+    parser.add_argument("version", nargs="?", help="version to roll back to")
+    parser.add_argument("--artifacts-dir", default=os.path.join(base, "artifacts"))
+    parser.add_argument("--keep", type=int, default=ArtifactStoreConfig.keep_versions)
+    args = parser.parse_args(argv)
+    store = ArtifactStore(ArtifactStoreConfig(root=args.artifacts_dir, keep_versions=args.keep))
+    if args.command == "publish":
+        print(store.publish())
+    elif args.command == "rollback":
+        if not args.version:
+            parser.error("rollback needs a version (see `list`)")
+        store.set_current(args.version)
+    else:
+        current = store.current()
+        for version in store.versions():
+            print(("* " if version == current else "  ") + version)
+
+
+if __name__ == "__main__":
+    main()
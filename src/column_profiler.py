@@ -0,0 +1,75 @@
+# src/column_profiler.py
+from dataclasses import dataclass
+import pandas as pd
+from src.logger import get_logger
+from src.exception import CustomException
+
+logger = get_logger(__name__)
+
+ENCODINGS = ("numeric", "onehot", "frequency", "target", "hash", "text_hash", "drop")
+
+
+@dataclass
+class ColumnProfilerConfig:
+    onehot_max_cardinality: int = 50       # at most this many distinct values -> one-hot
+    onehot_top_k: int = 20                 # keep top-K categories, the rest share one "infrequent" column
+    high_cardinality_encoding: str = "frequency"   # "frequency", "target" or "hash"
+    free_text_unique_ratio: float = 0.5    # distinct/rows above this -> identifier / free text
+    text_encoding: str = "drop"            # "drop" or "text_hash"
+    identifier_columns: tuple = ("id",)
+    n_hash_features: int = 64
+
+
+class ColumnProfiler:
+    """
+    Profiles the training frame and decides an encoding per column by cardinality.
+    The resulting plan is a plain dict {column: {...}} so it can be saved as JSON
+    next to the preprocessor and read back by DataTransformation.
+    """
+    def __init__(self, config: ColumnProfilerConfig = None):
+        self.config = config or ColumnProfilerConfig()
+
+    def _encoding_for(self, series: pd.Series, n_unique: int, unique_ratio: float):
+        cfg = self.config
+        if series.name in cfg.identifier_columns:
+            return "drop", "identifier column"
+        if pd.api.types.is_numeric_dtype(series):
+            return "numeric", "numeric dtype"
+        if unique_ratio >= cfg.free_text_unique_ratio:
+            return cfg.text_encoding, f"near-unique values (ratio {unique_ratio:.2f}), treated as free text"
+        if n_unique <= cfg.onehot_max_cardinality:
+            return "onehot", f"{n_unique} distinct values"
+        return cfg.high_cardinality_encoding, f"{n_unique} distinct values exceeds one-hot limit"
+
+    def profile(self, df: pd.DataFrame, target_col: str = None):
+        try:
+            plan = {}
+            n_rows = max(len(df), 1)
+            for col in df.columns:
+                if col == target_col:
+                    continue
+                series = df[col]
+                n_unique = int(series.nunique(dropna=True))
+                unique_ratio = n_unique / n_rows
+                encoding, reason = self._encoding_for(series, n_unique, unique_ratio)
+                if encoding not in ENCODINGS:
+                    raise ValueError(f"Unknown encoding '{encoding}' for column {col}")
+                plan[col] = {
+                    "dtype": str(series.dtype),
+                    "n_unique": n_unique,
+                    "unique_ratio": round(unique_ratio, 4),
+                    "missing": int(series.isna().sum()),
+                    "encoding": encoding,
+                    "reason": reason,
+                }
+                logger.info(f"Column {col}: {encoding} ({reason})")
+            return plan
+        except Exception as e:
+            raise CustomException("Error profiling columns", e)
+
+    @staticmethod
+    def columns_by_encoding(plan: dict):
+        groups = {enc: [] for enc in ENCODINGS}
+        for col, info in plan.items():
+            groups[info["encoding"]].append(col)
+        return groups
@@ -1,7 +1,10 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from sklearn.model_selection import train_test_split
-from src.utils import read_csv
+from src.utils import read_table, write_table
+from src.schema import MOVIE_SCHEMA
+from src import schema, utils
+from src.stage_cache import StageCache
 from src.logger import get_logger
 from src.exception import CustomException
 
@@ -14,19 +17,30 @@ class DataIngestionConfig:
     test_data_path: str
     test_size: float = 0.2
     random_state: int = 42
+    schema: dict = field(default_factory=lambda: dict(MOVIE_SCHEMA))  # dtypes enforced on the raw CSV
 
 class DataIngestion:
-    def __init__(self, config: DataIngestionConfig):
+    def __init__(self, config: DataIngestionConfig, cache: StageCache = None):
         self.config = config
+        self.cache = cache
 
     def initiate_data_ingestion(self):
         logger.info("Starting data ingestion...")
         try:
-            df = read_csv(self.config.raw_data_path)
+            if self.cache is not None:
+                key = self.cache.key("ingestion", files=[self.config.raw_data_path], config=self.config,
+                                     sources=[__file__, schema.__file__, utils.__file__])
+                if self.cache.load("ingestion", key):
+                    return self.config.train_data_path, self.config.test_data_path
+
+            df = read_table(self.config.raw_data_path, schema=self.config.schema)
             train_df, test_df = train_test_split(df, test_size=self.config.test_size, random_state=self.config.random_state)
-            os.makedirs(os.path.dirname(self.config.train_data_path), exist_ok=True)
-            train_df.to_csv(self.config.train_data_path, index=False)
-            test_df.to_csv(self.config.test_data_path, index=False)
+            # .parquet/.feather splits keep the dtypes and skip text parsing on the next read
+            write_table(train_df, self.config.train_data_path)
+            write_table(test_df, self.config.test_data_path)
+            if self.cache is not None:
+                self.cache.store("ingestion", key, outputs={"train": self.config.train_data_path,
+                                                            "test": self.config.test_data_path})
             logger.info("Data ingestion complete")
             return self.config.train_data_path, self.config.test_data_path
         except Exception as e:
@@ -1,11 +1,19 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import numpy as np
 import pandas as pd
+import sklearn
+from scipy import sparse
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, TargetEncoder
 from sklearn.impute import SimpleImputer
-from src.utils import save_object, read_csv
+from src.utils import save_object, save_json, read_table, to_csr
+from src.schema import MOVIE_SCHEMA
+from src.column_profiler import ColumnProfiler, ColumnProfilerConfig
+from src.encoders import FrequencyEncoder, HashingEncoder
+from src import column_profiler, encoders, schema, utils
+from src.stage_cache import StageCache, save_matrix, load_matrix
 from src.logger import get_logger
 from src.exception import CustomException
 
@@ -14,11 +22,21 @@ logger = get_logger(__name__)
 @dataclass
 class DataTransformationConfig:
     preprocessor_path: str
+    sparse_output: bool = True    # keep one-hot features as CSR end-to-end
+    profile_columns: bool = True  # pick an encoding per column by cardinality instead of blanket one-hot
+    encoding_plan_path: str = None  # defaults to encoding_plan.json next to the preprocessor
+    profiler: ColumnProfilerConfig = field(default_factory=ColumnProfilerConfig)
+    schema: dict = field(default_factory=lambda: dict(MOVIE_SCHEMA))  # dtypes enforced on the train/test splits
+
+    def __post_init__(self):
+        if self.encoding_plan_path is None:
+            self.encoding_plan_path = os.path.join(os.path.dirname(self.preprocessor_path), "encoding_plan.json")
 
 class DataTransformation:
-    def __init__(self, config: DataTransformationConfig, target_col: str):
+    def __init__(self, config: DataTransformationConfig, target_col: str, cache: StageCache = None):
         self.config = config
         self.target_col = target_col
+        self.cache = cache
 
     def get_preprocessor(self, num_cols, cat_cols):
         num_pipeline = Pipeline(steps=[
@@ -27,32 +45,104 @@ class DataTransformation:
         ])
         cat_pipeline = Pipeline(steps=[
             ("imputer", SimpleImputer(strategy="most_frequent")),
-            ("encoder", OneHotEncoder(handle_unknown="ignore", sparse_output=False))
+            ("encoder", OneHotEncoder(handle_unknown="ignore", sparse_output=self.config.sparse_output))
         ])
+        # sparse_threshold=1.0 forces a CSR result whenever any block is sparse
         return ColumnTransformer([
             ("num", num_pipeline, num_cols),
             ("cat", cat_pipeline, cat_cols)
-        ])
+        ], sparse_threshold=1.0 if self.config.sparse_output else 0.0)
+
+    def get_profiled_preprocessor(self, plan):
+        """Build a ColumnTransformer from a ColumnProfiler plan; dropped columns fall to remainder='drop'."""
+        cfg = self.config.profiler
+        groups = ColumnProfiler.columns_by_encoding(plan)
+        transformers = []
+        if groups["numeric"]:
+            transformers.append(("num", Pipeline(steps=[
+                ("imputer", SimpleImputer(strategy="median")),
+                ("scaler", StandardScaler())
+            ]), groups["numeric"]))
+        if groups["onehot"]:
+            transformers.append(("onehot", Pipeline(steps=[
+                ("imputer", SimpleImputer(strategy="most_frequent")),
+                ("encoder", OneHotEncoder(handle_unknown="infrequent_if_exist",
+                                          max_categories=cfg.onehot_top_k + 1,
+                                          sparse_output=self.config.sparse_output))
+            ]), groups["onehot"]))
+        if groups["frequency"]:
+            transformers.append(("frequency", FrequencyEncoder(), groups["frequency"]))
+        if groups["target"]:
+            transformers.append(("target", TargetEncoder(target_type="continuous"), groups["target"]))
+        if groups["hash"]:
+            transformers.append(("hash", HashingEncoder(n_features=cfg.n_hash_features), groups["hash"]))
+        if groups["text_hash"]:
+            transformers.append(("text_hash", HashingEncoder(n_features=cfg.n_hash_features, tokenize=True),
+                                 groups["text_hash"]))
+        logger.info(f"Dropping columns: {groups['drop']}")
+        return ColumnTransformer(transformers, remainder="drop",
+                                 sparse_threshold=1.0 if self.config.sparse_output else 0.0)
+
+    def _cache_key(self, train_path, test_path):
+        return self.cache.key("transformation", files=[train_path, test_path], config=self.config,
+                              sources=[__file__, column_profiler.__file__, encoders.__file__, schema.__file__,
+                                       utils.__file__],
+                              extra={"target_col": self.target_col, "sklearn": sklearn.__version__})
+
+    def _load_cached(self, manifest):
+        X_train = load_matrix(self.cache.blob_file(manifest, "X_train"))
+        X_test = load_matrix(self.cache.blob_file(manifest, "X_test"))
+        y_train = pd.Series(np.load(self.cache.blob_file(manifest, "y_train")), name=self.target_col)
+        y_test = pd.Series(np.load(self.cache.blob_file(manifest, "y_test")), name=self.target_col)
+        return X_train, y_train, X_test, y_test
+
+    def _store_cached(self, key, X_train, y_train, X_test, y_test):
+        scratch = self.cache.scratch_dir()
+        blobs = {
+            "X_train": save_matrix(os.path.join(scratch, "X_train"), X_train),
+            "X_test": save_matrix(os.path.join(scratch, "X_test"), X_test),
+        }
+        for name, y in (("y_train", y_train), ("y_test", y_test)):
+            blobs[name] = os.path.join(scratch, f"{name}.npy")
+            np.save(blobs[name], np.asarray(y, dtype=np.float64))
+        outputs = {"preprocessor": self.config.preprocessor_path}
+        if self.config.profile_columns:
+            outputs["encoding_plan"] = self.config.encoding_plan_path
+        self.cache.store("transformation", key, outputs=outputs, blobs=blobs)
 
     def initiate_data_transformation(self, train_path, test_path):
         try:
-            train_df = read_csv(train_path)
-            test_df = read_csv(test_path)
-            num_cols = train_df.select_dtypes(include=["int64", "float64"]).columns.tolist()
-            cat_cols = train_df.select_dtypes(include=["object"]).columns.tolist()
-            if self.target_col in num_cols: num_cols.remove(self.target_col)
-            if self.target_col in cat_cols: cat_cols.remove(self.target_col)
-
-            preprocessor = self.get_preprocessor(num_cols, cat_cols)
+            if self.cache is not None:
+                key = self._cache_key(train_path, test_path)
+                manifest = self.cache.load("transformation", key)
+                if manifest:
+                    return self._load_cached(manifest)
+
+            train_df = read_table(train_path, schema=self.config.schema)
+            test_df = read_table(test_path, schema=self.config.schema)
             X_train = train_df.drop(columns=[self.target_col])
             y_train = train_df[self.target_col]
             X_test = test_df.drop(columns=[self.target_col])
             y_test = test_df[self.target_col]
 
-            preprocessor.fit(X_train)
+            if self.config.profile_columns:
+                plan = ColumnProfiler(self.config.profiler).profile(X_train)
+                save_json(self.config.encoding_plan_path, plan)
+                preprocessor = self.get_profiled_preprocessor(plan)
+            else:
+                num_cols = X_train.select_dtypes(include="number").columns.tolist()
+                cat_cols = X_train.select_dtypes(exclude="number").columns.tolist()
+                preprocessor = self.get_preprocessor(num_cols, cat_cols)
+
+            # fit_transform, not fit + transform: TargetEncoder cross-fits its training rows so
+            # no row is encoded with statistics that include its own target
+            X_train_t = to_csr(preprocessor.fit_transform(X_train, y_train))
             save_object(self.config.preprocessor_path, preprocessor)
-            logger.info("Data transformation complete")
-            return (preprocessor.transform(X_train), y_train,
-                    preprocessor.transform(X_test), y_test)
+            X_test_t = to_csr(preprocessor.transform(X_test))
+            logger.info(f"Data transformation complete: {X_train_t.shape[1]} features, "
+                        f"{'sparse' if sparse.issparse(X_train_t) else 'dense'} output")
+            if self.cache is not None:
+                self._store_cached(key, X_train_t, y_train, X_test_t, y_test)
+            return X_train_t, y_train, X_test_t, y_test
         except Exception as e:
             raise CustomException("Error in data transformation", e)
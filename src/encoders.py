@@ -0,0 +1,74 @@
+# src/encoders.py
+import re
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction import FeatureHasher
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _as_frame(X):
+    # ColumnTransformer passes DataFrames; plain arrays are wrapped so both work
+    df = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X)
+    return df.astype(object).where(df.notna(), "").astype(str)
+
+
+class FrequencyEncoder(BaseEstimator, TransformerMixin):
+    """
+    Replace each category by its relative frequency in the training data.
+    One output column per input column; unseen categories map to 0.
+    """
+    def fit(self, X, y=None):
+        df = _as_frame(X)
+        self.feature_names_in_ = np.asarray(df.columns, dtype=object)
+        self.n_features_in_ = df.shape[1]
+        self.frequencies_ = [df[c].value_counts(normalize=True).to_dict() for c in df.columns]
+        return self
+
+    def transform(self, X):
+        df = _as_frame(X)
+        out = np.zeros(df.shape, dtype=np.float64)
+        for j, freq in enumerate(self.frequencies_):
+            out[:, j] = df.iloc[:, j].map(freq).fillna(0.0).to_numpy(dtype=np.float64)
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        names = self.feature_names_in_ if input_features is None else input_features
+        return np.asarray([f"{c}_freq" for c in names], dtype=object)
+
+
+class HashingEncoder(BaseEstimator, TransformerMixin):
+    """
+    Hash "column=value" (or "column=token" when tokenize=True) into a fixed
+    number of sparse features. Stateless apart from the input column names, so
+    the fitted object stays tiny whatever the column cardinality.
+    """
+    def __init__(self, n_features=64, tokenize=False):
+        self.n_features = n_features
+        self.tokenize = tokenize
+
+    def fit(self, X, y=None):
+        df = _as_frame(X)
+        self.feature_names_in_ = np.asarray(df.columns, dtype=object)
+        self.n_features_in_ = df.shape[1]
+        return self
+
+    def _tokens(self, df):
+        cols = [str(c) for c in self.feature_names_in_]
+        if self.tokenize:
+            for row in df.itertuples(index=False):
+                yield [f"{c}={t.lower()}" for c, v in zip(cols, row) for t in _TOKEN_RE.findall(v)]
+        else:
+            for row in df.itertuples(index=False):
+                yield [f"{c}={v}" for c, v in zip(cols, row)]
+
+    def transform(self, X):
+        df = _as_frame(X)
+        hasher = FeatureHasher(n_features=self.n_features, input_type="string", alternate_sign=False)
+        return sparse.csr_matrix(hasher.transform(self._tokens(df)), dtype=np.float64)
+
+    def get_feature_names_out(self, input_features=None):
+        prefix = "_".join(str(c) for c in self.feature_names_in_)
+        return np.asarray([f"{prefix}_hash{i}" for i in range(self.n_features)], dtype=object)
@@ -1,12 +1,67 @@
 import sys
-import traceback
+import traceback as tb_module
+
+
+class ErrorCode:
+    """Stable identifiers for failure classes; returned to API clients and used as metric labels."""
+    INTERNAL = "internal_error"
+    VALIDATION = "validation_error"  # bad input values
+    DATA = "data_error"              # unreadable / malformed data files
+    ARTIFACT = "artifact_error"      # missing or unloadable model / preprocessor artifacts
+
+    @staticmethod
+    def of(e):
+        return getattr(e, "code", None) or ErrorCode.INTERNAL
+
+    @staticmethod
+    def http_status(code):
+        return 400 if code == ErrorCode.VALIDATION else 500
+
 
 class CustomException(Exception):
-    def __init__(self, message, errors=None):
+    """
+    Wraps a lower-level error with a message and an error code.
+
+    Only references are kept when it is raised (the active exception's
+    traceback, or a line-less stack summary when there is none); the text is
+    built the first time `.traceback` is read, so layers that wrap and
+    re-raise cost almost nothing unless someone actually prints the result.
+    `code` defaults to the wrapped CustomException's code, so the root cause
+    survives re-wrapping.
+    """
+    def __init__(self, message, errors=None, code=None):
         super().__init__(message)
+        self.message = message
         self.errors = errors
-        _, _, tb = sys.exc_info()
-        self.traceback = ''.join(traceback.format_stack()[:-1]) if tb is None else ''.join(traceback.format_exception(*sys.exc_info()))
+        self.code = code or getattr(errors, "code", None) or ErrorCode.INTERNAL
+        exc_info = sys.exc_info()
+        self._exc_info = exc_info if exc_info[2] is not None else None
+        self._stack = None
+        if self._exc_info is None:
+            self._stack = tb_module.StackSummary.extract(tb_module.walk_stack(sys._getframe(1)), lookup_lines=False)
+            self._stack.reverse()
+        self._traceback = None
+
+    @property
+    def traceback(self):
+        if self._traceback is None:
+            if self._exc_info is not None:
+                self._traceback = ''.join(tb_module.format_exception(*self._exc_info))
+            else:
+                self._traceback = ''.join(self._stack.format())
+            self._exc_info = self._stack = None  # frames are no longer needed once formatted
+        return self._traceback
+
+    def to_dict(self):
+        return {"error": self.message, "code": self.code}
 
     def __str__(self):
-        return f"{self.args[0]}\nDetails: {self.errors}\nTraceback:\n{self.traceback}"
+        return self.message if self.errors is None else f"{self.message}: {self.errors}"
+
+    def __reduce__(self):
+        # traceback objects do not pickle (process pools send exceptions back); ship the text instead
+        return (type(self), (self.message, self.errors, self.code), {"_traceback": self.traceback})
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._exc_info = self._stack = None
@@ -0,0 +1,206 @@
+# src/fast_transform.py
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from src.encoders import FrequencyEncoder
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _is_missing(v):
+    return v is None or (isinstance(v, float) and v != v)
+
+
+class _NumericBlock:
+    """SimpleImputer(median/mean/constant) -> StandardScaler on float columns."""
+    def __init__(self, idx, fill, mean, scale):
+        self.idx, self.fill, self.mean, self.scale = idx, fill, mean, scale
+        self.width = len(idx)
+
+    def transform(self, rows, out, start):
+        block = np.array([[row[i] for i in self.idx] for row in rows], dtype=np.float64)
+        if self.fill is not None:
+            nan = np.isnan(block)
+            if nan.any():
+                block[nan] = np.broadcast_to(self.fill, block.shape)[nan]
+        if self.mean is not None:
+            block -= self.mean
+        if self.scale is not None:
+            block /= self.scale
+        out[:, start:start + self.width] = block
+
+
+class _OneHotBlock:
+    """SimpleImputer(most_frequent) -> OneHotEncoder as one category->column dict per input column."""
+    def __init__(self, idx, fill, maps, unknown, offsets, width):
+        self.idx, self.fill, self.maps, self.unknown, self.offsets = idx, fill, maps, unknown, offsets
+        self.width = width
+
+    def transform(self, rows, out, start):
+        for r, row in enumerate(rows):
+            for j, i in enumerate(self.idx):
+                v = row[i]
+                if self.fill is not None and _is_missing(v):
+                    v = self.fill[j]
+                col = self.maps[j].get(v, self.unknown[j])
+                if col >= 0:
+                    out[r, start + self.offsets[j] + col] = 1.0
+
+
+class _FrequencyBlock:
+    def __init__(self, idx, frequencies):
+        self.idx, self.frequencies = idx, frequencies
+        self.width = len(idx)
+
+    def transform(self, rows, out, start):
+        for r, row in enumerate(rows):
+            for j, i in enumerate(self.idx):
+                v = row[i]
+                out[r, start + j] = self.frequencies[j].get("" if _is_missing(v) else str(v), 0.0)
+
+
+class _SklearnBlock:
+    """Anything without a fast equivalent: call the fitted transformer on a small frame."""
+    def __init__(self, idx, names, transformer, width):
+        self.idx, self.names, self.transformer, self.width = idx, names, transformer, width
+
+    def transform(self, rows, out, start):
+        frame = pd.DataFrame({n: np.array([row[i] for row in rows], dtype=object)
+                              for n, i in zip(self.names, self.idx)})
+        block = self.transformer.transform(frame)
+        out[:, start:start + self.width] = block.toarray() if sparse.issparse(block) else block
+
+
+class FastPreprocessor:
+    """
+    Re-implements a fitted ColumnTransformer's transform for row tuples from its
+    learned parameters (imputer statistics, scaler moments, category lookups).
+    Skips sklearn's per-call validation and pandas frame building, which dominate
+    single-row latency. Output is a dense float64 matrix with the same columns as
+    the ColumnTransformer. Use `from_column_transformer`, which verifies the
+    result against sklearn before handing it out.
+    """
+    def __init__(self, columns, blocks):
+        self.columns = list(columns)
+        self.blocks = blocks
+        self.n_features_out = sum(b.width for b in blocks)
+
+    def transform_rows(self, rows):
+        out = np.zeros((len(rows), self.n_features_out), dtype=np.float64)
+        start = 0
+        for block in self.blocks:
+            block.transform(rows, out, start)
+            start += block.width
+        return out
+
+    @staticmethod
+    def _block_for(transformer, idx, names, width):
+        steps = transformer.steps if isinstance(transformer, Pipeline) else [("only", transformer)]
+        est = [s for _, s in steps]
+        imputer = est[0] if isinstance(est[0], SimpleImputer) else None
+        rest = est[1:] if imputer is not None else est
+        if imputer is not None and (imputer.add_indicator or _stats_have_gaps(imputer.statistics_)):
+            return _SklearnBlock(idx, names, transformer, width)
+
+        if all(isinstance(s, StandardScaler) for s in rest) and len(rest) <= 1 and \
+                (imputer is None or imputer.strategy in ("mean", "median", "constant")):
+            scaler = rest[0] if rest else None
+            fill = None if imputer is None else imputer.statistics_.astype(np.float64)
+            mean = scaler.mean_ if scaler is not None and scaler.with_mean else None
+            scale = scaler.scale_ if scaler is not None and scaler.with_std else None
+            return _NumericBlock(idx, fill, mean, scale)
+
+        if len(rest) == 1 and isinstance(rest[0], OneHotEncoder) and rest[0].drop is None:
+            enc = rest[0]
+            infrequent = getattr(enc, "infrequent_categories_", [None] * len(idx))
+            maps, unknown, offsets, offset = [], [], [], 0
+            for cats, infreq in zip(enc.categories_, infrequent):
+                infreq_set = set() if infreq is None else set(infreq.tolist())
+                frequent = [c for c in cats.tolist() if c not in infreq_set]
+                mapping = {c: k for k, c in enumerate(frequent)}
+                n_out = len(frequent)
+                if infreq_set:
+                    mapping.update({c: n_out for c in infreq_set})
+                    unk = n_out if enc.handle_unknown == "infrequent_if_exist" else -1
+                    n_out += 1
+                else:
+                    unk = -1
+                maps.append(mapping)
+                unknown.append(unk)
+                offsets.append(offset)
+                offset += n_out
+            fill = None if imputer is None else list(imputer.statistics_)
+            return _OneHotBlock(idx, fill, maps, unknown, offsets, offset)
+
+        if len(est) == 1 and isinstance(transformer, FrequencyEncoder):
+            return _FrequencyBlock(idx, transformer.frequencies_)
+
+        return _SklearnBlock(idx, names, transformer, width)
+
+    @classmethod
+    def from_column_transformer(cls, ct, columns, probe_frame=None):
+        """Return a FastPreprocessor equivalent to `ct`, or None if it cannot be matched exactly."""
+        try:
+            if getattr(ct, "transformers_", None) is None:
+                return None
+            position = {c: i for i, c in enumerate(columns)}
+            names_out = ct.get_feature_names_out()
+            blocks, consumed = [], 0
+            for name, transformer, cols in ct.transformers_:
+                if transformer == "drop" or len(cols) == 0:
+                    continue
+                if name == "remainder" or transformer == "passthrough" or not isinstance(cols, list):
+                    return None
+                width = sum(1 for n in names_out[consumed:] if n.startswith(f"{name}__"))
+                blocks.append(cls._block_for(transformer, [position[c] for c in cols], cols, width))
+                consumed += width
+            fast = cls(columns, blocks)
+            if fast.n_features_out != len(names_out) or not fast._matches(ct, probe_frame):
+                logger.warning("Fast transform does not match the fitted preprocessor; using sklearn")
+                return None
+            return fast
+        except Exception:
+            logger.exception("Could not build fast transform; using sklearn")
+            return None
+
+    def _probe_rows(self):
+        # every known category of every lookup block, plus unknown and missing values
+        n = 3
+        for b in self.blocks:
+            for m in getattr(b, "maps", []) + getattr(b, "frequencies", []):
+                n = max(n, len(m) + 2)
+        rows = [[np.nan] * len(self.columns) for _ in range(n)]
+        for b in self.blocks:
+            for j, i in enumerate(b.idx):
+                if isinstance(b, _NumericBlock):
+                    base = 0.0 if b.fill is None else float(b.fill[j])
+                    values = [base * (1 + r / n) + r for r in range(n - 1)] + [np.nan]
+                else:
+                    keys = list(b.maps[j]) if isinstance(b, _OneHotBlock) else \
+                        list(b.frequencies[j]) if isinstance(b, _FrequencyBlock) else []
+                    values = keys + ["__unseen__"] * (n - len(keys))
+                for r in range(n):
+                    rows[r][i] = values[r % len(values)]
+        return [tuple(r) for r in rows]
+
+    def _matches(self, ct, probe_frame):
+        rows = self._probe_rows()
+        if probe_frame is not None:
+            rows += [tuple(r) for r in probe_frame[self.columns].itertuples(index=False)]
+        frame = pd.DataFrame({c: np.array([r[i] for r in rows],
+                                          dtype=object if any(isinstance(r[i], str) for r in rows) else np.float64)
+                              for i, c in enumerate(self.columns)})
+        expected = ct.transform(frame)
+        expected = expected.toarray() if sparse.issparse(expected) else np.asarray(expected, dtype=np.float64)
+        return np.array_equal(expected, self.transform_rows(rows), equal_nan=True)
+
+
+def _stats_have_gaps(stats):
+    try:
+        return bool(np.isnan(np.asarray(stats, dtype=np.float64)).any())
+    except (TypeError, ValueError):
+        return any(_is_missing(s) for s in stats)
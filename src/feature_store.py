@@ -0,0 +1,206 @@
+# src/feature_store.py
+"""
+Transformed-feature store for re-scoring a catalogue whose rows mostly do not change.
+
+Rows of preprocessor.transform output are stored keyed by movie id together
+with a hash of the raw row. A later run transforms only the rows whose id is
+new or whose raw values changed; the others are gathered from memory-mapped
+CSR segments. A nightly re-score then pays transform cost in proportion to
+the churn, not the catalogue size.
+
+Layout (one directory per preprocessor version; a new preprocessor starts empty
+and the stale directories are removed on its first write):
+    <store_dir>/<preprocessor sha256[:16]>/seg-000001/{ids,hashes,data,indices,indptr}.npy + meta.json
+
+Segments are written to a temp dir and renamed into place, so readers only see
+whole segments. A changed row is appended to a new segment and the latest
+segment wins. Once there are more than max_segments, the live rows are merged
+into one. One writer at a time.
+
+    store = pipeline.open_feature_store("artifacts/feature_store")
+    pipeline.predict_from_csv("catalogue.csv", output_path="scores.parquet", feature_store=store)
+"""
+import os
+import shutil
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from src.utils import save_json, load_json
+from src import metrics
+from src.logger import get_logger
+from src.exception import CustomException, ErrorCode
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class FeatureStoreConfig:
+    store_dir: str
+    id_column: str = "id"
+    max_segments: int = 64    # merge the live rows into one segment beyond this many
+    mmap_mode: str = "r"
+
+
+class _Segment:
+    def __init__(self, path, mmap_mode):
+        meta = load_json(os.path.join(path, "meta.json"))
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ("ids", "hashes", "data", "indices", "indptr")}
+        self.path = path
+        self.ids = arrays["ids"]
+        self.hashes = arrays["hashes"]
+        self.matrix = sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]),
+                                        shape=tuple(meta["shape"]), copy=False)
+
+    @staticmethod
+    def write(path, ids, hashes, matrix):
+        tmp = os.path.join(os.path.dirname(path), f".tmp-{os.getpid()}-{os.path.basename(path)}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, arr in (("ids", ids), ("hashes", hashes), ("data", matrix.data),
+                          ("indices", matrix.indices), ("indptr", matrix.indptr)):
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr))
+        save_json(os.path.join(tmp, "meta.json"), {"shape": list(matrix.shape), "rows": int(matrix.shape[0])})
+        os.replace(tmp, path)
+
+
+class FeatureStore:
+    def __init__(self, config: FeatureStoreConfig, preprocessor_sha256: str, columns):
+        """columns: the raw columns fed to the preprocessor; all but the id column go into the row hash."""
+        self.config = config
+        self.version_dir = os.path.join(config.store_dir, preprocessor_sha256[:16])
+        self.hash_columns = [c for c in columns if c != config.id_column]
+        self.hits = self.misses = 0
+        self._load()
+
+    def _segment_dirs(self):
+        if not os.path.isdir(self.version_dir):
+            return []
+        return sorted(d for d in os.listdir(self.version_dir) if d.startswith("seg-"))
+
+    def _load(self):
+        try:
+            self._segments = [_Segment(os.path.join(self.version_dir, d), self.config.mmap_mode)
+                              for d in self._segment_dirs()]
+            self._starts = np.cumsum([0] + [s.matrix.shape[0] for s in self._segments])
+            if self._segments:
+                ids = np.concatenate([s.ids for s in self._segments])
+                self._hashes = np.concatenate([s.hashes for s in self._segments])
+                positions = pd.Series(np.arange(len(ids)), index=ids)
+                # a changed row lives in several segments; the latest one is current
+                self._lookup = positions[~positions.index.duplicated(keep="last")]
+            else:
+                self._hashes = np.zeros(0, dtype=np.uint64)
+                self._lookup = pd.Series(np.zeros(0, dtype=np.int64), index=pd.Index([], dtype=np.float64))
+            logger.info(f"Feature store {self.version_dir}: {len(self._lookup)} rows in {len(self._segments)} segments")
+        except Exception as e:
+            raise CustomException(f"Failed to open feature store at {self.version_dir}", e, code=ErrorCode.ARTIFACT)
+
+    def __len__(self):
+        return len(self._lookup)
+
+    def _keys(self, df):
+        """Ids as float64 keys (numeric catalogue ids) or str, and the mask of rows that have one."""
+        ids = df[self.config.id_column]
+        numeric = pd.to_numeric(ids, errors="coerce")
+        if numeric.notna().sum() == ids.notna().sum():
+            return numeric.to_numpy(dtype=np.float64), numeric.notna().to_numpy()
+        return ids.astype(str).to_numpy(dtype=str), ids.notna().to_numpy()
+
+    def row_hashes(self, df):
+        return pd.util.hash_pandas_object(df[self.hash_columns], index=False).to_numpy()
+
+    def _gather(self, positions):
+        """CSR rows at global store positions, in the order given."""
+        seg = np.searchsorted(self._starts, positions, side="right") - 1
+        order = np.argsort(seg, kind="stable")
+        pieces = []
+        for s in np.unique(seg):
+            rows = positions[order][seg[order] == s] - self._starts[s]
+            pieces.append(self._segments[s].matrix[rows])
+        stacked = sparse.vstack(pieces, format="csr")
+        return stacked[np.argsort(order)]
+
+    def transform(self, df: pd.DataFrame, transform_fn):
+        """
+        transform_fn(df) for the rows the store does not hold unchanged; stored
+        rows for the rest. Rows without an id are transformed and not stored.
+        Returns a CSR matrix in df's row order.
+        """
+        if self.config.id_column not in df.columns:
+            return transform_fn(df)
+        with metrics.timer("predict_stage_seconds", stage="feature_store"):
+            keys, has_id = self._keys(df)
+            hashes = self.row_hashes(df)
+            pos = np.full(len(df), -1, dtype=np.int64)
+            if len(self._lookup) and has_id.any():
+                try:
+                    found = self._lookup.reindex(keys[has_id]).to_numpy()
+                except TypeError:
+                    found = np.full(int(has_id.sum()), np.nan)  # str ids against a numeric store or vice versa
+                pos[has_id] = np.where(np.isnan(found), -1, found).astype(np.int64)
+            hit = pos >= 0
+            hit[hit] = self._hashes[pos[hit]] == hashes[hit]
+            hit_idx, miss_idx = np.flatnonzero(hit), np.flatnonzero(~hit)
+            X_hit = self._gather(pos[hit_idx]) if len(hit_idx) else None
+        # the preprocessor may return a dense array (sparse_output=False, no one-hot columns)
+        X_miss = sparse.csr_matrix(transform_fn(df.iloc[miss_idx])) if len(miss_idx) else None
+        self.hits += len(hit_idx)
+        self.misses += len(miss_idx)
+        metrics.inc("feature_store_rows_total", len(hit_idx), result="hit")
+        metrics.inc("feature_store_rows_total", len(miss_idx), result="miss")
+        if X_miss is None:
+            return X_hit
+        store = has_id[miss_idx]
+        if store.any():
+            self._append(keys[miss_idx][store], hashes[miss_idx][store], X_miss[np.flatnonzero(store)])
+        if X_hit is None:
+            return X_miss
+        stacked = sparse.vstack([X_hit, X_miss], format="csr")
+        return stacked[np.argsort(np.concatenate([hit_idx, miss_idx]))]
+
+    def _append(self, keys, hashes, X):
+        try:
+            if not self._segments:
+                self._drop_stale_versions()
+            os.makedirs(self.version_dir, exist_ok=True)
+            existing = self._segment_dirs()
+            number = int(existing[-1].split("-")[1]) + 1 if existing else 1
+            _Segment.write(os.path.join(self.version_dir, f"seg-{number:06d}"), keys, hashes, sparse.csr_matrix(X))
+            if len(existing) + 1 > self.config.max_segments:
+                self.compact()
+            else:
+                self._load()
+        except Exception as e:
+            raise CustomException(f"Failed to write feature store segment in {self.version_dir}", e,
+                                  code=ErrorCode.ARTIFACT)
+
+    def compact(self):
+        """Merge the live rows of every segment into one new segment and drop the old ones."""
+        old = self._segment_dirs()
+        if len(old) < 2:
+            return
+        live = self._lookup.to_numpy()
+        matrix = self._gather(live)
+        number = int(old[-1].split("-")[1]) + 1
+        _Segment.write(os.path.join(self.version_dir, f"seg-{number:06d}"),
+                       self._lookup.index.to_numpy(), self._hashes[live], matrix)
+        for d in old:
+            shutil.rmtree(os.path.join(self.version_dir, d), ignore_errors=True)
+        logger.info(f"Compacted feature store: {len(old)} segments -> 1 ({len(live)} rows)")
+        self._load()
+
+    def _drop_stale_versions(self):
+        if not os.path.isdir(self.config.store_dir):
+            return
+        for d in os.listdir(self.config.store_dir):
+            path = os.path.join(self.config.store_dir, d)
+            if path != self.version_dir and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info(f"Removed feature store for an older preprocessor: {path}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"rows": len(self), "segments": len(self._segments), "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
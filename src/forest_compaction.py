@@ -0,0 +1,251 @@
+# src/forest_compaction.py
+"""
+Post-training compaction of a fitted RandomForestRegressor into a smaller
+CompiledForest (src/forest_engine.py) served with backend="compact".
+
+Three steps, each bounded by `tolerance` (allowed drop in R2 on the test
+split relative to the uncompacted model):
+  1. prune   collapse internal nodes whose split removes less than `min_gain`
+             of the root's squared error and whose children are leaves
+             (bottom-up); min_gain is lowered while pruning alone costs more
+             than half the tolerance
+  2. quantize thresholds and leaf values as float32, feature ids as int16.
+             Thresholds are rounded down to the nearest float32, which is
+             exact for the float32 inputs the engine compares them with
+  3. select  greedy forward selection of the fewest trees whose average stays
+             within the tolerance. Trees are picked on every other test row
+             and the remaining rows must confirm the tolerance too, so the
+             subset does not just fit the rows it was chosen on
+The artifact records the sha256 of the model it came from and PredictPipeline
+ignores it once random_forest.joblib changes (incremental / out-of-core runs).
+
+    python -m src.forest_compaction --tolerance 0.005
+"""
+import argparse
+import os
+import time
+from dataclasses import dataclass
+import numpy as np
+from src.forest_engine import CompiledForest
+from src.utils import load_object, save_json, file_sha256, read_table
+from src.logger import get_logger
+from src.exception import CustomException
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ForestCompactionConfig:
+    compact_model_dir: str
+    tolerance: float = 0.005       # max R2 drop vs the uncompacted model on the test split
+    min_gain: float = 1e-4         # starting prune threshold, fraction of the root's squared error
+    min_gain_floor: float = 1e-7   # below this, pruning is switched off
+    quantize: bool = True
+    report_path: str = None        # defaults to compaction_report.json next to the compact model
+
+
+def _r2(y, preds):
+    """R2 of each column of preds (n_rows x k) against y."""
+    y = np.asarray(y, dtype=np.float64)
+    sst = np.sum((y - y.mean()) ** 2)
+    sse = np.sum((preds - y[:, None]) ** 2, axis=0)
+    return 1.0 - sse / sst if sst > 0 else np.zeros(preds.shape[1])
+
+
+def _dir_bytes(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def _best_seconds(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def prune_tree(tree, min_gain):
+    """Local node arrays (CompiledForest.tree_arrays layout) of `tree` with low-gain subtrees collapsed."""
+    left, right = tree.children_left, tree.children_right
+    sse = tree.weighted_n_node_samples * tree.impurity
+    leaf = left == -1
+    if min_gain > 0 and sse[0] > 0:
+        # sklearn numbers children after their parent, so a reverse sweep is bottom-up
+        for node in range(tree.node_count - 1, -1, -1):
+            if leaf[node]:
+                continue
+            l, r = left[node], right[node]
+            if leaf[l] and leaf[r] and (sse[node] - sse[l] - sse[r]) < min_gain * sse[0]:
+                leaf[node] = True
+    keep = np.zeros(tree.node_count, dtype=bool)
+    keep[0] = True
+    depth = np.zeros(tree.node_count, dtype=np.int32)
+    for node in range(tree.node_count):
+        if keep[node] and not leaf[node]:
+            keep[left[node]] = keep[right[node]] = True
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    old_ids = np.flatnonzero(keep)
+    new_id = np.full(tree.node_count, -1, dtype=np.int32)
+    new_id[old_ids] = np.arange(len(old_ids), dtype=np.int32)
+    is_leaf = leaf[old_ids]
+    self_ids = np.arange(len(old_ids), dtype=np.int32)
+    mgl = getattr(tree, "missing_go_to_left", None)
+    return {
+        "feature": np.where(is_leaf, 0, tree.feature[old_ids]).astype(np.int32),
+        "threshold": np.where(is_leaf, -2.0, tree.threshold[old_ids]).astype(np.float64),
+        "left": np.where(is_leaf, self_ids, new_id[left[old_ids]]).astype(np.int32),
+        "right": np.where(is_leaf, self_ids, new_id[right[old_ids]]).astype(np.int32),
+        "value": tree.value[old_ids, 0, 0].astype(np.float64),
+        "missing_left": (np.zeros(len(old_ids), dtype=bool) if mgl is None
+                         else np.asarray(mgl, dtype=bool)[old_ids]),
+        "max_depth": int(depth[old_ids].max()),
+    }
+
+
+def quantize_tree(arrays, n_features_in):
+    """float32 thresholds/values and int16 feature ids; node links stay int32 (forests exceed 32k nodes)."""
+    threshold = arrays["threshold"].astype(np.float32)
+    # x <= t holds for a float32 x exactly when x <= (largest float32 <= t)
+    up = threshold.astype(np.float64) > arrays["threshold"]
+    threshold[up] = np.nextafter(threshold[up], np.float32(-np.inf))
+    feature_dtype = np.int16 if n_features_in <= np.iinfo(np.int16).max else np.int32
+    return {**arrays, "threshold": threshold, "value": arrays["value"].astype(np.float32),
+            "feature": arrays["feature"].astype(feature_dtype)}
+
+
+def build_forest(trees, n_features_in):
+    forest = CompiledForest.from_trees(trees, n_features_in)
+    if forest.feature.dtype == np.int16:
+        # the derived tables follow the stored dtypes so a memory-mapped load stays small too
+        forest.local_feature = forest.local_feature.astype(np.int16)
+        forest.used_features = forest.used_features.astype(np.int16)
+    return forest
+
+
+def select_trees(leaves, y, base_preds, tolerance):
+    """
+    Greedy forward selection over leaf value columns (n_rows x n_trees). Trees are
+    scored on the even rows; selection stops once the average is within `tolerance`
+    of base_preds' R2 on both the even and the odd rows.
+    """
+    leaves = np.asarray(leaves, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    pick_rows, check_rows = np.arange(0, len(y), 2), np.arange(1, len(y), 2)
+    targets = [float(_r2(y[rows], base_preds[rows, None])[0]) - tolerance for rows in (pick_rows, check_rows)]
+    total = np.zeros(len(y))
+    chosen, remaining = [], list(range(leaves.shape[1]))
+    while remaining:
+        scores = _r2(y[pick_rows], (total[pick_rows, None] + leaves[pick_rows][:, remaining]) / (len(chosen) + 1))
+        tree = remaining.pop(int(np.argmax(scores)))
+        chosen.append(tree)
+        total += leaves[:, tree]
+        preds = total / len(chosen)
+        if all(_r2(y[rows], preds[rows, None])[0] >= target for rows, target in zip((pick_rows, check_rows), targets)):
+            break
+    return chosen
+
+
+class ForestCompactor:
+    def __init__(self, config: ForestCompactionConfig):
+        self.config = config
+
+    def _prune(self, model, X_test, y_test, base_r2):
+        min_gain = self.config.min_gain
+        while True:
+            trees = [prune_tree(est.tree_, min_gain) for est in model.estimators_]
+            if self.config.quantize:
+                trees = [quantize_tree(t, model.n_features_in_) for t in trees]
+            forest = build_forest(trees, model.n_features_in_)
+            r2 = float(_r2(y_test, forest.predict(X_test)[:, None])[0])
+            if r2 >= base_r2 - self.config.tolerance / 2 or min_gain == 0:
+                return trees, forest, min_gain, r2
+            logger.info(f"Pruning at min_gain={min_gain:g} costs {base_r2 - r2:.4f} R2 -> lowering it")
+            min_gain = min_gain / 10 if min_gain / 10 >= self.config.min_gain_floor else 0.0
+
+    def _measure(self, model, model_path, compact, X_test):
+        """Artifact size, load time and predict latency: sklearn model vs the compact forest."""
+        single = X_test[:1]
+        full = CompiledForest.from_sklearn(model)
+        result = {
+            "size_bytes": {"sklearn": _dir_bytes(model_path), "compact": _dir_bytes(self.config.compact_model_dir)},
+            "load_seconds": {
+                "sklearn": round(_best_seconds(lambda: load_object(model_path), repeat=3), 4),
+                "compact": round(_best_seconds(lambda: CompiledForest.load(self.config.compact_model_dir), 3), 4),
+            },
+            "predict_ms": {},
+        }
+        for name, rows in (("batch_1", single), (f"batch_{X_test.shape[0]}", X_test)):
+            result["predict_ms"][name] = {
+                "sklearn": round(_best_seconds(lambda: model.predict(rows)) * 1e3, 3),
+                "compiled": round(_best_seconds(lambda: full.predict(rows)) * 1e3, 3),
+                "compact": round(_best_seconds(lambda: compact.predict(rows)) * 1e3, 3),
+            }
+        return result
+
+    def initiate_compaction(self, model, model_path, X_test, y_test):
+        """Writes the compact forest and its report; returns the report. model must be saved at model_path."""
+        try:
+            y_test = np.asarray(y_test, dtype=np.float64)
+            base_preds = model.predict(X_test)
+            base_r2 = float(_r2(y_test, base_preds[:, None])[0])
+
+            trees, pruned, min_gain, pruned_r2 = self._prune(model, X_test, y_test, base_r2)
+            chosen = select_trees(pruned.leaf_values(X_test), y_test, base_preds, self.config.tolerance)
+            compact = build_forest([trees[t] for t in chosen], model.n_features_in_)
+            compact_preds = compact.predict(X_test)
+            compact_r2 = float(_r2(y_test, compact_preds[:, None])[0])
+
+            report = {
+                "tolerance": self.config.tolerance,
+                "min_gain": min_gain,
+                "quantized": self.config.quantize,
+                "n_estimators": {"sklearn": len(model.estimators_), "compact": compact.n_estimators},
+                "n_nodes": {"sklearn": int(sum(est.tree_.node_count for est in model.estimators_)),
+                            "pruned": int(len(pruned.left)), "compact": int(len(compact.left))},
+                "r2": {"sklearn": base_r2, "pruned": pruned_r2, "compact": compact_r2},
+                # mean |compact - sklearn| as a fraction of the mean |sklearn| prediction
+                "mean_abs_diff_ratio": float(np.mean(np.abs(compact_preds - base_preds)) / np.mean(np.abs(base_preds))),
+                "trees": [int(t) for t in chosen],
+            }
+            compact.save(self.config.compact_model_dir,
+                         extra_meta={"source_model_sha256": file_sha256(model_path), "compaction": report})
+            report.update(self._measure(model, model_path, compact, X_test))
+            report_path = self.config.report_path or os.path.join(
+                os.path.dirname(self.config.compact_model_dir), "compaction_report.json")
+            save_json(report_path, report)
+            logger.info(f"Compacted forest {report['n_estimators']['sklearn']} -> {compact.n_estimators} trees, "
+                        f"{report['n_nodes']['sklearn']} -> {report['n_nodes']['compact']} nodes, "
+                        f"R2 {base_r2:.4f} -> {compact_r2:.4f}, "
+                        f"{report['size_bytes']['sklearn']} -> {report['size_bytes']['compact']} bytes; "
+                        f"report at {report_path}")
+            return report
+        except Exception as e:
+            logger.exception("Forest compaction failed")
+            raise CustomException("Forest compaction failed", e)
+
+
+def main(argv=None):
+    base = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Compact the trained forest for backend='compact'.")
+    parser.add_argument("--artifacts-dir", default=os.path.join(base, "artifacts"))
+    parser.add_argument("--tolerance", type=float, default=ForestCompactionConfig.tolerance)
+    parser.add_argument("--min-gain", type=float, default=ForestCompactionConfig.min_gain)
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--target-col", default="revenue")
+    args = parser.parse_args(argv)
+    model_path = os.path.join(args.artifacts_dir, "models", "random_forest.joblib")
+    preprocessor = load_object(os.path.join(args.artifacts_dir, "transformer", "preprocessor.joblib"))
+    test_df = read_table(os.path.join(args.artifacts_dir, "data", "test.parquet"))
+    X_test = preprocessor.transform(test_df.drop(columns=[args.target_col]))
+    report = ForestCompactor(ForestCompactionConfig(
+        compact_model_dir=os.path.join(args.artifacts_dir, "models", "random_forest_compact"),
+        tolerance=args.tolerance, min_gain=args.min_gain, quantize=not args.no_quantize
+    )).initiate_compaction(load_object(model_path), model_path, X_test, test_df[args.target_col])
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
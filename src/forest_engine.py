@@ -0,0 +1,170 @@
+# src/forest_engine.py
+import os
+import numpy as np
+from scipy import sparse
+from src.utils import save_json, load_json
+from src.exception import CustomException
+
+TREE_LEAF = -1
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestRegressor flattened into contiguous NumPy arrays.
+
+    All trees share one node table (feature, threshold, left, right, value);
+    `roots` holds the index of each tree's root and leaves point to themselves.
+    A batch is traversed by repeating one vectorized step over all (row, tree)
+    pairs that have not reached a leaf yet. No sklearn input validation or
+    thread dispatch happens per call.
+    """
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "missing_left")
+    # derived lookup tables, stored too so a memory-mapped load needs no private copies
+    DERIVED = ("is_leaf", "local_feature", "used_features")
+
+    def __init__(self, feature, threshold, left, right, value, roots, missing_left, n_features_in, max_depth,
+                 is_leaf=None, local_feature=None, used_features=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.missing_left = missing_left
+        self.n_features_in = int(n_features_in)
+        self.max_depth = int(max_depth)
+        if is_leaf is None or local_feature is None or used_features is None:
+            is_leaf, local_feature, used_features = self._derive()
+        self.is_leaf = is_leaf
+        self.local_feature = local_feature
+        self.used_features = used_features
+
+    def _derive(self):
+        # Only features that are actually split on are gathered from X; sparse
+        # input is densified on those columns alone.
+        is_leaf = self.left == np.arange(len(self.left))
+        used_features = np.unique(self.feature[~is_leaf])
+        remap = np.zeros(max(self.n_features_in, 1), dtype=np.int32)
+        remap[used_features] = np.arange(len(used_features), dtype=np.int32)
+        return is_leaf, remap[self.feature], used_features
+
+    @staticmethod
+    def tree_arrays(tree):
+        """One sklearn tree_ as local node arrays (children index into the same tree; leaves point to themselves)."""
+        node_ids = np.arange(tree.node_count)
+        leaf = tree.children_left == TREE_LEAF
+        mgl = getattr(tree, "missing_go_to_left", None)
+        return {
+            "feature": np.where(leaf, 0, tree.feature).astype(np.int32),
+            "threshold": tree.threshold.astype(np.float64),
+            "left": np.where(leaf, node_ids, tree.children_left).astype(np.int32),
+            "right": np.where(leaf, node_ids, tree.children_right).astype(np.int32),
+            "value": tree.value[:, 0, 0].astype(np.float64),
+            "missing_left": np.zeros(tree.node_count, dtype=bool) if mgl is None else np.asarray(mgl, dtype=bool),
+            "max_depth": tree.max_depth,
+        }
+
+    @classmethod
+    def from_trees(cls, trees, n_features_in):
+        """Concatenate per-tree arrays (see tree_arrays) into one forest; dtypes are kept as given."""
+        offsets = np.cumsum([0] + [len(t["left"]) for t in trees[:-1]])
+        return cls(
+            feature=np.concatenate([t["feature"] for t in trees]),
+            threshold=np.concatenate([t["threshold"] for t in trees]),
+            left=np.concatenate([t["left"] + np.int32(o) for t, o in zip(trees, offsets)]),
+            right=np.concatenate([t["right"] + np.int32(o) for t, o in zip(trees, offsets)]),
+            value=np.concatenate([t["value"] for t in trees]),
+            roots=np.asarray(offsets, dtype=np.int32),
+            missing_left=np.concatenate([t["missing_left"] for t in trees]),
+            n_features_in=n_features_in,
+            max_depth=max(t["max_depth"] for t in trees),
+        )
+
+    @classmethod
+    def from_sklearn(cls, model):
+        try:
+            estimators = getattr(model, "estimators_", None)
+            if estimators is None:
+                raise ValueError("Model is not a fitted forest")
+            if getattr(model, "n_outputs_", 1) != 1 or hasattr(model, "classes_"):
+                raise ValueError("Only single-output forest regressors can be compiled")
+            return cls.from_trees([cls.tree_arrays(est.tree_) for est in estimators], model.n_features_in_)
+        except Exception as e:
+            raise CustomException("Failed to compile forest", e)
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def _gather(self, X):
+        if sparse.issparse(X):
+            X = X.tocsr()[:, self.used_features].toarray()
+        else:
+            X = np.asarray(X)[:, self.used_features]
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def leaf_values(self, X):
+        """Value of the leaf reached in every tree: array of shape (n_rows, n_estimators)."""
+        if X.shape[1] != self.n_features_in:
+            raise ValueError(f"X has {X.shape[1]} features, forest expects {self.n_features_in}")
+        Xu = self._gather(X)
+        n_rows, n_used = Xu.shape
+        flat = Xu.ravel()
+        # pairs are laid out tree-major so consecutive lookups hit the same tree's nodes
+        node = np.repeat(self.roots, n_rows).astype(np.intp)
+        # (row, tree) pairs still walking down; finished pairs drop out of every later step
+        active = np.flatnonzero(~self.is_leaf[node])
+        a_node = node[active]
+        a_base = (active % n_rows) * n_used
+        while active.size:
+            x = flat.take(a_base + self.local_feature.take(a_node))
+            go_left = x <= self.threshold.take(a_node)
+            nan = np.isnan(x)
+            if nan.any():
+                go_left = np.where(nan, self.missing_left.take(a_node), go_left)
+            a_node = np.where(go_left, self.left.take(a_node), self.right.take(a_node))
+            done = self.is_leaf.take(a_node)
+            if done.any():
+                node[active[done]] = a_node[done]
+                keep = ~done
+                active, a_node, a_base = active[keep], a_node[keep], a_base[keep]
+        return self.value.take(node).reshape(self.n_estimators, n_rows).T
+
+    def predict(self, X, block_rows=8192):
+        # rows are processed in blocks so the (rows x trees) work arrays stay bounded
+        out = np.zeros(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], block_rows):
+            leaves = self.leaf_values(X[start:start + block_rows])
+            # accumulate tree by tree like sklearn does, so results match bit for bit
+            block = out[start:start + block_rows]
+            for t in range(leaves.shape[1]):
+                block += leaves[:, t]
+        out /= self.n_estimators
+        return out
+
+    def save(self, dir_path, extra_meta=None):
+        """extra_meta: additional keys for meta.json (ignored by load)."""
+        try:
+            os.makedirs(dir_path, exist_ok=True)
+            for name in self.ARRAYS + self.DERIVED:
+                np.save(os.path.join(dir_path, f"{name}.npy"), getattr(self, name))
+            save_json(os.path.join(dir_path, "meta.json"),
+                      {"n_features_in": self.n_features_in, "max_depth": self.max_depth,
+                       "n_estimators": self.n_estimators, **(extra_meta or {})})
+        except Exception as e:
+            raise CustomException(f"Failed to save compiled forest to {dir_path}", e)
+
+    @classmethod
+    def load(cls, dir_path, mmap_mode=None):
+        """mmap_mode="r" maps the node tables read-only so processes share one copy via the page cache."""
+        try:
+            meta = load_json(os.path.join(dir_path, "meta.json"))
+            arrays = {}
+            for name in cls.ARRAYS + cls.DERIVED:
+                path = os.path.join(dir_path, f"{name}.npy")
+                if os.path.exists(path):  # older exports have no derived tables
+                    arrays[name] = np.load(path, mmap_mode=mmap_mode)
+            return cls(n_features_in=meta["n_features_in"], max_depth=meta["max_depth"], **arrays)
+        except Exception as e:
+            raise CustomException(f"Failed to load compiled forest from {dir_path}", e)
@@ -0,0 +1,238 @@
+# src/incremental_trainer.py
+import io
+import os
+import glob
+import shutil
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from src.utils import save_object, load_object, save_json, load_json, to_csr, file_sha256
+from src.predict_pipeline import csv_dtypes
+from src.forest_engine import CompiledForest
+from src.logger import get_logger
+from src.exception import CustomException
+
+logger = get_logger(__name__)
+
+STATE_VERSION = 1
+
+
+def split_mask(df, row_offset, test_size, id_column="id"):
+    """
+    Deterministic train/test assignment per row: hashes the id column when present,
+    else the row's position in the raw file. A row keeps its side across runs, so
+    deltas never leak rows that an earlier run used for evaluation into training.
+    """
+    if id_column in df.columns:
+        keys = pd.util.hash_pandas_object(df[id_column].astype(str), index=False).to_numpy()
+    else:
+        keys = pd.util.hash_pandas_object(pd.Series(np.arange(row_offset, row_offset + len(df))),
+                                          index=False).to_numpy()
+    return (keys % 10_000) < int(test_size * 10_000)
+
+
+def unseen_category_rates(preprocessor, df):
+    """Share of non-missing values per categorical column that the frozen preprocessor has never seen."""
+    rates = {}
+    for name, trans, cols in getattr(preprocessor, "transformers_", []):
+        if name == "onehot":
+            known = trans.named_steps["encoder"].categories_
+        elif name == "frequency":
+            known = [list(freq) for freq in trans.frequencies_]
+        else:
+            continue
+        for col, categories in zip(cols, known):
+            if col not in df.columns:
+                continue
+            values = df[col].dropna().astype(str)
+            if len(values):
+                rates[col] = float((~values.isin(set(map(str, categories)))).mean())
+    return rates
+
+
+@dataclass
+class IncrementalTrainerConfig:
+    raw_data_path: str
+    preprocessor_path: str
+    model_path: str
+    state_dir: str                    # state.json + transformed chunks live here
+    compiled_model_dir: str = None
+    target_col: str = "revenue"
+    test_size: float = 0.2
+    trees_per_update: int = 5         # trees grown on each delta
+    max_trees: int = None             # drop the oldest trees beyond this (sliding-window refresh)
+    window_chunks: int = 0            # earlier train chunks refitted alongside the delta
+    min_delta_rows: int = 100         # smaller deltas stay pending until more rows arrive
+    max_unseen_rate: float = 0.2      # unseen-category share that triggers a full-refit warning
+    eval_chunks: int = None           # newest test chunks to evaluate on (None = all)
+
+    @property
+    def state_path(self):
+        return os.path.join(self.state_dir, "state.json")
+
+    @property
+    def chunk_dir(self):
+        return os.path.join(self.state_dir, "chunks")
+
+
+class IncrementalTrainer:
+    """
+    Retrains from the rows appended to the raw CSV since the last run.
+
+    The raw file is treated as append-only: state.json records the byte offset
+    consumed so far, so a run reads and transforms only the delta. The fitted
+    preprocessor is frozen (existing trees split on the features it produces);
+    unseen categories in the delta are measured and a full retrain is
+    recommended once they pass `max_unseen_rate`. Transformed deltas are kept as
+    CSR .npz chunks and reused for evaluation and windowed refits. The forest
+    grows by `trees_per_update` warm-started trees per delta, and with
+    `max_trees` the oldest trees are retired.
+    """
+    def __init__(self, config: IncrementalTrainerConfig):
+        self.config = config
+
+    def _save_chunk(self, kind, index, X, y):
+        base = os.path.join(self.config.chunk_dir, f"{kind}_{index:05d}")
+        os.makedirs(self.config.chunk_dir, exist_ok=True)
+        sparse.save_npz(base + ".npz", sparse.csr_matrix(X), compressed=False)
+        np.save(base + "_y.npy", np.asarray(y, dtype=np.float64))
+
+    def _load_chunks(self, kind, last=None):
+        paths = sorted(glob.glob(os.path.join(self.config.chunk_dir, f"{kind}_*.npz")))
+        if last is not None:
+            paths = paths[-last:] if last > 0 else []
+        Xs = [sparse.load_npz(p) for p in paths]
+        ys = [np.load(p[:-len(".npz")] + "_y.npy") for p in paths]
+        return Xs, ys
+
+    def _raw_offset(self):
+        return os.path.getsize(self.config.raw_data_path)
+
+    def initiate_baseline(self, X_train, y_train, X_test, y_test, rows_consumed):
+        """Record the state after a full training run: the whole raw file is consumed and its matrices become chunk 0."""
+        try:
+            shutil.rmtree(self.config.chunk_dir, ignore_errors=True)
+            self._save_chunk("train", 0, X_train, y_train)
+            self._save_chunk("test", 0, X_test, y_test)
+            state = {
+                "version": STATE_VERSION,
+                "rows_consumed": int(rows_consumed),
+                "byte_offset": self._raw_offset(),
+                "preprocessor_sha256": file_sha256(self.config.preprocessor_path),
+                "n_chunks": 1,
+                "updates": [],
+            }
+            save_json(self.config.state_path, state)
+            logger.info(f"Incremental state initialised at {self.config.state_path} ({rows_consumed} rows)")
+            return state
+        except Exception as e:
+            raise CustomException("Error recording incremental training baseline", e)
+
+    def initiate_incremental_training(self):
+        try:
+            cfg = self.config
+            if not os.path.exists(cfg.state_path):
+                raise ValueError(f"No incremental state at {cfg.state_path}; run a full training first")
+            state = load_json(cfg.state_path)
+
+            if file_sha256(cfg.preprocessor_path) != state["preprocessor_sha256"]:
+                raise ValueError("Preprocessor changed since the incremental state was recorded; run a full training")
+            raw_size = self._raw_offset()
+            if raw_size < state["byte_offset"]:
+                raise ValueError("Raw data file shrank; it must be append-only for incremental training")
+
+            with open(cfg.raw_data_path, "rb") as f:
+                header = f.readline()
+                f.seek(state["byte_offset"])
+                body = f.read()
+
+            preprocessor = load_object(cfg.preprocessor_path)
+            if body.strip():
+                delta = pd.read_csv(io.BytesIO(header + body), dtype=csv_dtypes(preprocessor))
+            else:
+                delta = pd.DataFrame()
+            if len(delta) < cfg.min_delta_rows:
+                logger.info(f"{len(delta)} new rows (< min_delta_rows={cfg.min_delta_rows}); nothing to do")
+                return {"new_rows": len(delta), "updated": False}
+
+            logger.info(f"Incremental update with {len(delta)} new rows")
+            is_test = split_mask(delta, state["rows_consumed"], cfg.test_size)
+            unseen = unseen_category_rates(preprocessor, delta)
+            worst = max(unseen.values(), default=0.0)
+            refit_recommended = worst > cfg.max_unseen_rate
+            if refit_recommended:
+                logger.warning(f"Unseen category rate {worst:.1%} exceeds {cfg.max_unseen_rate:.1%}; "
+                               f"the frozen preprocessor is going stale, run a full training")
+
+            X_delta = to_csr(preprocessor.transform(delta.drop(columns=[cfg.target_col])))
+            y_delta = delta[cfg.target_col].to_numpy(dtype=np.float64)
+            index = state["n_chunks"]
+            X_new, y_new = X_delta[~is_test], y_delta[~is_test]
+            self._save_chunk("train", index, X_new, y_new)
+            self._save_chunk("test", index, X_delta[is_test], y_delta[is_test])
+
+            model = load_object(cfg.model_path)
+            if not isinstance(model, RandomForestRegressor):
+                raise ValueError(f"Incremental training needs a RandomForestRegressor, found {type(model).__name__}")
+            seed = model.random_state
+            state.setdefault("base_seed", int(seed) if isinstance(seed, (int, np.integer)) else None)
+            state.setdefault("trees_grown", len(model.estimators_) + sum(u["trees_retired"] for u in state["updates"]))
+
+            if cfg.window_chunks:
+                Xs, ys = self._load_chunks("train", last=cfg.window_chunks + 1)
+                X_fit, y_fit = sparse.vstack(Xs, format="csr"), np.concatenate(ys)
+            else:
+                X_fit, y_fit = X_new, y_new
+
+            retired = 0
+            if X_fit.shape[0]:
+                if cfg.max_trees and len(model.estimators_) + cfg.trees_per_update > cfg.max_trees:
+                    retired = len(model.estimators_) + cfg.trees_per_update - cfg.max_trees
+                    model.estimators_ = model.estimators_[retired:]
+                # warm start skips one draw of random_state per existing tree; after retirement a fixed
+                # seed would hand the new trees the seeds (and bootstraps) of trees still in the forest
+                if isinstance(state["base_seed"], int):
+                    model.set_params(random_state=state["base_seed"] + state["trees_grown"])
+                model.set_params(warm_start=True, n_estimators=len(model.estimators_) + cfg.trees_per_update)
+                model.fit(X_fit, y_fit)
+                model.set_params(warm_start=False)
+                logger.info(f"Grew {cfg.trees_per_update} trees on {X_fit.shape[0]} rows, retired {retired}; "
+                            f"forest now has {len(model.estimators_)} trees")
+
+            Xs, ys = self._load_chunks("test", last=cfg.eval_chunks)
+            X_eval, y_eval = sparse.vstack(Xs, format="csr"), np.concatenate(ys)
+            preds = model.predict(X_eval)
+            rmse = mean_squared_error(y_eval, preds) ** 0.5
+            r2 = r2_score(y_eval, preds)
+            logger.info(f"RMSE on {len(y_eval)} held-out rows: {rmse:.4f}, R2: {r2:.4f}")
+
+            save_object(cfg.model_path, model)
+            if cfg.compiled_model_dir:
+                CompiledForest.from_sklearn(model).save(cfg.compiled_model_dir)
+
+            update = {
+                "chunk": index,
+                "new_rows": len(delta),
+                "train_rows": int((~is_test).sum()),
+                "test_rows": int(is_test.sum()),
+                "trees_added": cfg.trees_per_update if X_fit.shape[0] else 0,
+                "trees_retired": retired,
+                "n_trees": len(model.estimators_),
+                "rmse": rmse,
+                "r2": r2,
+                "unseen_category_rates": unseen,
+                "refit_recommended": refit_recommended,
+            }
+            state["rows_consumed"] += len(delta)
+            state["byte_offset"] += len(body)
+            state["n_chunks"] = index + 1
+            state["trees_grown"] += update["trees_added"]
+            state["updates"].append(update)
+            save_json(cfg.state_path, state)
+            return {"model_path": cfg.model_path, "updated": True, **update}
+        except Exception as e:
+            logger.exception("Exception in incremental training")
+            raise CustomException("Error during incremental training", e)
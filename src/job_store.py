@@ -0,0 +1,189 @@
+# src/job_store.py
+"""
+SQLite-backed state for bulk scoring jobs (src/job_worker.py, /jobs routes in app.py).
+
+A job is an uploaded CSV (raw movie schema, as for predict_from_csv) or
+JSON-lines file (one /predict payload per line) stored under
+<jobs_dir>/<job id>/. The web process creates jobs, worker processes claim
+them, and both read and write state through one SQLite file in WAL mode, so no
+outside service is needed. Each call opens its own connection, which makes the
+store safe to share across threads and forked processes.
+
+    queued -> running -> done | failed
+    running jobs whose worker stops heartbeating are re-queued (up to max_attempts)
+
+A claim hands the worker a lease token. Progress and finish updates only apply
+while the job still holds that token, so a worker whose job was re-queued
+behind its back (update returns False) stops instead of racing the new one.
+Progress is counted in bytes of the upload; row counts are only known at the
+end (quoted CSV fields may span lines).
+"""
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from src.logger import get_logger
+from src.exception import CustomException, ErrorCode
+
+logger = get_logger(__name__)
+
+JOB_FORMATS = ("csv", "jsonl")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    format TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    bytes_total INTEGER NOT NULL,
+    bytes_done INTEGER NOT NULL DEFAULT 0,
+    rows_total INTEGER,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease TEXT,
+    artifact_version TEXT,
+    report TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+@dataclass
+class JobStoreConfig:
+    jobs_dir: str
+    stale_seconds: float = 300.0    # a running job without a heartbeat for this long is re-queued
+    max_attempts: int = 3
+    retention_hours: float = 72.0   # finished jobs (and their files) are deleted after this
+
+
+class JobStore:
+    def __init__(self, config: JobStoreConfig):
+        self.config = config
+        self.db_path = os.path.join(config.jobs_dir, "jobs.sqlite3")
+        os.makedirs(config.jobs_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # autocommit; multi-statement updates use an explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def job_dir(self, job_id):
+        return os.path.join(self.config.jobs_dir, job_id)
+
+    def create(self, fmt, write_input):
+        """
+        New queued job; write_input(path) stores the upload at the job's input path
+        (streamed by the caller). Returns the job id.
+        """
+        if fmt not in JOB_FORMATS:
+            raise CustomException(f"Unknown job format '{fmt}', expected one of {JOB_FORMATS}",
+                                  code=ErrorCode.VALIDATION)
+        job_id = uuid.uuid4().hex
+        job_dir = self.job_dir(job_id)
+        try:
+            os.makedirs(job_dir)
+            input_path = os.path.join(job_dir, f"input.{fmt}")
+            write_input(input_path)
+            with self._connect() as conn:
+                conn.execute("INSERT INTO jobs (id, status, format, input_path, output_path, bytes_total, created_at) "
+                             "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                             (job_id, fmt, input_path, os.path.join(job_dir, "result.csv"),
+                              os.path.getsize(input_path), time.time()))
+            logger.info(f"Queued {fmt} job {job_id} ({os.path.getsize(input_path)} bytes)")
+            return job_id
+        except Exception as e:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise CustomException("Failed to create job", e, code=ErrorCode.DATA)
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["report"] = json.loads(job["report"]) if job["report"] else None
+        return job
+
+    def claim(self, worker):
+        """
+        Atomically move the oldest queued job to running for `worker`; None when the
+        queue is empty. The returned job's "lease" goes with every later update.
+        """
+        now = time.time()
+        lease = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, lease = ?, attempts = attempts + 1, "
+                         "started_at = ?, heartbeat_at = ?, bytes_done = 0, rows_done = 0 WHERE id = ?",
+                         (worker, lease, now, now, row["id"]))
+            conn.execute("COMMIT")
+        return self.get(row["id"])
+
+    def update(self, job_id, lease, **fields):
+        """
+        Set columns of a running job and refresh its heartbeat. False, and nothing
+        written, when the job no longer holds `lease` (re-queued or finished).
+        """
+        fields["heartbeat_at"] = time.time()
+        if "report" in fields and fields["report"] is not None:
+            fields["report"] = json.dumps(fields["report"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            return conn.execute(f"UPDATE jobs SET {columns} WHERE id = ? AND lease = ? AND status = 'running'",
+                                (*fields.values(), job_id, lease)).rowcount > 0
+
+    def finish(self, job_id, lease, status, **fields):
+        return self.update(job_id, lease, status=status, finished_at=time.time(), **fields)
+
+    def requeue_stale(self):
+        """Re-queue running jobs whose worker died; fail them after max_attempts. Returns the number touched."""
+        cutoff = time.time() - self.config.stale_seconds
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            failed = conn.execute("UPDATE jobs SET status = 'failed', error = 'worker stopped responding', "
+                                  "lease = NULL, finished_at = ? WHERE status = 'running' AND heartbeat_at < ? "
+                                  "AND attempts >= ?", (time.time(), cutoff, self.config.max_attempts)).rowcount
+            queued = conn.execute("UPDATE jobs SET status = 'queued', worker = NULL, lease = NULL "
+                                  "WHERE status = 'running' AND heartbeat_at < ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+        if failed or queued:
+            logger.warning(f"Stale jobs: {queued} re-queued, {failed} failed after {self.config.max_attempts} attempts")
+        return failed + queued
+
+    def prune(self):
+        """Delete finished jobs older than retention_hours together with their files."""
+        cutoff = time.time() - self.config.retention_hours * 3600
+        with self._connect() as conn:
+            ids = [r["id"] for r in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,))]
+            for job_id in ids:
+                shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return len(ids)
+
+    def counts(self):
+        with self._connect() as conn:
+            return {r["status"]: r["n"] for r in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
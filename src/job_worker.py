@@ -0,0 +1,301 @@
+# src/job_worker.py
+"""
+Worker pool for bulk scoring jobs queued by the /jobs routes in app.py.
+
+Each worker process claims one queued job at a time from the JobStore
+(src/job_store.py), scores the upload in chunks of `chunksize` rows with
+PredictPipeline and streams the predictions to <job dir>/result.csv, updating
+the job's progress (bytes of the upload read) and heartbeat after every chunk.
+The result file is written under a temporary name and renamed when the job is
+done, so a download never sees a partial file. If the job's lease was lost
+(re-queued after a stale heartbeat), the worker drops its attempt.
+
+Workers run at the lowest CPU priority (SCHED_IDLE on Linux, otherwise
+`nice` 19) with a single-threaded forest, so web workers on the same machine
+keep their latency while a bulk job runs; the pool only soaks up the CPU the
+web workers leave idle. Workers pick up new artifact versions like the web
+processes (src/warmup.py); a job is scored with the version current when it
+was claimed, recorded as artifact_version.
+
+    CSV     raw movie rows as for predict_from_csv; result: the id column + prediction.
+            Invalid rows get an empty prediction and are listed in the job's report.
+    JSONL   one /predict payload per line; result: line, prediction, error.
+            Every line gets a prediction or an error.
+
+    python -m src.job_worker --workers 2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from src.job_store import JobStore, JobStoreConfig
+from src.payload import build_raw_from_payload, validate_payload
+from src.prediction_cache import PredictionCache
+from src.validation import ValidationReport
+from src.warmup import init_loader
+from src.artifact_store import ArtifactStore, ArtifactStoreConfig
+from src.utils import ChunkWriter
+from src.logger import get_logger
+from src.exception import CustomException, ErrorCode
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class JobWorkerConfig:
+    jobs_dir: str
+    artifacts_dir: str
+    n_workers: int = 1
+    chunksize: int = 10_000          # rows per chunk; progress is reported after each one
+    backend: str = "sklearn"
+    nice: int = 19                   # CPU priority offset for the worker processes
+    idle_priority: bool = True       # also SCHED_IDLE where available (Linux): run only on otherwise idle CPUs
+    poll_seconds: float = 1.0        # sleep between claims while the queue is empty
+    maintenance_seconds: float = 60.0   # re-queue stale jobs and prune old ones this often
+
+
+def read_jsonl_chunks(f, chunksize):
+    """Lists of (line number, bytes) for the non-blank lines of binary file f, `chunksize` at a time."""
+    chunk = []
+    for number, line in enumerate(f, start=1):
+        if line.strip():
+            chunk.append((number, line))
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_line(text):
+    try:
+        item = json.loads(text)
+    except ValueError as e:
+        return None, [f"invalid JSON: {e}"]
+    return item, validate_payload(item)
+
+
+class _LeaseLost(Exception):
+    """The job was re-queued while this worker ran it and now belongs to another claim."""
+
+
+class JobWorker:
+    def __init__(self, config: JobWorkerConfig, name=None):
+        self.config = config
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.store = JobStore(JobStoreConfig(jobs_dir=config.jobs_dir))
+        self.loader = None
+
+    def _load_pipeline(self, artifacts_dir):
+        from src.predict_pipeline import PredictPipeline
+        pipeline = PredictPipeline(artifacts_dir=artifacts_dir, backend=self.config.backend, mmap_mode="r")
+        # parallelism comes from the pool; the web workers get the other cores
+        if hasattr(pipeline.model, "n_jobs"):
+            pipeline.model.n_jobs = 1
+        return pipeline
+
+    def _lower_priority(self):
+        if self.config.nice:
+            os.nice(self.config.nice)
+            # with autogroup scheduling (kernel.sched_autogroup_enabled) nice only ranks tasks
+            # within a session; pool workers lead their own session, so lower its group as well
+            if os.path.exists("/proc/self/autogroup") and os.getsid(0) == os.getpid():
+                try:
+                    with open("/proc/self/autogroup", "w") as f:
+                        f.write(str(self.config.nice))
+                except OSError as e:
+                    logger.warning(f"Could not lower the autogroup priority: {e}")
+        if self.config.idle_priority and hasattr(os, "SCHED_IDLE"):
+            try:
+                os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+            except OSError as e:
+                logger.warning(f"Could not switch to SCHED_IDLE, running with nice {self.config.nice} only: {e}")
+
+    def start(self):
+        self._lower_priority()
+        self.loader = init_loader(self._load_pipeline, mode="eager",
+                                  store=ArtifactStore(ArtifactStoreConfig(root=self.config.artifacts_dir)))
+        logger.info(f"Job worker {self.name} ready (artifact version {self.loader.version})")
+        return self
+
+    def run_once(self):
+        """Claim and process one job; False when the queue was empty."""
+        job = self.store.claim(self.name)
+        if job is None:
+            return False
+        self.process(job)
+        return True
+
+    def run(self):
+        self.start()
+        while True:
+            if not self.run_once():
+                time.sleep(self.config.poll_seconds)
+
+    def _renew(self, job, **fields):
+        if not self.store.update(job["id"], job["lease"], **fields):
+            raise _LeaseLost(job["id"])
+
+    def process(self, job):
+        job_id = job["id"]
+        pipeline = self.loader.get()
+        # one file per claim: a worker that lost its lease never writes into the new holder's output
+        partial_path = f"{job['output_path']}.{job['lease']}.partial"
+        started = time.perf_counter()
+        try:
+            self._renew(job, artifact_version=self.loader.version)
+            score = self._score_csv if job["format"] == "csv" else self._score_jsonl
+            report = ValidationReport()
+            rows_done = 0
+            with ChunkWriter(partial_path) as writer:
+                for out, bytes_done in score(pipeline, job["input_path"], report):
+                    writer.write(out)
+                    rows_done += len(out)
+                    self._renew(job, rows_done=rows_done, bytes_done=bytes_done)
+            if not rows_done:
+                raise ValueError("The upload holds no rows")
+            self._renew(job)
+            os.replace(partial_path, job["output_path"])
+            self.store.finish(job_id, job["lease"], "done", rows_done=rows_done, rows_total=rows_done,
+                              bytes_done=job["bytes_total"], report=report.to_dict())
+            logger.info(f"Job {job_id}: {rows_done} rows in {time.perf_counter() - started:.1f}s; {report.summary()}")
+        except _LeaseLost:
+            logger.warning(f"Job {job_id} was re-queued while this worker ran it; dropping this attempt")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        except Exception as e:
+            logger.exception(f"Job {job_id} failed")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            self.store.finish(job_id, job["lease"], "failed", error=f"{ErrorCode.of(e)}: {str(e).splitlines()[0]}")
+
+    def _score_csv(self, pipeline, path, report):
+        """(predictions, bytes read) per chunk."""
+        with open(path, "rb") as f:
+            for out in pipeline.iter_predictions_from_csv(f, self.config.chunksize, report=report):
+                yield out, f.tell()
+
+    def _score_jsonl(self, pipeline, path, report):
+        with open(path, "rb") as f:
+            for chunk in read_jsonl_chunks(f, self.config.chunksize):
+                yield self._score_jsonl_chunk(pipeline, chunk, report), f.tell()
+
+    def _score_jsonl_chunk(self, pipeline, chunk, report):
+        lines, rows, errors = [], [], []
+        for number, text in chunk:
+            item, problems = _parse_line(text)
+            lines.append(number)
+            errors.append("; ".join(problems))
+            rows.append(None if problems else
+                        PredictionCache.make_key(build_raw_from_payload(item), pipeline.expected_columns))
+        valid = [i for i, row in enumerate(rows) if row is not None]
+        preds = np.full(len(rows), np.nan)
+        failed = []
+        if valid:
+            try:
+                preds[valid] = pipeline.predict_rows([rows[i] for i in valid])
+            except Exception:
+                # a row the model cannot take fails the vectorized call; score the chunk row by row
+                logger.warning(f"Chunk of {len(valid)} rows failed; scoring rows one by one")
+                for i in valid:
+                    try:
+                        preds[i] = pipeline.predict_rows([rows[i]])[0]
+                    except Exception as e:
+                        errors[i] = str(e).splitlines()[0]
+                        failed.append(i)
+        invalid = [i for i, row in enumerate(rows) if row is None]
+        report.n_rows += len(rows)
+        report.n_invalid += len(invalid) + len(failed)
+        for code, idx in (("invalid_payload", invalid), ("predict_failed", failed)):
+            if idx:
+                report.add("payload", code, [lines[i] for i in idx], [errors[i] for i in idx])
+        return pd.DataFrame({"line": lines, "prediction": preds, "error": errors})
+
+
+def _run_worker(config, index):
+    # the parent handles SIGINT and stops the pool with SIGTERM; the fork inherited its SIGTERM handler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    os.setsid()
+    try:
+        JobWorker(config, name=f"{socket.gethostname()}:{os.getpid()}:{index}").run()
+    except KeyboardInterrupt:
+        pass
+
+
+class JobWorkerPool:
+    """
+    Starts n_workers worker processes, restarts any that exit and periodically
+    re-queues jobs of workers that stopped heartbeating and prunes old jobs.
+    """
+    def __init__(self, config: JobWorkerConfig):
+        self.config = config
+        self.store = JobStore(JobStoreConfig(jobs_dir=config.jobs_dir))
+        self.processes = {}
+        self._stopping = False
+
+    def _spawn(self, index):
+        process = multiprocessing.Process(target=_run_worker, args=(self.config, index), daemon=True,
+                                          name=f"job-worker-{index}")
+        process.start()
+        self.processes[index] = process
+
+    def stop(self, *_):
+        self._stopping = True
+
+    def run(self):
+        try:
+            signal.signal(signal.SIGTERM, self.stop)
+            for index in range(self.config.n_workers):
+                self._spawn(index)
+            logger.info(f"Job worker pool: {self.config.n_workers} workers on {self.config.jobs_dir}")
+            next_maintenance = 0.0
+            while not self._stopping:
+                for index, process in list(self.processes.items()):
+                    if not process.is_alive():
+                        logger.warning(f"Job worker {index} exited with {process.exitcode}; restarting")
+                        self._spawn(index)
+                if time.monotonic() >= next_maintenance:
+                    self.store.requeue_stale()
+                    self.store.prune()
+                    next_maintenance = time.monotonic() + self.config.maintenance_seconds
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            raise CustomException("Job worker pool failed", e)
+        finally:
+            # a job interrupted here is re-queued by requeue_stale once its heartbeat is stale
+            for process in self.processes.values():
+                process.terminate()
+            for process in self.processes.values():
+                process.join(timeout=10)
+
+
+def main(argv=None):
+    base = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    artifacts_dir = os.path.join(base, "artifacts")
+    parser = argparse.ArgumentParser(description="Process bulk scoring jobs submitted to /jobs.")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("JOB_WORKERS", 1)))
+    parser.add_argument("--jobs-dir", default=os.environ.get("JOBS_DIR", os.path.join(artifacts_dir, "jobs")))
+    parser.add_argument("--artifacts-dir", default=artifacts_dir)
+    parser.add_argument("--chunksize", type=int, default=JobWorkerConfig.chunksize)
+    parser.add_argument("--backend", default=os.environ.get("MODEL_BACKEND", "sklearn"))
+    parser.add_argument("--nice", type=int, default=JobWorkerConfig.nice)
+    parser.add_argument("--no-idle-priority", dest="idle_priority", action="store_false",
+                        help="use only --nice, not SCHED_IDLE")
+    args = parser.parse_args(argv)
+    config = JobWorkerConfig(jobs_dir=args.jobs_dir, artifacts_dir=args.artifacts_dir, n_workers=args.workers,
+                             chunksize=args.chunksize, backend=args.backend, nice=args.nice,
+                             idle_priority=args.idle_priority)
+    JobWorkerPool(config).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,87 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import threading
 from datetime import datetime
 
-LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "artifacts", "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
+# One log file per process, opened on the first record rather than at import:
+# importing a module (or a short-lived CLI call that logs nothing) leaves no file behind.
+# Records go through a queue; file and console I/O happen on a listener thread,
+# so a slow disk never blocks a request thread.
+# LOG_FILE names a fixed file (relative to LOG_DIR) that every process appends to instead.
+LOG_DIR = os.environ.get("LOG_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "artifacts", "logs"))
+LOG_FILE = os.environ.get("LOG_FILE")
+LOG_TO_FILE = os.environ.get("LOG_TO_FILE", "1").lower() not in ("0", "false", "no", "off")
+
+_queue = queue.SimpleQueue()
+_listener = None
+_lock = threading.Lock()
 
-def get_logger(name=__name__):
-    logger = logging.getLogger(name)
-    if logger.handlers:
-        return logger
-    logger.setLevel(logging.DEBUG)
 
-    # file handler
-    log_file = os.path.join(LOG_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+class _LazyFileHandler(logging.FileHandler):
+    """FileHandler that also creates LOG_DIR when the first record arrives."""
+    def __init__(self):
+        name = LOG_FILE or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        super().__init__(os.path.join(LOG_DIR, name), delay=True)
 
-    # console handler
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+def _handlers():
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+    handlers = [console_handler]
+    if LOG_TO_FILE:
+        file_handler = _LazyFileHandler()
+        file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+        handlers.append(file_handler)
+    return handlers
+
+
+def _start_listener(handlers=None):
+    global _listener
+    with _lock:
+        if _listener is None:
+            _listener = logging.handlers.QueueListener(_queue, *(handlers or _handlers()),
+                                                       respect_handler_level=True)
+            _listener.start()
+    return _listener
+
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+def shutdown():
+    """Drain the queue and close the handlers (registered with atexit)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+def _after_fork():
+    # the listener thread does not survive fork (gunicorn --preload): the child starts its own
+    # over the same handlers, so all workers append to the parent's log file
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _listener is not None:
+        handlers, _listener = _listener.handlers, None
+        _start_listener(handlers)
+
+
+atexit.register(shutdown)
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_logger(name=__name__):
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(logging.handlers.QueueHandler(_queue))
+    _start_listener()
     return logger
@@ -0,0 +1,213 @@
+# src/metrics.py
+"""
+In-process counters and histograms for the serving and training hot paths,
+rendered in the Prometheus text format by the /metrics routes.
+
+    from src import metrics
+    with metrics.timer("predict_stage_seconds", stage="transform"):
+        ...
+    metrics.inc("predict_rows_total", len(rows))
+
+METRICS_ENABLED=0 turns every call into a no-op (timer() returns a shared
+null context manager). Values are per process: with several gunicorn workers
+each worker reports its own series.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+PREFIX = "movie_"
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+# name -> (type, help); names not listed here are still accepted and exported untyped
+FAMILIES = {
+    "http_requests_total": ("counter", "HTTP requests by route and status code"),
+    "http_request_seconds": ("histogram", "HTTP request latency by route"),
+    "predict_stage_seconds": ("histogram", "Inference time per stage: parse, build_raw, grid, feature_store, transform, predict"),
+    "predict_rows_total": ("counter", "Rows scored by the model"),
+    "prediction_grid_total": ("counter", "Rows answered from the prediction grid (hit) or sent to the model (miss)"),
+    "feature_store_rows_total": ("counter", "Rows whose features came from the feature store (hit) or were transformed (miss)"),
+    "errors_total": ("counter", "Exceptions caught by request handlers, by error code"),
+    "model_swaps_total": ("counter", "Artifact version swaps by the serving process, by result"),
+    "training_stage_seconds": ("histogram", "Training pipeline time per stage"),
+    "stage_cache_total": ("counter", "Training stage cache lookups by stage and result"),
+}
+
+_enabled = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+
+class Registry:
+    """Thread-safe store of counters {(name, labels): value} and histograms {(name, labels): _Histogram}."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, gauges=None):
+        """Prometheus text exposition; `gauges` adds {name: value} or {name: {labels_tuple: value}} snapshots."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, (list(h.counts), h.count, h.total)) for k, h in self._histograms.items())
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name in seen:
+                return
+            seen.add(name)
+            help_text = FAMILIES.get(name, (kind, name))[1]
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for (name, key), value in counters:
+            header(name, "counter")
+            lines.append(f"{PREFIX}{name}{_format_labels(key)} {value}")
+        for (name, key), (counts, count, total) in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, ('le', repr(bound)))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {count}")
+        for name, value in (gauges or {}).items():
+            header(name, "gauge")
+            series = value if isinstance(value, dict) else {(): value}
+            for key, v in series.items():
+                lines.append(f"{PREFIX}{name}{_format_labels(key)} {v}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, name):
+        """{label values: {"count", "total_s", "mean_s"}} for one histogram family."""
+        with self._lock:
+            items = [(k, h.count, h.total) for (n, k), h in self._histograms.items() if n == name]
+        return {",".join(str(v) for _, v in key) or name: {"count": count, "total_s": round(total, 4),
+                                                          "mean_s": round(total / count, 6) if count else 0.0}
+                for key, count, total in items}
+
+
+REGISTRY = Registry()
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """Context manager observing the elapsed seconds into histogram `name`."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name, labels)
+
+
+def inc(name, amount=1, **labels):
+    if _enabled:
+        REGISTRY.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    if _enabled:
+        REGISTRY.observe(name, value, **labels)
+
+
+def render(gauges=None):
+    return REGISTRY.render(gauges)
+
+
+def format_summary(name, title=None):
+    """Plain-text table of a histogram family (count, total, share of total), for logs."""
+    rows = REGISTRY.summary(name)
+    if not rows:
+        return f"{title or name}: no samples" + ("" if _enabled else " (metrics disabled)")
+    grand = sum(r["total_s"] for r in rows.values()) or 1.0
+    width = max(len(k) for k in rows)
+    lines = [title or name]
+    for label, r in rows.items():
+        lines.append(f"  {label:<{width}}  {r['total_s']:>10.3f} s  {r['total_s'] / grand:>6.1%}  (n={r['count']})")
+    return "\n".join(lines)
@@ -0,0 +1,104 @@
+# src/micro_batcher.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into small batches.
+
+    Callers `await submit(row)`. A background task takes the first queued row,
+    keeps collecting until `max_batch_size` rows are waiting or `max_wait_ms`
+    has passed, runs `predict_fn(rows)` once in a worker thread (so the event
+    loop keeps accepting requests) and resolves every caller's future with its
+    own result. If the batch fails, its rows are run again one at a time, so
+    only the caller whose row fails gets the exception.
+    """
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = None
+        self._task = None
+        # one thread: batches run back to back and never contend for the model
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batch")
+        self.batches = 0
+        self.rows = 0
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, row):
+        if self._task is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            rows = [row for row, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_fn, rows)
+                outcomes = [(result, None) for result in results]
+            except Exception:
+                logger.warning(f"Micro-batch of {len(rows)} rows failed; retrying rows one by one")
+                outcomes = await loop.run_in_executor(self._executor, self._predict_each, rows)
+            self.batches += 1
+            self.rows += len(rows)
+            for (_, future), (result, error) in zip(batch, outcomes):
+                if future.done():  # caller may have gone away
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _predict_each(self, rows):
+        outcomes = []
+        for row in rows:
+            try:
+                outcomes.append((self.predict_fn([row])[0], None))
+            except Exception as e:
+                outcomes.append((None, e))
+        return outcomes
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
@@ -0,0 +1,206 @@
+# src/model_search.py
+import math
+import time
+from dataclasses import dataclass, field
+import numpy as np
+from joblib import Parallel, delayed
+from scipy import sparse
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import ParameterSampler, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+from src.logger import get_logger
+from src.exception import CustomException
+
+logger = get_logger(__name__)
+
+DEFAULT_SEARCH_SPACE = {
+    "random_forest": {
+        "n_estimators": [25, 50, 100, 200, 400],
+        "max_depth": [None, 8, 12, 16, 24],
+        "max_features": [1.0, 0.7, 0.5, 0.3, "sqrt"],
+        "min_samples_leaf": [1, 2, 5, 10],
+    },
+    "hist_gradient_boosting": {
+        "max_iter": [100, 200, 400],
+        "learning_rate": [0.03, 0.1, 0.2],
+        "max_leaf_nodes": [15, 31, 63],
+        "max_depth": [None, 6, 10],
+        "max_features": [1.0, 0.7, 0.5],
+    },
+}
+
+
+def densify(X):
+    """HistGradientBoosting needs dense input; the profiled feature matrix is narrow enough."""
+    return X.toarray() if sparse.issparse(X) else X
+
+
+def make_estimator(family, params, random_state=42, n_jobs=1):
+    if family == "random_forest":
+        return RandomForestRegressor(random_state=random_state, n_jobs=n_jobs, **params)
+    if family == "hist_gradient_boosting":
+        return Pipeline(steps=[
+            ("densify", FunctionTransformer(densify, accept_sparse=True)),
+            ("model", HistGradientBoostingRegressor(random_state=random_state, **params)),
+        ])
+    raise ValueError(f"Unknown model family '{family}'")
+
+
+@dataclass
+class ModelSearchConfig:
+    search_space: dict = field(default_factory=lambda: DEFAULT_SEARCH_SPACE)
+    n_candidates: int = 27          # sampled across families, split evenly
+    eta: int = 3                    # keep the best 1/eta candidates per round, grow rows eta-fold
+    min_rows: int = 500             # training rows in the first round
+    validation_fraction: float = 0.2
+    n_jobs: int = -1                # trials run in parallel; each trial is single-threaded
+    random_state: int = 42
+    latency_budget_ms: float = None  # single-row predict budget the chosen model must meet
+    latency_repeats: int = 20
+
+
+def _single_row_latency_ms(model, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X[:1])
+        timings.append(time.perf_counter() - start)
+    return round(float(np.median(timings)) * 1e3, 3)
+
+
+def _run_trial(cid, family, params, X_fit, y_fit, X_val, y_val, random_state, latency_repeats):
+    model = make_estimator(family, params, random_state=random_state, n_jobs=1)
+    start = time.perf_counter()
+    model.fit(X_fit, y_fit)
+    fit_s = time.perf_counter() - start
+    preds = model.predict(X_val)
+    return cid, model, {"rmse": float(mean_squared_error(y_val, preds) ** 0.5),
+                        "r2": float(r2_score(y_val, preds)), "fit_seconds": round(fit_s, 3),
+                        # rough: measured while other trials share the cores
+                        "latency_single_ms": _single_row_latency_ms(model, X_val, latency_repeats)}
+
+
+class ModelSearch:
+    """
+    Budget-aware model search by successive halving.
+
+    Candidates (RandomForest and HistGradientBoosting settings sampled from the
+    search space) are first trained on a small slice of the training rows; only
+    the best 1/eta survive into the next round, which gets eta times more rows,
+    until the full slice is used. Trials of a round run in parallel across cores
+    and all of them share the already transformed matrices. Finalists are re-timed
+    at single-row and 1k-row batch prediction so accuracy can be traded against
+    serving latency. With latency_budget_ms set, candidates whose single-row
+    latency exceeds the budget are pruned between rounds and excluded from
+    the final pick (unless nothing meets it).
+    """
+    def __init__(self, config: ModelSearchConfig = None):
+        self.config = config or ModelSearchConfig()
+        self.report = None
+        self.best = None
+
+    def _candidates(self):
+        cfg = self.config
+        families = list(cfg.search_space)
+        per_family = max(1, cfg.n_candidates // len(families))
+        candidates = []
+        for k, family in enumerate(families):
+            sampler = ParameterSampler(cfg.search_space[family], n_iter=per_family, random_state=cfg.random_state + k)
+            candidates.extend((family, params) for params in sampler)
+        return candidates
+
+    def _latency(self, model, X):
+        block, batch = X[:1000], []
+        for _ in range(max(1, self.config.latency_repeats // 5)):
+            start = time.perf_counter()
+            model.predict(block)
+            batch.append((time.perf_counter() - start) / block.shape[0] * 1000)
+        return _single_row_latency_ms(model, X, self.config.latency_repeats), round(float(np.median(batch)) * 1e3, 3)
+
+    def _within_budget(self, result):
+        budget = self.config.latency_budget_ms
+        return budget is None or result["latency_single_ms"] <= budget
+
+    def run(self, X_train, y_train):
+        try:
+            cfg = self.config
+            y_train = np.asarray(y_train)
+            X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=cfg.validation_fraction,
+                                                          random_state=cfg.random_state)
+            # densified once and shared by every HistGradientBoosting trial
+            dense = {"fit": densify(X_fit), "val": densify(X_val)}
+            n_rows = X_fit.shape[0]
+            candidates = self._candidates()
+            survivors = list(range(len(candidates)))
+            results = {cid: {"family": f, "params": p} for cid, (f, p) in enumerate(candidates)}
+            models = {}
+            rows = min(cfg.min_rows, n_rows)
+            round_no = 0
+            logger.info(f"Model search: {len(candidates)} candidates, eta={cfg.eta}, starting at {rows} rows")
+            def trial_args(cid, rows):
+                family, params = candidates[cid]
+                if family == "hist_gradient_boosting":
+                    X_f, X_v = dense["fit"][:rows], dense["val"]
+                else:
+                    X_f, X_v = X_fit[:rows], X_val
+                return cid, family, params, X_f, y_fit[:rows], X_v, y_val, cfg.random_state, cfg.latency_repeats
+
+            while True:
+                trials = Parallel(n_jobs=cfg.n_jobs)(delayed(_run_trial)(*trial_args(cid, rows)) for cid in survivors)
+                for cid, model, metrics in trials:
+                    results[cid].update(metrics, rows=rows, round=round_no)
+                    models[cid] = model
+                survivors.sort(key=lambda cid: results[cid]["rmse"])
+                logger.info(f"Round {round_no}: {len(survivors)} candidates on {rows} rows, "
+                            f"best RMSE {results[survivors[0]]['rmse']:.4f}")
+                if rows >= n_rows:
+                    break
+                # budget-aware pruning: candidates far too slow to serve go first
+                fast_enough = [cid for cid in survivors if self._within_budget(results[cid])]
+                survivors = fast_enough or survivors
+                # keep at least eta finalists so the last round still shows a trade-off
+                survivors = survivors[:max(min(cfg.eta, len(survivors)), math.ceil(len(survivors) / cfg.eta))]
+                models = {cid: models[cid] for cid in survivors}
+                rows = min(n_rows, rows * cfg.eta)
+                round_no += 1
+
+            # finalists: everything that reached the last round
+            for cid in survivors:
+                X_lat = dense["val"] if results[cid]["family"] == "hist_gradient_boosting" else X_val
+                results[cid]["latency_single_ms"], results[cid]["latency_ms_per_1k_rows"] = \
+                    self._latency(models[cid], X_lat)
+                results[cid]["finalist"] = True
+            self._mark_pareto([results[cid] for cid in survivors])
+
+            eligible = [cid for cid in survivors if self._within_budget(results[cid])]
+            if not eligible:
+                logger.warning(f"No finalist meets the {cfg.latency_budget_ms} ms budget; picking the fastest")
+                eligible = [min(survivors, key=lambda cid: results[cid]["latency_single_ms"])]
+            best = min(eligible, key=lambda cid: results[cid]["rmse"])
+            self.best = (results[best]["family"], results[best]["params"])
+            self.report = {
+                "best": results[best],
+                "latency_budget_ms": cfg.latency_budget_ms,
+                "candidates": sorted(results.values(), key=lambda r: (-r.get("round", -1), r.get("rmse", math.inf))),
+            }
+            logger.info(f"Model search picked {self.best[0]} {self.best[1]}")
+            return self.report
+        except Exception as e:
+            raise CustomException("Error during model search", e)
+
+    @staticmethod
+    def _mark_pareto(finalists):
+        # a finalist is on the front if no other one is both more accurate and faster
+        for r in finalists:
+            r["pareto_optimal"] = not any(
+                o is not r and o["rmse"] <= r["rmse"] and o["latency_single_ms"] <= r["latency_single_ms"]
+                and (o["rmse"] < r["rmse"] or o["latency_single_ms"] < r["latency_single_ms"])
+                for o in finalists)
+
+    def build_best(self, random_state=42, n_jobs=-1):
+        """Unfitted estimator for the chosen candidate, to be refit on the full training split."""
+        if self.best is None:
+            raise CustomException("ModelSearch.run must be called before build_best")
+        return make_estimator(self.best[0], self.best[1], random_state=random_state, n_jobs=n_jobs)
@@ -1,9 +1,18 @@
 # src/model_trainer.py
 
-from dataclasses import dataclass
+import os
+import shutil
+from dataclasses import dataclass, field
+import sklearn
+from scipy import sparse
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, r2_score
-from src.utils import save_object
+from src.utils import save_object, save_json
+from src import forest_engine, forest_compaction, model_search
+from src.forest_engine import CompiledForest
+from src.forest_compaction import ForestCompactor, ForestCompactionConfig
+from src.model_search import ModelSearch, ModelSearchConfig
+from src.stage_cache import StageCache, array_fingerprint
 from src.logger import get_logger
 from src.exception import CustomException
 
@@ -15,27 +24,63 @@ class ModelTrainerConfig:
     n_estimators: int = 10        # small model for quick debugging
     random_state: int = 42
     n_jobs: int = -1              # use all CPU cores for faster training
+    compiled_model_dir: str = None  # also export the forest as flat arrays for the compiled backend
+    search: bool = False          # pick the estimator by successive-halving search instead of a fixed forest
+    search_config: ModelSearchConfig = field(default_factory=ModelSearchConfig)
+    search_report_path: str = None  # defaults to search_report.json next to the model
+    compaction: ForestCompactionConfig = None  # also write a pruned/quantized/subset forest for backend="compact"
 
 
 class ModelTrainer:
-    def __init__(self, config: ModelTrainerConfig):
+    def __init__(self, config: ModelTrainerConfig, cache: StageCache = None):
         self.config = config
+        self.cache = cache
+
+    def _cache_key(self, X_train, y_train, X_test, y_test):
+        return self.cache.key("trainer", config=self.config,
+                              sources=[__file__, model_search.__file__, forest_engine.__file__,
+                                       forest_compaction.__file__],
+                              extra={"data": array_fingerprint(X_train, y_train, X_test, y_test),
+                                     "sklearn": sklearn.__version__})
 
     def initiate_model_trainer(self, X_train, y_train, X_test, y_test):
         try:
-            logger.info(f"Creating RandomForest with n_estimators={self.config.n_estimators}")
+            if self.cache is not None:
+                key = self._cache_key(X_train, y_train, X_test, y_test)
+                manifest = self.cache.load("trainer", key)
+                if manifest:
+                    if self.config.compiled_model_dir and "compiled" not in manifest["outputs"]:
+                        shutil.rmtree(self.config.compiled_model_dir, ignore_errors=True)
+                    if self.config.compaction and "compact" not in manifest["outputs"]:
+                        shutil.rmtree(self.config.compaction.compact_model_dir, ignore_errors=True)
+                    return manifest["meta"]
+
+            if sparse.issparse(X_train):
+                # RandomForest fits and predicts on CSR/CSC directly; never densify here
+                logger.info(f"Training on sparse matrix {X_train.shape} with {X_train.nnz} non-zeros")
 
             # Create model
-            model = RandomForestRegressor(
-                n_estimators=self.config.n_estimators,
-                random_state=self.config.random_state,
-                n_jobs=self.config.n_jobs
-            )
+            search_report_path = None
+            if self.config.search:
+                search = ModelSearch(self.config.search_config)
+                report = search.run(X_train, y_train)
+                search_report_path = self.config.search_report_path or os.path.join(
+                    os.path.dirname(self.config.model_path), "search_report.json")
+                save_json(search_report_path, report)
+                logger.info(f"Saved model search report at {search_report_path}")
+                model = search.build_best(random_state=self.config.random_state, n_jobs=self.config.n_jobs)
+            else:
+                logger.info(f"Creating RandomForest with n_estimators={self.config.n_estimators}")
+                model = RandomForestRegressor(
+                    n_estimators=self.config.n_estimators,
+                    random_state=self.config.random_state,
+                    n_jobs=self.config.n_jobs
+                )
 
             # Train model
-            logger.info("Starting RandomForest training ...")
+            logger.info(f"Starting {type(model).__name__} training ...")
             model.fit(X_train, y_train)
-            logger.info("RandomForest training finished")
+            logger.info(f"{type(model).__name__} training finished")
 
             # Predictions
             preds = model.predict(X_test)
@@ -50,13 +95,41 @@ class ModelTrainer:
             # Save model
             save_object(self.config.model_path, model)
             logger.info(f"Saved trained model at {self.config.model_path}")
+            if self.config.compiled_model_dir:
+                if isinstance(model, RandomForestRegressor):
+                    CompiledForest.from_sklearn(model).save(self.config.compiled_model_dir)
+                    logger.info(f"Exported compiled forest at {self.config.compiled_model_dir}")
+                else:
+                    # a stale export from an earlier forest must not shadow the new model
+                    shutil.rmtree(self.config.compiled_model_dir, ignore_errors=True)
+            compaction_report = None
+            if self.config.compaction:
+                if isinstance(model, RandomForestRegressor):
+                    compaction_report = ForestCompactor(self.config.compaction).initiate_compaction(
+                        model, self.config.model_path, X_test, y_test)
+                else:
+                    shutil.rmtree(self.config.compaction.compact_model_dir, ignore_errors=True)
 
             # Return results
-            return {
+            results = {
                 "model_path": self.config.model_path,
                 "rmse": rmse,
                 "r2": r2
             }
+            if search_report_path:
+                results["search_report_path"] = search_report_path
+            if compaction_report:
+                results["compaction"] = {k: compaction_report[k] for k in ("n_estimators", "r2", "size_bytes")}
+            if self.cache is not None:
+                outputs = {"model": self.config.model_path}
+                if self.config.compiled_model_dir and os.path.isdir(self.config.compiled_model_dir):
+                    outputs["compiled"] = self.config.compiled_model_dir
+                if search_report_path:
+                    outputs["search_report"] = search_report_path
+                if compaction_report:
+                    outputs["compact"] = self.config.compaction.compact_model_dir
+                self.cache.store("trainer", key, outputs=outputs, meta=results)
+            return results
 
         except Exception as e:
             logger.exception("Exception in model training")
@@ -0,0 +1,377 @@
+# src/out_of_core.py
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from src.utils import save_object, save_json, read_csv_chunks
+from src.schema import MOVIE_SCHEMA, apply_schema
+from src.encoders import _as_frame
+from src.column_profiler import ColumnProfiler, ColumnProfilerConfig
+from src.data_transformation import DataTransformation, DataTransformationConfig
+from src.incremental_trainer import split_mask
+from src.forest_engine import CompiledForest
+from src.logger import get_logger
+from src.exception import CustomException
+
+logger = get_logger(__name__)
+
+# Rough per-row working set of the tree builder (sample indices, weights,
+# feature values and bookkeeping), used to size n_jobs / max_samples.
+TREE_BUILDER_BYTES_PER_ROW = 48
+# sklearn Node struct + one float64 value per node; node arrays double on resize
+TREE_NODE_BYTES = 72 * 2
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    except (ImportError, AttributeError):
+        return None
+
+
+@dataclass
+class OutOfCoreConfig:
+    raw_data_path: str
+    work_dir: str                     # memory-mapped feature matrices are written here
+    preprocessor_path: str
+    model_path: str
+    compiled_model_dir: str = None
+    encoding_plan_path: str = None    # defaults to encoding_plan.json next to the preprocessor
+    target_col: str = "revenue"
+    test_size: float = 0.2
+    memory_budget_mb: int = 1024      # anonymous memory target for chunks, sample, counters and tree building
+    max_reservoir_rows: int = 200_000
+    n_estimators: int = 10
+    random_state: int = 42
+    n_jobs: int = -1
+    schema: dict = field(default_factory=lambda: dict(MOVIE_SCHEMA))
+    profiler: ColumnProfilerConfig = field(default_factory=ColumnProfilerConfig)
+
+    def __post_init__(self):
+        if self.encoding_plan_path is None:
+            self.encoding_plan_path = os.path.join(os.path.dirname(self.preprocessor_path), "encoding_plan.json")
+        # the encoder is fitted on the reservoir sample and those same rows are then transformed into the
+        # training matrix, which would leak their targets; cross-fitting needs the rows in memory
+        if self.profiler.high_cardinality_encoding == "target":
+            raise ValueError("Target encoding is not supported by out-of-core training; "
+                             "use high_cardinality_encoding='frequency' or 'hash'")
+
+
+class StreamingStats:
+    """
+    Single-pass statistics over the training rows of a chunked file:
+      - numeric columns: count, mean and M2 (Chan/Welford merge per chunk) plus missing counts
+      - text columns: value counts, capped at `max_categories` distinct values per column
+        (near-unique columns stop growing instead of exhausting memory)
+      - a uniform reservoir sample of whole rows (Algorithm R), used as the median
+        sketch, for column profiling and to fit the sample-based parts of the preprocessor
+    """
+    def __init__(self, reservoir_rows, max_categories, seed=0):
+        self.reservoir_rows = reservoir_rows
+        self.max_categories = max_categories
+        self.rng = np.random.default_rng(seed)
+        self.n_rows = 0
+        self.moments = {}
+        self.counts = {}
+        self.capped = set()
+        self.reservoir = None
+        self.columns = None
+
+    def _update_moments(self, col, values):
+        present = ~np.isnan(values)
+        values = values[present]
+        n_b = len(values)
+        n_a, mean_a, m2_a, missing = self.moments.get(col, (0, 0.0, 0.0, 0))
+        missing += len(present) - n_b
+        if n_b:
+            mean_b = float(values.mean())
+            m2_b = float(((values - mean_b) ** 2).sum())
+            n = n_a + n_b
+            delta = mean_b - mean_a
+            mean_a = mean_a + delta * n_b / n
+            m2_a = m2_a + m2_b + delta * delta * n_a * n_b / n
+            n_a = n
+        self.moments[col] = (n_a, mean_a, m2_a, missing)
+
+    def _update_reservoir(self, df):
+        n_seen = self.n_rows
+        m = len(df)
+        if self.reservoir is None:
+            self.columns = list(df.columns)
+            self.reservoir = {c: np.empty(self.reservoir_rows, dtype=df[c].to_numpy().dtype) for c in self.columns}
+            self.reservoir_fill = 0
+        # positions still free are filled in order, the rest replace slot j with probability R / (i + 1)
+        fill = min(self.reservoir_rows - self.reservoir_fill, m)
+        if fill:
+            for c in self.columns:
+                self.reservoir[c][self.reservoir_fill:self.reservoir_fill + fill] = df[c].to_numpy()[:fill]
+            self.reservoir_fill += fill
+        rest = np.arange(fill, m)
+        if len(rest):
+            slots = (self.rng.random(len(rest)) * (n_seen + rest + 1)).astype(np.int64)
+            keep = slots < self.reservoir_rows
+            rows, slots = rest[keep], slots[keep]
+            # a later row wins a slot picked twice in one chunk, as in the sequential algorithm
+            _, last = np.unique(slots[::-1], return_index=True)
+            pick = len(slots) - 1 - last
+            for c in self.columns:
+                self.reservoir[c][slots[pick]] = df[c].to_numpy()[rows[pick]]
+
+    def update(self, df, numeric_cols, text_cols):
+        for col in numeric_cols:
+            self._update_moments(col, df[col].to_numpy(dtype=np.float64))
+        if text_cols:
+            as_text = _as_frame(df[text_cols])
+            for col in text_cols:
+                counter = self.counts.setdefault(col, Counter())
+                vc = as_text[col].value_counts()
+                if col in self.capped:
+                    vc = vc[vc.index.isin(counter.keys())]
+                counter.update(vc.to_dict())
+                if len(counter) > self.max_categories:
+                    self.capped.add(col)
+                    for key, _ in counter.most_common()[self.max_categories:]:
+                        del counter[key]
+        self._update_reservoir(df)
+        self.n_rows += len(df)
+
+    def sample_frame(self, schema):
+        df = pd.DataFrame({c: arr[:self.reservoir_fill] for c, arr in self.reservoir.items()})
+        return apply_schema(df, schema)
+
+
+class OutOfCoreTrainer:
+    """
+    Trains the preprocessor and forest on a raw CSV larger than memory.
+
+    Pass 1 streams the file in chunks: rows are split train/test by hashed id,
+    and StreamingStats collects the numeric moments, category counts and a
+    reservoir sample of the training rows. The preprocessor is built from the
+    column profile of that sample and fitted on it. The statistics a
+    streamed pass gives exactly then overwrite the sample estimates:
+      - scaler mean/variance
+      - one-hot imputer modes
+      - frequency-encoder frequencies
+    Medians come from the sample (the sketch), and one-hot categories are
+    set explicitly to every value seen in the stream.
+    Pass 2 transforms chunk by chunk into float32 .npy matrices opened with
+    np.memmap, and the forest is fitted on the mapped training matrix.
+
+    Chunk size, sample size, counter caps, n_jobs, max_samples and
+    max_leaf_nodes are all derived from `memory_budget_mb`. The mapped matrices are file-backed, so
+    the OS can evict their pages; they are not counted against the budget.
+    """
+    def __init__(self, config: OutOfCoreConfig):
+        self.config = config
+
+    def _plan_memory(self, probe):
+        budget = self.config.memory_budget_mb * 1024 * 1024
+        bytes_per_row = max(int(probe.memory_usage(deep=True).sum() / max(len(probe), 1)), 1)
+        text_cols = [c for c in probe.columns if not pd.api.types.is_numeric_dtype(probe[c])]
+        # pass 1 holds a chunk ~3x over (raw frame, string view, transformed block), the sample and the counters
+        chunksize = max(1_000, int(budget * 0.25 / (3 * bytes_per_row)))
+        reservoir_rows = max(1_000, min(self.config.max_reservoir_rows, int(budget * 0.2 / bytes_per_row)))
+        max_categories = max(1_000, int(budget * 0.15 / (max(len(text_cols), 1) * 150)))
+        plan = {"bytes_per_row": bytes_per_row, "chunksize": chunksize,
+                "reservoir_rows": reservoir_rows, "max_categories": max_categories}
+        logger.info(f"Memory plan for {self.config.memory_budget_mb} MB: {plan}")
+        return plan
+
+    def _chunks(self, chunksize):
+        """Yields (frame, is_test) per chunk with the schema applied."""
+        offset = 0
+        for chunk in read_csv_chunks(self.config.raw_data_path, chunksize, dtype=self.config.schema):
+            chunk = apply_schema(chunk, self.config.schema)
+            yield chunk, split_mask(chunk, offset, self.config.test_size)
+            offset += len(chunk)
+
+    def _fit_preprocessor(self, stats, numeric_cols):
+        cfg = self.config
+        sample = stats.sample_frame(cfg.schema)
+        X_sample, y_sample = sample.drop(columns=[cfg.target_col]), sample[cfg.target_col]
+        plan = ColumnProfiler(cfg.profiler).profile(X_sample)
+        for col, info in plan.items():
+            info["profiled_on"] = f"reservoir sample of {len(sample)} rows"
+        save_json(cfg.encoding_plan_path, plan)
+
+        transformation = DataTransformation(
+            DataTransformationConfig(preprocessor_path=cfg.preprocessor_path, sparse_output=True,
+                                     encoding_plan_path=cfg.encoding_plan_path, profiler=cfg.profiler),
+            cfg.target_col)
+        preprocessor = transformation.get_profiled_preprocessor(plan)
+        for name, trans, cols in preprocessor.transformers:
+            if name == "onehot":
+                sample_text = _as_frame(X_sample[cols])
+                categories = []
+                for col in cols:
+                    seen = set(stats.counts.get(col, {})) | set(sample_text[col])
+                    seen.discard("")
+                    categories.append(sorted(seen))
+                trans.named_steps["encoder"].set_params(categories=categories)
+        preprocessor.fit(X_sample, y_sample)
+
+        for name, trans, cols in preprocessor.transformers_:
+            if name == "num":
+                imputer, scaler = trans.named_steps["imputer"], trans.named_steps["scaler"]
+                mean, var = [], []
+                for col, median in zip(cols, imputer.statistics_):
+                    n, m, m2, missing = stats.moments[col]
+                    # imputed rows sit at the median: fold them into the streamed moments
+                    total = n + missing
+                    mean_all = (n * m + missing * median) / total
+                    m2_all = m2 + n * (m - mean_all) ** 2 + missing * (median - mean_all) ** 2
+                    mean.append(mean_all)
+                    var.append(m2_all / total)
+                scaler.mean_ = np.asarray(mean)
+                scaler.var_ = np.asarray(var)
+                scale = np.sqrt(scaler.var_)
+                scaler.scale_ = np.where(scale == 0.0, 1.0, scale)
+                scaler.n_samples_seen_ = stats.n_rows
+            elif name == "onehot":
+                imputer = trans.named_steps["imputer"]
+                for j, col in enumerate(cols):
+                    counts = {k: v for k, v in stats.counts[col].items() if k != ""}
+                    if counts:
+                        imputer.statistics_[j] = max(counts, key=counts.get)
+            elif name == "frequency":
+                trans.frequencies_ = [{k: v / stats.n_rows for k, v in stats.counts[col].items()} for col in cols]
+        save_object(cfg.preprocessor_path, preprocessor)
+        logger.info(f"Preprocessor fitted from {stats.n_rows} streamed rows "
+                    f"({len(sample)}-row sample, capped columns: {sorted(stats.capped)})")
+        return preprocessor
+
+    def _forest_params(self, n_train):
+        """
+        n_jobs, max_samples and max_leaf_nodes that keep training inside the budget:
+        35% for the builders' per-row working sets (one per concurrent tree) and 45%
+        for the fitted trees, whose size grows with the rows when left unconstrained.
+        """
+        cfg = self.config
+        budget = cfg.memory_budget_mb * 1024 * 1024
+        builder_budget, model_budget = budget * 0.35, budget * 0.45
+        per_tree = TREE_BUILDER_BYTES_PER_ROW * n_train
+        n_jobs = os.cpu_count() if cfg.n_jobs in (None, -1) else cfg.n_jobs
+        n_jobs = max(1, min(n_jobs, int(builder_budget // per_tree)))
+        max_samples = None
+        if per_tree > builder_budget:
+            max_samples = max(builder_budget / per_tree, 1.0 / n_train)
+            logger.warning(f"Bootstrap samples capped at {max_samples:.1%} of {n_train} rows to fit the budget")
+        # a fully grown tree has about one leaf per distinct bootstrap row (~63% of them)
+        rows_per_tree = n_train * (max_samples or 1.0)
+        max_leaf_nodes = int(model_budget / (cfg.n_estimators * 2 * TREE_NODE_BYTES))
+        if rows_per_tree * 0.632 <= max_leaf_nodes:
+            max_leaf_nodes = None
+        else:
+            logger.warning(f"Trees capped at {max_leaf_nodes} leaves to fit the budget")
+        return n_jobs, max_samples, max(max_leaf_nodes, 2) if max_leaf_nodes else None
+
+    def initiate_out_of_core_training(self):
+        try:
+            cfg = self.config
+            probe = apply_schema(pd.read_csv(cfg.raw_data_path, nrows=1_000, dtype=cfg.schema), cfg.schema)
+            mem = self._plan_memory(probe)
+            feature_cols = [c for c in probe.columns if c != cfg.target_col]
+            numeric_cols = [c for c in feature_cols if pd.api.types.is_numeric_dtype(probe[c])]
+            text_cols = [c for c in feature_cols if c not in numeric_cols]
+
+            # pass 1: split + statistics
+            stats = StreamingStats(mem["reservoir_rows"], mem["max_categories"], seed=cfg.random_state)
+            n_train = n_test = 0
+            for chunk, is_test in self._chunks(mem["chunksize"]):
+                train = chunk[~is_test]
+                stats.update(train, numeric_cols, text_cols)
+                n_train += len(train)
+                n_test += int(is_test.sum())
+            logger.info(f"Pass 1 done: {n_train} train / {n_test} test rows")
+            preprocessor = self._fit_preprocessor(stats, numeric_cols)
+            del stats
+
+            # pass 2: transform into memory-mapped float32 matrices
+            n_features = len(preprocessor.get_feature_names_out())
+            os.makedirs(cfg.work_dir, exist_ok=True)
+            open_mm = np.lib.format.open_memmap
+            X_train = open_mm(os.path.join(cfg.work_dir, "X_train.npy"), "w+", np.float32, (n_train, n_features))
+            X_test = open_mm(os.path.join(cfg.work_dir, "X_test.npy"), "w+", np.float32, (n_test, n_features))
+            y_train = open_mm(os.path.join(cfg.work_dir, "y_train.npy"), "w+", np.float64, (n_train,))
+            y_test = open_mm(os.path.join(cfg.work_dir, "y_test.npy"), "w+", np.float64, (n_test,))
+            i_train = i_test = 0
+            for chunk, is_test in self._chunks(mem["chunksize"]):
+                Xt = preprocessor.transform(chunk.drop(columns=[cfg.target_col]))
+                Xt = Xt.toarray() if sparse.issparse(Xt) else np.asarray(Xt)
+                y = chunk[cfg.target_col].to_numpy(dtype=np.float64)
+                k = len(chunk) - int(is_test.sum())
+                X_train[i_train:i_train + k] = Xt[~is_test]
+                y_train[i_train:i_train + k] = y[~is_test]
+                X_test[i_test:i_test + len(chunk) - k] = Xt[is_test]
+                y_test[i_test:i_test + len(chunk) - k] = y[is_test]
+                i_train += k
+                i_test += len(chunk) - k
+            for arr in (X_train, X_test, y_train, y_test):
+                arr.flush()
+            del X_train, X_test, y_train, y_test
+            logger.info(f"Pass 2 done: {n_features} features written to {cfg.work_dir}")
+
+            # training from the mapped matrix
+            X_train = np.load(os.path.join(cfg.work_dir, "X_train.npy"), mmap_mode="r")
+            y_train = np.load(os.path.join(cfg.work_dir, "y_train.npy"), mmap_mode="r")
+            n_jobs, max_samples, max_leaf_nodes = self._forest_params(n_train)
+            model = RandomForestRegressor(n_estimators=cfg.n_estimators, random_state=cfg.random_state,
+                                          n_jobs=n_jobs, max_samples=max_samples, max_leaf_nodes=max_leaf_nodes)
+            logger.info(f"Training RandomForest on memory-mapped {X_train.shape} matrix with n_jobs={n_jobs}")
+            model.fit(X_train, y_train)
+            model.n_jobs = cfg.n_jobs
+
+            X_test = np.load(os.path.join(cfg.work_dir, "X_test.npy"), mmap_mode="r")
+            y_test = np.load(os.path.join(cfg.work_dir, "y_test.npy"), mmap_mode="r")
+            preds = np.concatenate([model.predict(X_test[i:i + mem["chunksize"]])
+                                    for i in range(0, n_test, mem["chunksize"])]) if n_test else np.empty(0)
+            rmse = mean_squared_error(y_test, preds) ** 0.5 if n_test else None
+            r2 = r2_score(y_test, preds) if n_test > 1 else None
+            logger.info(f"RMSE on test set: {rmse}, R2: {r2}")
+
+            save_object(cfg.model_path, model)
+            if cfg.compiled_model_dir:
+                CompiledForest.from_sklearn(model).save(cfg.compiled_model_dir)
+            return {
+                "model_path": cfg.model_path,
+                "rmse": rmse,
+                "r2": r2,
+                "train_rows": n_train,
+                "test_rows": n_test,
+                "n_features": n_features,
+                "memory_plan": mem,
+                "peak_rss_mb": peak_rss_mb(),
+            }
+        except Exception as e:
+            logger.exception("Exception in out-of-core training")
+            raise CustomException("Error during out-of-core training", e)
+
+
+def main(argv=None):
+    import argparse
+    base = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Train on a raw CSV larger than memory.")
+    parser.add_argument("raw_csv", nargs="?", default=os.path.join(base, "data", "movie_revenue_prediction.csv"))
+    parser.add_argument("--artifacts-dir", default=os.path.join(base, "artifacts"))
+    parser.add_argument("--memory-budget-mb", type=int, default=1024)
+    parser.add_argument("--n-estimators", type=int, default=10)
+    args = parser.parse_args(argv)
+    trainer = OutOfCoreTrainer(OutOfCoreConfig(
+        raw_data_path=args.raw_csv,
+        work_dir=os.path.join(args.artifacts_dir, "out_of_core"),
+        preprocessor_path=os.path.join(args.artifacts_dir, "transformer", "preprocessor.joblib"),
+        model_path=os.path.join(args.artifacts_dir, "models", "random_forest.joblib"),
+        compiled_model_dir=os.path.join(args.artifacts_dir, "models", "random_forest_compiled"),
+        memory_budget_mb=args.memory_budget_mb,
+        n_estimators=args.n_estimators,
+    ))
+    print(trainer.initiate_out_of_core_training())
+
+
+if __name__ == "__main__":
+    main()
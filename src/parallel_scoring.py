@@ -0,0 +1,174 @@
+# src/parallel_scoring.py
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from src.predict_pipeline import PredictPipeline, DEFAULT_CHUNKSIZE
+from src.utils import csv_record_ranges, ChunkWriter
+from src.validation import ValidationReport
+from src.logger import get_logger
+from src.exception import CustomException
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ParallelScoringConfig:
+    artifacts_dir: str = None
+    n_workers: int = None          # defaults to os.cpu_count()
+    chunksize: int = DEFAULT_CHUNKSIZE
+    backend: str = "sklearn"
+    max_pending: int = None        # chunks in flight; defaults to 2 * n_workers
+    shard_bytes: int = None        # CSV bytes per task; defaults to about `chunksize` rows
+
+
+# Each pool process keeps its own pipeline, loaded once by the initializer.
+_worker_pipeline = None
+
+
+def _init_worker(artifacts_dir, backend):
+    global _worker_pipeline
+    _worker_pipeline = PredictPipeline(artifacts_dir=artifacts_dir, backend=backend, mmap_mode="r")
+    # parallelism comes from the pool; keep the forest single-threaded inside a worker
+    if hasattr(_worker_pipeline.model, "n_jobs"):
+        _worker_pipeline.model.n_jobs = 1
+
+
+def _score_frame(df, validate):
+    """(predictions, report or None); report row numbers start at 0 and are shifted by the parent."""
+    if not validate:
+        return _worker_pipeline.predict_frame(df), None
+    report = ValidationReport()
+    return _worker_pipeline.predict_frame_validated(df, report), report
+
+
+def _score_shard(csv_path, header, start, end, id_columns, validate):
+    """
+    Read and parse bytes [start, end) of the CSV in the worker, so the parent
+    only sends offsets and parsing runs in parallel. Returns (ids + prediction, report).
+    """
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(header + data), dtype=_worker_pipeline._csv_dtypes(validate=validate))
+    preds, report = _score_frame(df, validate)
+    out = df[[c for c in id_columns if c in df.columns]].copy()
+    out["prediction"] = preds
+    return out, report
+
+
+class ParallelScorer:
+    """
+    Splits a DataFrame or CSV into chunks and runs transform + predict for each
+    chunk in a process pool. Results come back in input order; at most
+    `max_pending` chunks are in flight so memory stays bounded for large files.
+    A CSV is split into byte ranges of whole records that each worker reads and
+    parses itself; the parent only scans for record boundaries and writes results.
+    """
+    def __init__(self, config: ParallelScoringConfig = None):
+        self.config = config or ParallelScoringConfig()
+        self.n_workers = self.config.n_workers or os.cpu_count() or 1
+        self.max_pending = self.config.max_pending or 2 * self.n_workers
+
+    def _executor(self):
+        return ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker,
+                                   initargs=(self.config.artifacts_dir, self.config.backend))
+
+    def _map_ordered(self, executor, fn, tasks, report=None):
+        """Submit fn(*task, validate) for each task, keeping max_pending in flight; yield results in order."""
+        pending = deque()
+        row_offset = 0
+        for task in tasks:
+            pending.append(executor.submit(fn, *task, report is not None))
+            if len(pending) >= self.max_pending:
+                result, row_offset = self._collect(pending.popleft(), report, row_offset)
+                yield result
+        while pending:
+            result, row_offset = self._collect(pending.popleft(), report, row_offset)
+            yield result
+
+    @staticmethod
+    def _collect(future, report, row_offset):
+        result, chunk_report = future.result()
+        if chunk_report is not None:
+            # a task's report counts rows from 0; shift them to file positions
+            for example in chunk_report.examples:
+                example["row"] += row_offset
+            report.merge(chunk_report)
+        return result, row_offset + len(result)
+
+    def score_dataframe(self, df: pd.DataFrame, report: ValidationReport = None):
+        """With `report`, invalid rows get NaN and are recorded there (see PredictPipeline.predict_frame_validated)."""
+        try:
+            size = self.config.chunksize
+            chunks = ((df.iloc[start:start + size],) for start in range(0, len(df), size))
+            with self._executor() as executor:
+                parts = list(self._map_ordered(executor, _score_frame, chunks, report))
+            return np.concatenate(parts) if parts else np.array([])
+        except Exception as e:
+            logger.exception("Parallel DataFrame scoring failed")
+            raise CustomException("Parallel DataFrame scoring failed", e)
+
+    def _shard_bytes(self, csv_path, sample_size=1 << 20):
+        if self.config.shard_bytes:
+            return self.config.shard_bytes
+        with open(csv_path, "rb") as f:
+            sample = f.read(sample_size)
+        return max(len(sample) * self.config.chunksize // max(sample.count(b"\n"), 1), 1 << 16)
+
+    def score_csv(self, csv_path: str, output_path: str = None, id_columns=("id",), report: ValidationReport = None):
+        """
+        Return the predictions array, or stream them to output_path and return the row count.
+        With `report`, invalid rows get NaN and are recorded there instead of failing the file.
+        """
+        try:
+            ranges = csv_record_ranges(csv_path, self._shard_bytes(csv_path))
+            header_start, header_end = next(ranges, (0, 0))
+            with open(csv_path, "rb") as f:
+                header = f.read(header_end - header_start)
+            tasks = ((csv_path, header, start, end, tuple(id_columns)) for start, end in ranges)
+            with self._executor() as executor:
+                results = self._map_ordered(executor, _score_shard, tasks, report)
+                if output_path is None:
+                    parts = [out["prediction"].to_numpy() for out in results]
+                    return np.concatenate(parts) if parts else np.array([])
+                n_rows = 0
+                with ChunkWriter(output_path) as writer:
+                    for out in results:
+                        writer.write(out)
+                        n_rows += len(out)
+                logger.info(f"Wrote {n_rows} predictions to {output_path} using {self.n_workers} workers")
+                return n_rows
+        except Exception as e:
+            logger.exception("Parallel CSV scoring failed")
+            raise CustomException("Parallel CSV scoring failed", e)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Score a CSV of movies across a pool of worker processes.")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_path", help="destination .csv or .parquet file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--artifacts-dir", default=None)
+    parser.add_argument("--backend", default="sklearn", choices=PredictPipeline.BACKENDS)
+    parser.add_argument("--strict", action="store_true", help="fail on the first invalid row instead of skipping it")
+    parser.add_argument("--report-path", default=None, help="write the validation report here as JSON")
+    args = parser.parse_args(argv)
+    scorer = ParallelScorer(ParallelScoringConfig(artifacts_dir=args.artifacts_dir, n_workers=args.workers,
+                                                  chunksize=args.chunksize, backend=args.backend))
+    report = None if args.strict else ValidationReport()
+    n_rows = scorer.score_csv(args.input_csv, output_path=args.output_path, report=report)
+    print(f"Scored {n_rows} rows with {scorer.n_workers} workers -> {args.output_path}")
+    if report is not None:
+        print(report.summary())
+        if args.report_path:
+            report.save(args.report_path)
+
+
+if __name__ == "__main__":
+    main()
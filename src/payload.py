@@ -0,0 +1,70 @@
+# src/payload.py
+"""Turning web payloads (JSON objects / form fields) into raw rows for the preprocessor."""
+import math
+
+NUMERIC_FIELDS = ("budget", "runtime", "vote_average", "vote_count",
+                  "release_year", "release_month", "release_day")
+INTEGER_FIELDS = ("vote_count", "release_year", "release_month", "release_day")
+TEXT_FIELDS = ("title", "original_language", "genres")
+
+def safe_float(x):
+    try: return float(x)
+    except: return 0.0
+
+def safe_int(x):
+    # int(float(x)) so "12" and "12.0" both parse; validate_payload rejects fractional values
+    try: return int(float(x))
+    except: return 0
+
+def build_raw_from_payload(payload):
+    """Construct the raw row expected by preprocessor from partial payload dict."""
+    raw = {
+        "id": 0,
+        "title": payload.get("title", ""),
+        "vote_average": safe_float(payload.get("vote_average", 0)),
+        "vote_count": safe_int(payload.get("vote_count", 0)),
+        "status": "Released",
+        "release_date": "",
+        "runtime": safe_float(payload.get("runtime", 0)),
+        "budget": safe_float(payload.get("budget", 0)),
+        "original_language": payload.get("original_language", ""),
+        "original_title": payload.get("title", ""),
+        "overview": "",
+        "genres": payload.get("genres", ""),
+        "production_companies": "",
+        "production_countries": ""
+    }
+    # compose release_date if parts provided
+    y = payload.get("release_year", "")
+    m = payload.get("release_month", "")
+    d = payload.get("release_day", "")
+    if y and m and d:
+        try:
+            raw["release_date"] = f"{int(float(y)):04d}-{int(float(m)):02d}-{int(float(d)):02d}"
+        except:
+            raw["release_date"] = ""
+    return raw
+
+def validate_payload(item):
+    """Return a list of validation messages for one batch item (empty if valid)."""
+    if not isinstance(item, dict):
+        return [f"item must be a JSON object, got {type(item).__name__}"]
+    errors = []
+    for key in NUMERIC_FIELDS:
+        value = item.get(key)
+        if value is None or value == "":
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            errors.append(f"{key}: expected a number, got {value!r}")
+            continue
+        if not math.isfinite(number):
+            errors.append(f"{key}: expected a finite number, got {value!r}")
+        elif key in INTEGER_FIELDS and not number.is_integer():
+            errors.append(f"{key}: expected a whole number, got {value!r}")
+    for key in TEXT_FIELDS:
+        value = item.get(key)
+        if isinstance(value, (list, dict)):
+            errors.append(f"{key}: expected a string, got {type(value).__name__}")
+    return errors
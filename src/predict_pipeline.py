@@ -1,13 +1,43 @@
 # src/predict_pipeline.py
 import os
+import argparse
 import numpy as np
 import pandas as pd
-from src.utils import load_object, read_csv
+from src.utils import load_object, load_json, file_sha256, read_csv, read_csv_chunks, ChunkWriter, to_csr
+from src.forest_engine import CompiledForest
+from src.fast_transform import FastPreprocessor
+from src.prediction_grid import PredictionGrid, GRID_MODES, consumed_columns
+from src.validation import ValidationReport, validate_frame
+from src.feature_store import FeatureStore, FeatureStoreConfig
+from src import metrics
 from src.logger import get_logger
-from src.exception import CustomException
+from src.exception import CustomException, ErrorCode
 
 logger = get_logger(__name__)
 
+DEFAULT_CHUNKSIZE = 50_000
+
+def csv_dtypes(preprocessor):
+    """
+    read_csv dtype mapping derived from a fitted ColumnTransformer, so every chunk
+    parses the same way (e.g. an all-empty text column in one chunk must not come
+    back as float64). Returns None when the preprocessor has no column groups.
+    """
+    transformers = getattr(preprocessor, "transformers_", None)
+    if transformers is None:
+        return None
+    dtypes = {}
+    for name, _, cols in transformers:
+        if name == "remainder" or not isinstance(cols, list):
+            continue
+        for col in cols:
+            dtypes[col] = "float64" if name == "num" else "object"
+    return dtypes
+
+def _input_error_code(e):
+    # a ValueError/TypeError out of the transform means a value the preprocessor cannot take
+    return ErrorCode.VALIDATION if isinstance(e, (ValueError, TypeError)) else None
+
 class PredictPipeline:
     """
     Loads available artifacts. Priority:
@@ -15,20 +45,56 @@ class PredictPipeline:
       2) Else if legacy artifacts (scaler.pkl, feature_names.pkl, encoders, movie_revenue_model.pkl) exist -> use legacy flow.
     Methods:
       - predict_single(input_dict): returns a float prediction
+      - predict_records(records) / predict_rows(rows): vectorized predictions for raw rows
       - predict_from_csv(csv_path): returns numpy array of predictions
+      - iter_predictions_from_csv(csv_path, chunksize): generator of per-chunk predictions
+      - predict_frame_validated(df, report): rows with unparseable numeric values are skipped
+        (NaN prediction) and recorded in a ValidationReport instead of failing the batch;
+        the CSV methods do the same when given `report`
+      - open_feature_store(store_dir): transformed rows keyed by id + raw-row hash; pass it as
+        `feature_store` to predict_frame / the CSV methods and only new or changed rows are
+        transformed (src/feature_store.py)
+    CLI: python -m src.predict_pipeline input.csv output.(csv|parquet) --chunksize 50000
+    backend:
+      - "sklearn" (default): RandomForestRegressor.predict
+      - "compiled": flat-array traversal engine (src/forest_engine.py), same predictions
+        without sklearn's per-call validation/dispatch overhead (modular flow only)
+      - "auto": compiled engine for batches up to COMPILED_MAX_BATCH rows, sklearn above
+        (sklearn's Cython traversal wins on large batches)
+      - "compact": the pruned / quantized / tree-subset forest from src/forest_compaction.py
+        (predictions within its R2 tolerance, not identical); falls back to "compiled" when
+        it is missing or was built from a different random_forest.joblib
+    grid_mode: "exact" / "interpolate" answers predict_rows from the precomputed prediction
+      grid (src/prediction_grid.py) where it covers the row; ignored if no grid was built
+      for the current model and preprocessor
     """
-    def __init__(self, artifacts_dir: str = None, model_filename_priority: str = None, target_column: str = "Revenue"):
+    BACKENDS = ("sklearn", "compiled", "auto", "compact")
+    COMPILED_MAX_BATCH = 256
+
+    def __init__(self, artifacts_dir: str = None, model_filename_priority: str = None, target_column: str = "Revenue",
+                 backend: str = "sklearn", mmap_mode: str = None, fast_transform: bool = True,
+                 grid_mode: str = None):
         try:
             project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
             if artifacts_dir is None:
                 artifacts_dir = os.path.join(project_root, "artifacts")
 
+            if backend not in self.BACKENDS:
+                raise ValueError(f"Unknown backend '{backend}', expected one of {self.BACKENDS}")
+            if grid_mode is not None and grid_mode not in GRID_MODES:
+                raise ValueError(f"Unknown grid_mode '{grid_mode}', expected one of {GRID_MODES}")
             self.target_column = target_column
             self.artifacts_dir = artifacts_dir
+            self.backend = backend
+            self.mmap_mode = mmap_mode  # "r" to share artifact arrays between processes
 
             # priority files
             self.preprocessor_path = os.path.join(artifacts_dir, "transformer", "preprocessor.joblib")
             self.model_path = os.path.join(artifacts_dir, "models", "random_forest.joblib")
+            self.compiled_model_dir = os.path.join(artifacts_dir, "models", "random_forest_compiled")
+            self.compact_model_dir = os.path.join(artifacts_dir, "models", "random_forest_compact")
+            self.grid_dir = os.path.join(artifacts_dir, "models", "prediction_grid")
+            self.grid = None
 
             # legacy files
             self.legacy_model_path = os.path.join(artifacts_dir, "models", "movie_revenue_model.pkl")
@@ -41,8 +107,27 @@ class PredictPipeline:
             if os.path.exists(self.preprocessor_path) and os.path.exists(self.model_path):
                 logger.info("Found preprocessor.joblib and random_forest.joblib -> using modular flow")
                 self.flow = "modular"
-                self.preprocessor = load_object(self.preprocessor_path)
-                self.model = load_object(self.model_path)
+                self.preprocessor = load_object(self.preprocessor_path, mmap_mode=mmap_mode)
+                compact = self._load_compact() if backend == "compact" else None
+                if compact is not None:
+                    self.engine = self.model = compact
+                elif backend in ("compiled", "compact") and os.path.exists(os.path.join(self.compiled_model_dir, "meta.json")):
+                    # the sklearn pickle is not needed at all; skip loading it
+                    self.engine = self._load_engine()
+                    self.model = self.engine
+                else:
+                    self.model = load_object(self.model_path, mmap_mode=mmap_mode)
+                    self.engine = self._load_engine() if backend != "sklearn" else self.model
+                # fixed once: column order and dtypes of the raw frame fed to the preprocessor
+                self.expected_columns = list(self.preprocessor.feature_names_in_)
+                dtypes = csv_dtypes(self.preprocessor) or {}
+                self.column_dtypes = [dtypes.get(c, "object") for c in self.expected_columns]
+                self.numeric_columns = [c for c, t in zip(self.expected_columns, self.column_dtypes) if t == "float64"]
+                # row-tuple transform from the fitted parameters; None if it cannot match sklearn exactly
+                self.fast_preprocessor = (FastPreprocessor.from_column_transformer(self.preprocessor, self.expected_columns)
+                                          if fast_transform else None)
+                if grid_mode is not None:
+                    self.grid = self._load_grid(grid_mode)
             elif os.path.exists(self.legacy_model_path) and os.path.exists(self.feature_names_path):
                 logger.info("Found legacy artifacts -> using legacy flow")
                 self.flow = "legacy"
@@ -51,26 +136,71 @@ class PredictPipeline:
                 self.feature_names = load_object(self.feature_names_path)
                 self.genre_encoder = load_object(self.genre_enc_path) if os.path.exists(self.genre_enc_path) else None
                 self.lang_encoder = load_object(self.lang_enc_path) if os.path.exists(self.lang_enc_path) else None
+                self.engine = self.model
+                self.numeric_columns = []
             else:
                 raise FileNotFoundError("Required model/preprocessor files not found in artifacts. Check artifacts/transformer and artifacts/models.")
 
         except Exception as e:
             logger.exception("Error initializing PredictPipeline")
-            raise CustomException("Failed to initialize PredictPipeline", e)
+            raise CustomException("Failed to initialize PredictPipeline", e, code=ErrorCode.ARTIFACT)
+
+    def _load_engine(self):
+        if os.path.exists(os.path.join(self.compiled_model_dir, "meta.json")):
+            logger.info(f"Loading compiled forest from {self.compiled_model_dir}")
+            return CompiledForest.load(self.compiled_model_dir, mmap_mode=self.mmap_mode)
+        if not hasattr(self.model, "estimators_"):
+            logger.warning(f"{type(self.model).__name__} is not a forest -> compiled backend unavailable, using sklearn")
+            return self.model
+        logger.info("No exported compiled forest found -> compiling from random_forest.joblib")
+        return CompiledForest.from_sklearn(self.model)
+
+    def _load_compact(self):
+        meta_path = os.path.join(self.compact_model_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            logger.warning(f"No compact forest at {self.compact_model_dir} -> using the compiled engine; "
+                           "build it with python -m src.forest_compaction")
+            return None
+        if load_json(meta_path).get("source_model_sha256") != file_sha256(self.model_path):
+            logger.warning("Compact forest was built from a different random_forest.joblib -> not used; "
+                           "rebuild it with python -m src.forest_compaction")
+            return None
+        logger.info(f"Loading compact forest from {self.compact_model_dir}")
+        return CompiledForest.load(self.compact_model_dir, mmap_mode=self.mmap_mode)
+
+    def _load_grid(self, mode):
+        if not os.path.exists(os.path.join(self.grid_dir, "meta.json")):
+            logger.warning(f"No prediction grid at {self.grid_dir} -> every row goes to the model")
+            return None
+        grid = PredictionGrid.load(self.grid_dir, mode=mode, mmap_mode=self.mmap_mode)
+        if not grid.matches(self.model_path, self.preprocessor_path):
+            logger.warning("Prediction grid was built for a different model/preprocessor -> not used; "
+                           "rebuild it with python -m src.prediction_grid")
+            return None
+        logger.info(f"Loaded prediction grid {grid.values.shape} ({mode} mode)")
+        return grid.bind(self.expected_columns)
+
+    def _predict(self, X):
+        metrics.inc("predict_rows_total", X.shape[0])
+        with metrics.timer("predict_stage_seconds", stage="predict"):
+            if self.backend == "auto" and X.shape[0] > self.COMPILED_MAX_BATCH:
+                return self.model.predict(X)
+            return self.engine.predict(X)
 
     def _prepare_modular(self, input_df: pd.DataFrame):
         # preprocessor is a fitted ColumnTransformer or Pipeline; simply transform.
+        # Sparse output stays sparse: the forest predicts directly on CSR input.
         try:
-            X = self.preprocessor.transform(input_df)
-            return X
+            with metrics.timer("predict_stage_seconds", stage="transform"):
+                return to_csr(self.preprocessor.transform(input_df))
         except Exception as e:
             logger.exception("Modular preprocessor transform failed")
-            raise CustomException("Modular preprocessor transform failed", e)
+            raise CustomException("Modular preprocessor transform failed", e, code=_input_error_code(e))
 
-    def _prepare_legacy(self, input_dict: dict):
+    def _prepare_legacy(self, input_data):
         try:
-            # create DF with feature_names order
-            df = pd.DataFrame([input_dict])
+            # create DF with feature_names order (one row dict, or a DataFrame chunk)
+            df = input_data.copy() if isinstance(input_data, pd.DataFrame) else pd.DataFrame([input_data])
             # ensure all expected columns present
             for col in self.feature_names:
                 if col not in df.columns:
@@ -98,12 +228,56 @@ class PredictPipeline:
             logger.exception("Legacy input preparation failed")
             raise CustomException("Legacy input preparation failed", e)
 
+    def frame_from_rows(self, rows):
+        """
+        Raw frame from row sequences already in `expected_columns` order. Each
+        column becomes one typed numpy array, so no per-row pandas work happens.
+        """
+        columns = zip(*rows) if rows else [()] * len(self.expected_columns)
+        data = {name: np.array(values, dtype=dtype)
+                for name, dtype, values in zip(self.expected_columns, self.column_dtypes, columns)}
+        return pd.DataFrame(data, copy=False)
+
+    def rows_from_records(self, records):
+        """Order record dicts by `expected_columns`; missing keys become NaN and are imputed."""
+        return [tuple(r.get(c, np.nan) for c in self.expected_columns) for r in records]
+
+    def predict_rows(self, rows, use_grid=True):
+        """Transform + predict row sequences (expected_columns order) in one vectorized call."""
+        if use_grid and self.grid is not None:
+            return self._predict_rows_grid(rows)
+        try:
+            if self.fast_preprocessor is not None:
+                with metrics.timer("predict_stage_seconds", stage="transform"):
+                    X = self.fast_preprocessor.transform_rows(rows)
+                return self._predict(X)
+            return self._predict(self._prepare_modular(self.frame_from_rows(rows)))
+        except Exception as e:
+            logger.exception("Row prediction failed")
+            raise CustomException("Row prediction failed", e, code=_input_error_code(e))
+
+    def _predict_rows_grid(self, rows):
+        """Grid answers where the grid covers a row; the rest go through the model in one call."""
+        with metrics.timer("predict_stage_seconds", stage="grid"):
+            answers = [self.grid.lookup(row) for row in rows]
+        miss = [i for i, a in enumerate(answers) if a is None]
+        metrics.inc("prediction_grid_total", len(rows) - len(miss), result="hit")
+        metrics.inc("prediction_grid_total", len(miss), result="miss")
+        out = np.array([np.nan if a is None else a for a in answers], dtype=np.float64)
+        if miss:
+            out[miss] = self.predict_rows([rows[i] for i in miss], use_grid=False)
+        return out
+
+    def predict_records(self, records):
+        """Transform + predict a list of raw-row dicts in one vectorized call."""
+        if self.flow != "modular":
+            return self.predict_frame(pd.DataFrame(records))
+        return self.predict_rows(self.rows_from_records(records))
+
     def predict_single(self, input_dict: dict):
         try:
             if self.flow == "modular":
-                df = pd.DataFrame([input_dict])
-                X = self._prepare_modular(df)
-                pred = self.model.predict(X)
+                pred = self.predict_records([input_dict])
                 return float(pred[0])
             else:
                 X = self._prepare_legacy(input_dict)
@@ -113,18 +287,125 @@ class PredictPipeline:
             logger.exception("Prediction failed")
             raise CustomException("Prediction failed", e)
 
-    def predict_from_csv(self, csv_path: str):
+    def open_feature_store(self, store_dir: str, **config):
+        """FeatureStore for this preprocessor version (modular flow only); config: FeatureStoreConfig fields."""
+        if self.flow != "modular":
+            raise ValueError("The feature store needs the modular (preprocessor.joblib) flow")
+        # columns the preprocessor drops (free text, ids) cannot change the features; leave them out of the row hash
+        used = consumed_columns(self.preprocessor)
+        columns = [c for c in self.expected_columns if c in used] if used else self.expected_columns
+        return FeatureStore(FeatureStoreConfig(store_dir=store_dir, **config),
+                            file_sha256(self.preprocessor_path), columns)
+
+    def predict_frame(self, df: pd.DataFrame, feature_store: FeatureStore = None):
+        """Vectorized predictions for a DataFrame of raw rows, in either flow."""
+        if self.flow == "modular":
+            if feature_store is not None:
+                return self._predict(feature_store.transform(df, self._prepare_modular))
+            return self._predict(self._prepare_modular(df))
+        return self.model.predict(self._prepare_legacy(df))
+
+    def predict_frame_validated(self, df: pd.DataFrame, report: ValidationReport, row_offset: int = 0,
+                                feature_store: FeatureStore = None):
+        """
+        predict_frame for dirty input: rows whose numeric columns hold unparseable or
+        non-finite values get a NaN prediction and are recorded in `report`; the valid
+        rows are scored in one call.
+        """
+        df, valid = validate_frame(df, self.numeric_columns, report, row_offset)
+        if valid.all():
+            return self.predict_frame(df, feature_store)
+        preds = np.full(len(df), np.nan)
+        if valid.any():
+            preds[valid] = self.predict_frame(df[valid], feature_store)
+        return preds
+
+    def _csv_dtypes(self, validate=False):
+        dtypes = csv_dtypes(getattr(self, "preprocessor", None))
+        if validate and dtypes:
+            # numeric columns are parsed by validate_frame so one bad cell cannot fail the chunk
+            dtypes = {c: "object" for c in dtypes}
+        return dtypes
+
+    def iter_predictions_from_csv(self, csv_path: str, chunksize: int = DEFAULT_CHUNKSIZE, id_columns=("id",),
+                                  report: ValidationReport = None, feature_store: FeatureStore = None):
+        """
+        Stream a CSV in chunks of `chunksize` rows and yield one DataFrame per chunk
+        holding the id columns present in the file plus a "prediction" column.
+        Memory is bounded by the chunk size, not the file size. With `report`, invalid
+        rows are skipped and recorded (see predict_frame_validated) instead of raising.
+        """
+        try:
+            row_offset = 0
+            for chunk in read_csv_chunks(csv_path, chunksize, dtype=self._csv_dtypes(validate=report is not None)):
+                out = chunk[[c for c in id_columns if c in chunk.columns]].copy()
+                if report is None:
+                    out["prediction"] = self.predict_frame(chunk, feature_store)
+                else:
+                    out["prediction"] = self.predict_frame_validated(chunk, report, row_offset, feature_store)
+                row_offset += len(chunk)
+                yield out
+        except Exception as e:
+            logger.exception("Streaming CSV prediction failed")
+            raise CustomException("Streaming CSV prediction failed", e)
+
+    def predict_from_csv(self, csv_path: str, chunksize: int = None, output_path: str = None,
+                         report: ValidationReport = None, feature_store: FeatureStore = None):
+        """
+        Without arguments: read the whole file and return a numpy array of predictions.
+        With chunksize: read in chunks and return the concatenated predictions.
+        With output_path (.csv or .parquet): stream predictions to the file chunk by
+        chunk and return the number of rows written.
+        With report: invalid rows get NaN and are recorded there instead of raising.
+        With feature_store: unchanged rows reuse their stored transformed features.
+        """
         try:
+            if output_path is not None:
+                n_rows = 0
+                with ChunkWriter(output_path) as writer:
+                    for out in self.iter_predictions_from_csv(csv_path, chunksize or DEFAULT_CHUNKSIZE,
+                                                              report=report, feature_store=feature_store):
+                        writer.write(out)
+                        n_rows += len(out)
+                logger.info(f"Wrote {n_rows} predictions to {output_path}")
+                return n_rows
+            if chunksize is not None or report is not None or feature_store is not None:
+                parts = [out["prediction"].to_numpy() for out in
+                         self.iter_predictions_from_csv(csv_path, chunksize or DEFAULT_CHUNKSIZE, report=report,
+                                                        feature_store=feature_store)]
+                return np.concatenate(parts) if parts else np.array([])
             df = read_csv(csv_path)
-            if self.flow == "modular":
-                X = self._prepare_modular(df)
-                preds = self.model.predict(X)
-                return preds
-            else:
-                preds = []
-                for _, row in df.iterrows():
-                    preds.append(self.predict_single(row.to_dict()))
-                return np.array(preds)
+            return self.predict_frame(df)
         except Exception as e:
             logger.exception("CSV prediction failed")
             raise CustomException("CSV prediction failed", e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of movies in fixed-size chunks.")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_path", help="destination .csv or .parquet file")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--artifacts-dir", default=None)
+    parser.add_argument("--backend", default="sklearn", choices=PredictPipeline.BACKENDS)
+    parser.add_argument("--strict", action="store_true", help="fail on the first invalid row instead of skipping it")
+    parser.add_argument("--report-path", default=None, help="write the validation report here as JSON")
+    parser.add_argument("--feature-store", default=None, metavar="DIR",
+                        help="reuse transformed features of unchanged rows (keyed by id) stored in DIR")
+    args = parser.parse_args(argv)
+    pipeline = PredictPipeline(artifacts_dir=args.artifacts_dir, backend=args.backend)
+    report = None if args.strict else ValidationReport()
+    store = pipeline.open_feature_store(args.feature_store) if args.feature_store else None
+    n_rows = pipeline.predict_from_csv(args.input_csv, chunksize=args.chunksize, output_path=args.output_path,
+                                       report=report, feature_store=store)
+    print(f"Scored {n_rows} rows -> {args.output_path}")
+    if store is not None:
+        print(f"Feature store: {store.stats()}")
+    if report is not None:
+        print(report.summary())
+        if args.report_path:
+            report.save(args.report_path)
+
+
+if __name__ == "__main__":
+    main()
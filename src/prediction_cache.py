@@ -0,0 +1,109 @@
+# src/prediction_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def artifact_version(paths):
+    """Cheap change token for a set of artifact files/dirs: (path, mtime_ns, size) of each one that exists."""
+    token = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            token.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            token.append((path, None, None))
+    return tuple(token)
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with per-entry TTL for model predictions.
+
+    Keys are the normalized raw rows produced by build_raw_from_payload (as a
+    tuple in preprocessor column order). Entries expire after `ttl` seconds,
+    the least recently used entry is evicted once `maxsize` is reached, and the
+    whole cache is dropped when any file in `watch_paths` changes (checked at
+    most every `check_interval` seconds).
+    """
+    def __init__(self, maxsize=4096, ttl=300.0, watch_paths=(), check_interval=1.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.watch_paths = tuple(watch_paths)
+        self.check_interval = check_interval
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = artifact_version(self.watch_paths)
+        self._next_check = clock() + check_interval
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    @staticmethod
+    def make_key(raw: dict, columns):
+        return tuple(raw.get(c, "") for c in columns)
+
+    def _check_version(self, now):
+        # caller holds the lock
+        if not self.watch_paths or now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        version = artifact_version(self.watch_paths)
+        if version != self._version:
+            self._version = version
+            self._data.clear()
+            self.invalidations += 1
+
+    def get(self, key):
+        """Return the cached value or None on a miss."""
+        with self._lock:
+            now = self._clock()
+            self._check_version(now)
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def invalidate(self):
+        """clear() counted as an invalidation (the served model changed)."""
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,332 @@
+# src/prediction_grid.py
+"""
+Precomputed predictions for the web form's inputs.
+
+Requests from the form differ only in genre, language and four numbers, so
+the model can be evaluated once, after training, on a grid:
+    genres x original_language x budget x runtime x vote_average x vote_count
+(axes the preprocessor does not consume are left out). A request is then
+answered by an array lookup instead of transform + forest traversal:
+  - "exact":       only when every numeric input sits on a grid point; the stored value
+                   is the model's own prediction for that row, bit for bit
+  - "interpolate": multilinear interpolation between the surrounding grid points
+Anything else falls back to the model: values outside the grid's range,
+categories it does not hold, or any other consumed column (title, release
+date, ...) that differs from what build_raw_from_payload fills in by default.
+
+Numeric grid points are training quantiles rounded to two significant digits,
+so round form inputs (50000000, 120, 7.2, 1400) often hit them exactly.
+
+    python -m src.prediction_grid            # build from the current artifacts + accuracy report
+"""
+import os
+import json
+import time
+import argparse
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, asdict, field
+import numpy as np
+import pandas as pd
+from sklearn.metrics import r2_score
+from src.payload import build_raw_from_payload
+from src.schema import MOVIE_SCHEMA
+from src.utils import read_table, save_json, load_json, file_sha256
+from src.logger import get_logger
+from src.exception import CustomException
+
+logger = get_logger(__name__)
+
+GRID_MODES = ("exact", "interpolate")
+
+
+def consumed_columns(preprocessor):
+    """Raw columns a fitted ColumnTransformer actually reads (remainder='drop' columns excluded)."""
+    used = set()
+    for name, trans, cols in getattr(preprocessor, "transformers_", []):
+        if name == "remainder" or trans == "drop" or not isinstance(cols, list):
+            continue
+        used.update(cols)
+    return used
+
+
+def round_sig(values, digits):
+    """Round to `digits` significant digits via the decimal repr, so 7.1e6 is exactly float("7100000")."""
+    return np.array([float(f"{v:.{digits}g}") for v in np.asarray(values, dtype=np.float64)])
+
+
+@dataclass
+class PredictionGridConfig:
+    grid_dir: str
+    target_col: str = "revenue"
+    categorical_axes: tuple = ("genres", "original_language")
+    numeric_axes: tuple = ("budget", "runtime", "vote_average", "vote_count")
+    points_per_axis: int = 8
+    max_levels: int = 24         # most frequent training values kept per categorical axis
+    significant_digits: int = 2  # rounding of the numeric grid points
+    max_cells: int = 5_000_000
+    chunk_rows: int = 100_000
+    eval_rows: int = 2000        # test rows used for the accuracy report
+    schema: dict = field(default_factory=lambda: dict(MOVIE_SCHEMA))
+
+    @property
+    def report_path(self):
+        return os.path.join(self.grid_dir, "report.json")
+
+
+class PredictionGrid:
+    """
+    values[i_cat0, i_cat1, ..., j_num0, j_num1, ...] = model prediction for that combination;
+    `fixed` maps every other consumed column to the value the grid was built with.
+    """
+    def __init__(self, values, categorical, numeric, fixed, mode="interpolate", meta=None):
+        if mode not in GRID_MODES:
+            raise ValueError(f"Unknown grid mode '{mode}', expected one of {GRID_MODES}")
+        self.values = values
+        self.flat = values.reshape(-1)
+        self.categorical = categorical  # [(column, [levels])]
+        self.numeric = numeric          # [(column, [points])]
+        self.fixed = fixed              # {column: value}
+        self.mode = mode
+        self.meta = meta or {}
+        self._bound = None
+
+    def bind(self, columns):
+        """Precompute row positions and flat-index strides for rows in `columns` order."""
+        pos = {c: i for i, c in enumerate(columns)}
+        strides = np.cumprod((self.values.shape[1:] + (1,))[::-1])[::-1]
+        strides = [int(s) for s in strides]
+        k = len(self.categorical)
+        self._bound = {
+            "fixed": [(pos[c], v) for c, v in self.fixed.items() if c in pos],
+            "cat": [(pos[c], {v: i for i, v in enumerate(levels)}, s)
+                    for (c, levels), s in zip(self.categorical, strides[:k])],
+            "num": [(pos[c], points, s) for (c, points), s in zip(self.numeric, strides[k:])],
+        }
+        return self
+
+    def lookup(self, row):
+        """Grid answer for one raw row tuple (bound column order), or None to fall back to the model."""
+        bound = self._bound
+        for p, value in bound["fixed"]:
+            if row[p] != value:
+                return None
+        offset = 0
+        for p, index, stride in bound["cat"]:
+            i = index.get(row[p])
+            if i is None:
+                return None
+            offset += i * stride
+        if self.mode == "exact":
+            for p, points, stride in bound["num"]:
+                v = row[p]
+                j = bisect_left(points, v)
+                if j == len(points) or points[j] != v:
+                    return None
+                offset += j * stride
+            return float(self.flat[offset])
+        corners = [(offset, 1.0)]
+        for p, points, stride in bound["num"]:
+            v = row[p]
+            if not points[0] <= v <= points[-1]:
+                return None
+            j = min(bisect_right(points, v) - 1, len(points) - 2)
+            t = (v - points[j]) / (points[j + 1] - points[j])
+            lo, hi = j * stride, (j + 1) * stride
+            if t == 0.0:
+                corners = [(o + lo, w) for o, w in corners]
+            elif t == 1.0:
+                corners = [(o + hi, w) for o, w in corners]
+            else:
+                corners = [c for o, w in corners for c in ((o + lo, w * (1.0 - t)), (o + hi, w * t))]
+        flat = self.flat
+        if len(corners) == 1:
+            return float(flat[corners[0][0]])
+        return float(sum(w * flat[o] for o, w in corners))
+
+    def save(self, dir_path):
+        try:
+            os.makedirs(dir_path, exist_ok=True)
+            np.save(os.path.join(dir_path, "values.npy"), self.values)
+            save_json(os.path.join(dir_path, "meta.json"), {
+                **self.meta,
+                "categorical": [[c, levels] for c, levels in self.categorical],
+                "numeric": [[c, points] for c, points in self.numeric],
+                "fixed": self.fixed,
+                "shape": list(self.values.shape),
+            })
+        except Exception as e:
+            raise CustomException(f"Failed to save prediction grid to {dir_path}", e)
+
+    @classmethod
+    def load(cls, dir_path, mode="interpolate", mmap_mode=None):
+        try:
+            meta = load_json(os.path.join(dir_path, "meta.json"))
+            values = np.load(os.path.join(dir_path, "values.npy"), mmap_mode=mmap_mode)
+            return cls(values, [(c, levels) for c, levels in meta["categorical"]],
+                       [(c, points) for c, points in meta["numeric"]], meta["fixed"], mode=mode,
+                       meta={k: meta[k] for k in ("model_sha256", "preprocessor_sha256", "config") if k in meta})
+        except Exception as e:
+            raise CustomException(f"Failed to load prediction grid from {dir_path}", e)
+
+    def matches(self, model_path, preprocessor_path):
+        """True if the grid was built from exactly these model / preprocessor files."""
+        return (self.meta.get("model_sha256") == file_sha256(model_path)
+                and self.meta.get("preprocessor_sha256") == file_sha256(preprocessor_path))
+
+
+class PredictionGridBuilder:
+    def __init__(self, config: PredictionGridConfig, pipeline):
+        """pipeline: a modular-flow PredictPipeline; its grid (if any) is not used while building."""
+        self.config = config
+        self.pipeline = pipeline
+
+    def _axes(self, train_df, used):
+        cfg = self.config
+        categorical, numeric = [], []
+        for col in cfg.categorical_axes:
+            if col not in used:
+                continue
+            counts = train_df[col].dropna().astype(str).value_counts()
+            levels = counts.index[:cfg.max_levels].tolist()
+            default = build_raw_from_payload({})[col]
+            if default not in levels:
+                levels.append(default)
+            categorical.append((col, levels))
+        for col in cfg.numeric_axes:
+            if col not in used:
+                continue
+            quantiles = train_df[col].dropna().quantile(np.linspace(0, 1, cfg.points_per_axis)).to_numpy()
+            points = np.unique(round_sig(quantiles, cfg.significant_digits)).tolist()
+            if len(points) < 2:
+                raise ValueError(f"Column '{col}' has fewer than 2 distinct grid points")
+            numeric.append((col, points))
+        return categorical, numeric
+
+    def _predict_grid(self, categorical, numeric, fixed):
+        shape = tuple(len(levels) for _, levels in categorical) + tuple(len(p) for _, p in numeric)
+        n_cells = int(np.prod(shape))
+        if n_cells > self.config.max_cells:
+            raise ValueError(f"Grid of shape {shape} has {n_cells} cells, above max_cells={self.config.max_cells}")
+        axes = [(c, np.asarray(levels, dtype=object)) for c, levels in categorical]
+        axes += [(c, np.asarray(points, dtype=np.float64)) for c, points in numeric]
+        columns = self.pipeline.expected_columns
+        values = np.empty(n_cells, dtype=np.float64)
+        for start in range(0, n_cells, self.config.chunk_rows):
+            idx = np.unravel_index(np.arange(start, min(start + self.config.chunk_rows, n_cells)), shape)
+            n = len(idx[0])
+            data = {c: np.full(n, fixed[c], dtype=object if isinstance(fixed[c], str) else np.float64)
+                    for c in columns}
+            for (col, axis), i in zip(axes, idx):
+                data[col] = axis[i]
+            frame = pd.DataFrame(data)[columns].astype(dict(zip(columns, self.pipeline.column_dtypes)))
+            values[start:start + n] = self.pipeline.predict_frame(frame)
+        return values.reshape(shape), n_cells
+
+    def _evaluate(self, grid, test_df):
+        """Grid answers vs the live model on test rows reduced to the fields the web form sends."""
+        cfg = self.config
+        sample = test_df.sample(min(cfg.eval_rows, len(test_df)), random_state=0)
+        fields = [c for c in cfg.categorical_axes + cfg.numeric_axes if c in sample.columns]
+        y_true = sample[cfg.target_col].to_numpy(dtype=np.float64)
+        rows = []
+        for record in sample[fields].to_dict("records"):
+            raw = build_raw_from_payload({k: ("" if pd.isna(v) else v) for k, v in record.items()})
+            rows.append(tuple(raw[c] for c in self.pipeline.expected_columns))
+        t0 = time.perf_counter()
+        live = np.asarray([self.pipeline.predict_rows([row], use_grid=False)[0] for row in rows[:200]])
+        model_us = (time.perf_counter() - t0) / len(live) * 1e6
+        live = np.asarray(self.pipeline.predict_rows(rows, use_grid=False))
+        report = {"eval_rows": len(rows), "model_us_per_row": round(model_us, 1),
+                  "model_r2": round(r2_score(y_true, live), 4)}
+        for mode in GRID_MODES:
+            grid.mode = mode
+            t0 = time.perf_counter()
+            answers = [grid.lookup(row) for row in rows]
+            lookup_us = (time.perf_counter() - t0) / len(rows) * 1e6
+            hit = np.array([a is not None for a in answers])
+            entry = {"coverage": round(float(hit.mean()), 4), "lookup_us_per_row": round(lookup_us, 2)}
+            if hit.any():
+                got = np.array([a for a in answers if a is not None])
+                err = np.abs(got - live[hit])
+                rel = err / np.maximum(np.abs(live[hit]), 1.0)
+                # r2 against the actual target on the covered rows, next to the live model's on the same rows
+                entry.update({"r2": round(r2_score(y_true[hit], got), 4),
+                              "model_r2_same_rows": round(r2_score(y_true[hit], live[hit]), 4),
+                              "mae": round(float(err.mean()), 2), "max_abs_error": round(float(err.max()), 2),
+                              "rel_error_p50": round(float(np.percentile(rel, 50)), 5),
+                              "rel_error_p90": round(float(np.percentile(rel, 90)), 5),
+                              "rel_error_p99": round(float(np.percentile(rel, 99)), 5)})
+            report[mode] = entry
+        return report
+
+    def initiate_grid_build(self, train_path, test_path):
+        try:
+            cfg = self.config
+            pipeline = self.pipeline
+            if pipeline.flow != "modular":
+                raise ValueError("The prediction grid needs the modular preprocessor + model artifacts")
+            model_sha = file_sha256(pipeline.model_path)
+            preprocessor_sha = file_sha256(pipeline.preprocessor_path)
+            # JSON round trip so it compares equal to the copy stored in meta.json (tuples -> lists)
+            config_payload = json.loads(json.dumps({k: v for k, v in asdict(cfg).items()
+                                                    if k not in ("grid_dir", "schema")}))
+            config_payload["source_sha256"] = file_sha256(__file__)
+            meta_path = os.path.join(cfg.grid_dir, "meta.json")
+            if os.path.exists(meta_path) and os.path.exists(cfg.report_path):
+                meta = load_json(meta_path)
+                if (meta.get("model_sha256"), meta.get("preprocessor_sha256"), meta.get("config")) == \
+                        (model_sha, preprocessor_sha, config_payload):
+                    logger.info(f"Prediction grid at {cfg.grid_dir} is up to date")
+                    return load_json(cfg.report_path)
+
+            train_df = read_table(train_path, schema=cfg.schema)
+            used = consumed_columns(pipeline.preprocessor)
+            categorical, numeric = self._axes(train_df, used)
+            axis_cols = {c for c, _ in categorical} | {c for c, _ in numeric}
+            base = build_raw_from_payload({})
+            fixed = {c: base[c] for c in pipeline.expected_columns if c in used and c not in axis_cols}
+            # columns outside `used` only need some valid value to build the frame
+            fill = {c: base.get(c, "") for c in pipeline.expected_columns}
+            fill.update(fixed)
+
+            t0 = time.perf_counter()
+            values, n_cells = self._predict_grid(categorical, numeric, fill)
+            build_seconds = time.perf_counter() - t0
+            grid = PredictionGrid(values, categorical, numeric, fixed, meta={
+                "model_sha256": model_sha, "preprocessor_sha256": preprocessor_sha, "config": config_payload})
+            grid.save(cfg.grid_dir)
+            grid.bind(pipeline.expected_columns)
+
+            report = {"shape": list(values.shape), "cells": n_cells, "size_mb": round(values.nbytes / 1e6, 2),
+                      "build_seconds": round(build_seconds, 2),
+                      "axes": [c for c, _ in categorical] + [c for c, _ in numeric],
+                      "fixed_columns": sorted(fixed),
+                      **self._evaluate(grid, read_table(test_path, schema=cfg.schema))}
+            save_json(cfg.report_path, report)
+            logger.info(f"Prediction grid {values.shape} ({n_cells} cells) built in {build_seconds:.1f}s; "
+                        f"interpolation coverage {report['interpolate']['coverage']:.1%}, "
+                        f"p90 relative error {report['interpolate'].get('rel_error_p90')}")
+            return report
+        except Exception as e:
+            raise CustomException("Error building the prediction grid", e)
+
+
+def main(argv=None):
+    from src.predict_pipeline import PredictPipeline
+    base = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Build the prediction grid from the current artifacts.")
+    parser.add_argument("--artifacts-dir", default=os.path.join(base, "artifacts"))
+    parser.add_argument("--points-per-axis", type=int, default=PredictionGridConfig.points_per_axis)
+    parser.add_argument("--max-levels", type=int, default=PredictionGridConfig.max_levels)
+    args = parser.parse_args(argv)
+    pipeline = PredictPipeline(artifacts_dir=args.artifacts_dir)
+    report = PredictionGridBuilder(PredictionGridConfig(
+        grid_dir=os.path.join(args.artifacts_dir, "models", "prediction_grid"),
+        points_per_axis=args.points_per_axis, max_levels=args.max_levels
+    ), pipeline).initiate_grid_build(os.path.join(args.artifacts_dir, "data", "train.parquet"),
+                                     os.path.join(args.artifacts_dir, "data", "test.parquet"))
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# src/schema.py
+"""
+Explicit dtypes for the raw movie data. Applied when the raw CSV is first read
+and again on every intermediate read, so each stage sees the same types
+regardless of file format or pandas inference (e.g. an all-empty text column
+must not turn into float64, and text columns stay object rather than the
+pandas 3 string dtype that columnar readers return).
+"""
+
+NUMERIC_COLUMNS = ("id", "vote_average", "vote_count", "runtime", "budget", "revenue")
+TEXT_COLUMNS = ("title", "status", "release_date", "original_language", "original_title",
+                "overview", "genres", "production_companies", "production_countries")
+
+MOVIE_SCHEMA = {
+    **{col: "float64" for col in NUMERIC_COLUMNS},
+    **{col: "object" for col in TEXT_COLUMNS},
+}
+
+
+def apply_schema(df, schema=MOVIE_SCHEMA):
+    """Cast the columns present in both `df` and `schema` whose dtype differs; other columns are left alone."""
+    casts = {col: dtype for col, dtype in schema.items() if col in df.columns and str(df[col].dtype) != dtype}
+    return df.astype(casts) if casts else df
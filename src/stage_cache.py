@@ -0,0 +1,181 @@
+# src/stage_cache.py
+import os
+import json
+import shutil
+import hashlib
+import dataclasses
+import numpy as np
+from scipy import sparse
+from src.utils import file_sha256, save_json, load_json
+from src import metrics
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _config_payload(config):
+    if dataclasses.is_dataclass(config):
+        config = dataclasses.asdict(config)
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+def array_fingerprint(*arrays):
+    """sha256 over the raw buffers of dense/sparse arrays (and pandas Series); cheap next to re-hashing files."""
+    h = hashlib.sha256()
+    for a in arrays:
+        if sparse.issparse(a):
+            a = a.tocsr()
+            parts = (a.data, a.indices, a.indptr)
+            h.update(repr(("csr", a.shape, a.dtype.str)).encode())
+        else:
+            a = np.ascontiguousarray(np.asarray(a))
+            parts = (a,)
+            h.update(repr(("dense", a.shape, a.dtype.str)).encode())
+        for part in parts:
+            h.update(np.ascontiguousarray(part).data)
+    return h.hexdigest()
+
+
+def save_matrix(path_without_ext, X):
+    """Writes X as .npz (sparse) or .npy (dense); returns the file path."""
+    if sparse.issparse(X):
+        path = path_without_ext + ".npz"
+        sparse.save_npz(path, X, compressed=False)
+    else:
+        path = path_without_ext + ".npy"
+        np.save(path, np.asarray(X))
+    return path
+
+
+def load_matrix(path):
+    return sparse.load_npz(path) if path.endswith(".npz") else np.load(path, allow_pickle=False)
+
+
+class StageCache:
+    """
+    Content-addressed cache for training pipeline stages.
+
+    A stage key is the sha256 of the stage name, its config, the content of its
+    input files and the source of the modules that implement it, so editing
+    code, data or config all invalidate it. Stage results are stored as
+    blobs named by their own sha256 under `<cache_dir>/blobs`, and a manifest
+    per (stage, key) lists them:
+      - outputs: files the stage normally writes (model, preprocessor, CSV
+        splits); restored to their original paths on a hit
+      - blobs: cache-only results such as the transformed matrices, read
+        straight from the blob store
+    File hashes are memoised on (path, mtime, size) so chained stages do not
+    re-read the files an earlier stage just wrote or restored.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self._hash_memo = {}
+
+    def _stat_key(self, path):
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+    def file_hash(self, path):
+        stat_key = self._stat_key(path)
+        digest = self._hash_memo.get(stat_key)
+        if digest is None:
+            digest = file_sha256(path)
+            self._hash_memo[stat_key] = digest
+        return digest
+
+    def key(self, stage, files=(), config=None, sources=(), extra=None):
+        h = hashlib.sha256()
+        h.update(stage.encode())
+        h.update(_config_payload(config).encode())
+        h.update(_config_payload(extra).encode())
+        for path in files:
+            h.update(self.file_hash(path).encode())
+        for path in sources:
+            h.update(file_sha256(path).encode())
+        return h.hexdigest()
+
+    def _manifest_path(self, stage, key):
+        return os.path.join(self.cache_dir, stage, f"{key}.json")
+
+    def blob_path(self, blob):
+        return os.path.join(self.blob_dir, blob)
+
+    def _put_blob(self, path, move=False):
+        digest = self.file_hash(path)
+        blob = digest + os.path.splitext(path)[1]
+        target = self.blob_path(blob)
+        if not os.path.exists(target):
+            os.makedirs(self.blob_dir, exist_ok=True)
+            tmp = target + ".tmp"
+            if move:
+                shutil.move(path, tmp)
+            else:
+                shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+        elif move:
+            os.remove(path)
+        return blob
+
+    def _restore(self, blob, path):
+        src = self.blob_path(blob)
+        if os.path.exists(path) and self.file_hash(path) == blob.split(".")[0]:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, path)
+        self._hash_memo[self._stat_key(path)] = blob.split(".")[0]
+
+    def load(self, stage, key):
+        """Returns the manifest and restores its outputs on a hit, None on a miss or an incomplete entry."""
+        manifest_path = self._manifest_path(stage, key)
+        if not os.path.exists(manifest_path):
+            logger.info(f"[{stage}] cache miss ({key[:12]})")
+            metrics.inc("stage_cache_total", stage=stage, result="miss")
+            return None
+        manifest = load_json(manifest_path)
+        blobs = [f["blob"] for out in manifest["outputs"].values() for f in out["files"].values()]
+        blobs += list(manifest["blobs"].values())
+        if not all(os.path.exists(self.blob_path(b)) for b in blobs):
+            logger.warning(f"[{stage}] cache entry {key[:12]} has missing blobs; recomputing")
+            metrics.inc("stage_cache_total", stage=stage, result="miss")
+            return None
+        for out in manifest["outputs"].values():
+            if out["is_dir"]:
+                shutil.rmtree(out["path"], ignore_errors=True)
+            for rel, f in out["files"].items():
+                self._restore(f["blob"], os.path.join(out["path"], rel) if out["is_dir"] else out["path"])
+        logger.info(f"[{stage}] cache hit ({key[:12]}), skipping stage")
+        metrics.inc("stage_cache_total", stage=stage, result="hit")
+        return manifest
+
+    def store(self, stage, key, outputs=None, blobs=None, meta=None):
+        """
+        outputs: {name: file or directory path} copied into the cache.
+        blobs: {name: file path} moved into the cache (temporary files such as saved matrices).
+        """
+        manifest = {"stage": stage, "key": key, "outputs": {}, "blobs": {}, "meta": meta or {}}
+        for name, path in (outputs or {}).items():
+            if os.path.isdir(path):
+                files = {}
+                for root, _, names in os.walk(path):
+                    for fname in sorted(names):
+                        full = os.path.join(root, fname)
+                        files[os.path.relpath(full, path)] = {"blob": self._put_blob(full)}
+                manifest["outputs"][name] = {"path": path, "is_dir": True, "files": files}
+            else:
+                manifest["outputs"][name] = {"path": path, "is_dir": False,
+                                             "files": {"": {"blob": self._put_blob(path)}}}
+        for name, path in (blobs or {}).items():
+            manifest["blobs"][name] = self._put_blob(path, move=True)
+        save_json(self._manifest_path(stage, key), manifest)
+        return manifest
+
+    def blob_file(self, manifest, name):
+        return self.blob_path(manifest["blobs"][name])
+
+    def scratch_dir(self):
+        path = os.path.join(self.cache_dir, "tmp")
+        os.makedirs(path, exist_ok=True)
+        return path
@@ -1,40 +1,125 @@
 import os
+import sys
 from src.data_ingestion import DataIngestion, DataIngestionConfig
 from src.data_transformation import DataTransformation, DataTransformationConfig
 from src.model_trainer import ModelTrainer, ModelTrainerConfig
+from src.incremental_trainer import IncrementalTrainer, IncrementalTrainerConfig
+from src.stage_cache import StageCache
+from src.out_of_core import OutOfCoreTrainer, OutOfCoreConfig
+from src.prediction_grid import PredictionGridBuilder, PredictionGridConfig
+from src.forest_compaction import ForestCompactionConfig
+from src.artifact_store import ArtifactStore, ArtifactStoreConfig
+from src import metrics
 from src.logger import get_logger
 from src.exception import CustomException
 
 logger = get_logger(__name__)
 
-def run_training_pipeline():
+def run_training_pipeline(search: bool = False, incremental: bool = False, use_cache: bool = True,
+                          out_of_core: bool = False, memory_budget_mb: int = 1024, build_grid: bool = False,
+                          compact: bool = False, publish: bool = True):
     try:
         base = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        # the flat artifacts are the working copy; publishing snapshots them as the served version
+        store = ArtifactStore(ArtifactStoreConfig(root=os.path.join(base, "artifacts")))
         data_path = os.path.join(base, "data", "movie_revenue_prediction.csv")
-        train_path = os.path.join(base, "artifacts", "data", "train.csv")
-        test_path = os.path.join(base, "artifacts", "data", "test.csv")
+        train_path = os.path.join(base, "artifacts", "data", "train.parquet")
+        test_path = os.path.join(base, "artifacts", "data", "test.parquet")
         preprocessor_path = os.path.join(base, "artifacts", "transformer", "preprocessor.joblib")
         model_path = os.path.join(base, "artifacts", "models", "random_forest.joblib")
+        compiled_model_dir = os.path.join(base, "artifacts", "models", "random_forest_compiled")
+        incremental_config = IncrementalTrainerConfig(
+            raw_data_path=data_path,
+            preprocessor_path=preprocessor_path,
+            model_path=model_path,
+            state_dir=os.path.join(base, "artifacts", "incremental"),
+            compiled_model_dir=compiled_model_dir
+        )
+
+        if incremental:
+            # only the rows appended to the raw CSV since the last run are read and transformed
+            with metrics.timer("training_stage_seconds", stage="incremental"):
+                results = IncrementalTrainer(incremental_config).initiate_incremental_training()
+            if publish:
+                results["artifact_version"] = store.publish()
+            logger.info("Incremental pipeline complete!")
+            logger.info(metrics.format_summary("training_stage_seconds", "Training stage timings"))
+            print(results)
+            return
+
+        if out_of_core:
+            # chunked two-pass fit + memory-mapped training matrix for raw files larger than RAM
+            with metrics.timer("training_stage_seconds", stage="out_of_core"):
+                results = OutOfCoreTrainer(OutOfCoreConfig(
+                    raw_data_path=data_path,
+                    work_dir=os.path.join(base, "artifacts", "out_of_core"),
+                    preprocessor_path=preprocessor_path,
+                    model_path=model_path,
+                    compiled_model_dir=compiled_model_dir,
+                    memory_budget_mb=memory_budget_mb
+                )).initiate_out_of_core_training()
+            if publish:
+                results["artifact_version"] = store.publish()
+            logger.info("Out-of-core pipeline complete!")
+            logger.info(metrics.format_summary("training_stage_seconds", "Training stage timings"))
+            print(results)
+            return
+
+        # stages whose inputs, config and code are unchanged load their stored outputs instead of rerunning
+        cache = StageCache(os.path.join(base, "artifacts", "cache")) if use_cache else None
 
         ingestion = DataIngestion(DataIngestionConfig(
             raw_data_path=data_path,
             train_data_path=train_path,
             test_data_path=test_path
-        ))
-        train_csv, test_csv = ingestion.initiate_data_ingestion()
+        ), cache=cache)
+        with metrics.timer("training_stage_seconds", stage="ingestion"):
+            train_file, test_file = ingestion.initiate_data_ingestion()
 
         transformation = DataTransformation(
             DataTransformationConfig(preprocessor_path=preprocessor_path),
-            target_col="revenue"
+            target_col="revenue",
+            cache=cache
         )
-        X_train, y_train, X_test, y_test = transformation.initiate_data_transformation(train_csv, test_csv)
+        with metrics.timer("training_stage_seconds", stage="transformation"):
+            X_train, y_train, X_test, y_test = transformation.initiate_data_transformation(train_file, test_file)
 
-        trainer = ModelTrainer(ModelTrainerConfig(model_path=model_path))
-        results = trainer.initiate_model_trainer(X_train, y_train, X_test, y_test)
+        compaction = ForestCompactionConfig(
+            compact_model_dir=os.path.join(base, "artifacts", "models", "random_forest_compact")) if compact else None
+        trainer = ModelTrainer(ModelTrainerConfig(model_path=model_path, compiled_model_dir=compiled_model_dir,
+                                                 search=search, compaction=compaction), cache=cache)
+        with metrics.timer("training_stage_seconds", stage="model_trainer"):
+            results = trainer.initiate_model_trainer(X_train, y_train, X_test, y_test)
+        with metrics.timer("training_stage_seconds", stage="incremental_baseline"):
+            IncrementalTrainer(incremental_config).initiate_baseline(
+                X_train, y_train, X_test, y_test, rows_consumed=X_train.shape[0] + X_test.shape[0])
+        if build_grid:
+            from src.predict_pipeline import PredictPipeline
+            with metrics.timer("training_stage_seconds", stage="prediction_grid"):
+                results["prediction_grid"] = PredictionGridBuilder(
+                    PredictionGridConfig(grid_dir=os.path.join(base, "artifacts", "models", "prediction_grid")),
+                    PredictPipeline(artifacts_dir=os.path.join(base, "artifacts"))
+                ).initiate_grid_build(train_file, test_file)
+        if publish:
+            with metrics.timer("training_stage_seconds", stage="publish"):
+                results["artifact_version"] = store.publish()
         logger.info("Pipeline complete!")
+        logger.info(metrics.format_summary("training_stage_seconds", "Training stage timings"))
         print(results)
     except Exception as e:
         raise CustomException("Error in training pipeline", e)
 
 if __name__ == "__main__":
-    run_training_pipeline()
+    # --search: pick the estimator by successive-halving model search
+    # --incremental: grow the existing forest on rows appended since the last run
+    # --no-cache: rerun every stage even when its inputs are unchanged
+    # --out-of-core: stream the raw CSV and train from a memory-mapped matrix
+    #   (python -m src.out_of_core --memory-budget-mb N for a custom budget)
+    # --grid: precompute the prediction grid served with PREDICTION_GRID_MODE
+    # --compact: also write the compacted forest served with MODEL_BACKEND=compact
+    #   (python -m src.forest_compaction --tolerance X to recompact with other settings)
+    # --no-publish: leave the served artifact version (artifacts/CURRENT) unchanged
+    run_training_pipeline(search="--search" in sys.argv[1:], incremental="--incremental" in sys.argv[1:],
+                          use_cache="--no-cache" not in sys.argv[1:], out_of_core="--out-of-core" in sys.argv[1:],
+                          build_grid="--grid" in sys.argv[1:], compact="--compact" in sys.argv[1:],
+                          publish="--no-publish" not in sys.argv[1:])
@@ -1,23 +1,190 @@
 import os
+import json
+import hashlib
 import joblib
 import pandas as pd
-from src.exception import CustomException
+from scipy import sparse
+from src.schema import apply_schema
+from src.exception import CustomException, ErrorCode
 
-def save_object(file_path, obj):
+def _tmp_path(file_path):
+    # same directory, so os.replace is a rename on one filesystem; readers see the old or the new file
+    head, tail = os.path.split(file_path)
+    return os.path.join(head, f".{tail}.tmp-{os.getpid()}")
+
+def save_object(file_path, obj, compress=0):
+    """Uncompressed by default: only uncompressed joblib files can be loaded with mmap_mode."""
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = _tmp_path(file_path)
+        joblib.dump(obj, tmp_path, compress=compress)
+        os.replace(tmp_path, file_path)
+    except Exception as e:
+        raise CustomException(f"Failed to save object to {file_path}", e, code=ErrorCode.ARTIFACT)
+
+def load_object(file_path, mmap_mode=None):
+    """mmap_mode="r" maps the numpy arrays inside the pickle read-only instead of copying them."""
+    try:
+        return joblib.load(file_path, mmap_mode=mmap_mode)
+    except Exception as e:
+        raise CustomException(f"Failed to load object from {file_path}", e, code=ErrorCode.ARTIFACT)
+
+def save_json(file_path, obj):
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        joblib.dump(obj, file_path)
+        tmp_path = _tmp_path(file_path)
+        with open(tmp_path, "w") as f:
+            json.dump(obj, f, indent=2)
+        os.replace(tmp_path, file_path)
     except Exception as e:
-        raise CustomException(f"Failed to save object to {file_path}", e)
+        raise CustomException(f"Failed to save JSON to {file_path}", e)
 
-def load_object(file_path):
+def load_json(file_path):
     try:
-        return joblib.load(file_path)
+        with open(file_path) as f:
+            return json.load(f)
     except Exception as e:
-        raise CustomException(f"Failed to load object from {file_path}", e)
+        raise CustomException(f"Failed to load JSON from {file_path}", e)
+
+def file_sha256(file_path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
 
 def read_csv(file_path):
     try:
         return pd.read_csv(file_path)
     except Exception as e:
-        raise CustomException(f"Failed to read CSV: {file_path}", e)
+        raise CustomException(f"Failed to read CSV: {file_path}", e, code=ErrorCode.DATA)
+
+TABLE_FORMATS = {".parquet": "parquet", ".feather": "feather", ".csv": "csv"}
+
+def table_format(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in TABLE_FORMATS:
+        raise ValueError(f"Unsupported table format '{ext}', expected one of {sorted(TABLE_FORMATS)}")
+    return TABLE_FORMATS[ext]
+
+def write_table(df, file_path):
+    """Write a DataFrame as .parquet / .feather (typed, columnar; needs pyarrow) or .csv, by extension."""
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        fmt = table_format(file_path)
+        if fmt == "parquet":
+            df.to_parquet(file_path, index=False)
+        elif fmt == "feather":
+            df.reset_index(drop=True).to_feather(file_path)
+        else:
+            df.to_csv(file_path, index=False)
+    except Exception as e:
+        raise CustomException(f"Failed to write table to {file_path}", e)
+
+def read_table(file_path, schema=None):
+    """Read a table written by write_table; `schema` ({column: dtype}) is enforced for every format."""
+    try:
+        fmt = table_format(file_path)
+        if fmt == "parquet":
+            df = pd.read_parquet(file_path)
+        elif fmt == "feather":
+            df = pd.read_feather(file_path)
+        else:
+            df = pd.read_csv(file_path, dtype=schema)
+        return apply_schema(df, schema) if schema else df
+    except Exception as e:
+        raise CustomException(f"Failed to read table: {file_path}", e, code=ErrorCode.DATA)
+
+def to_csr(X):
+    """Return sparse matrices in CSR layout (row slicing/predict friendly); dense input is returned as-is."""
+    if sparse.issparse(X) and X.format != "csr":
+        return X.tocsr()
+    return X
+
+def read_csv_chunks(file_path, chunksize, dtype=None):
+    """Iterator of DataFrames of at most `chunksize` rows."""
+    try:
+        return pd.read_csv(file_path, chunksize=chunksize, dtype=dtype)
+    except Exception as e:
+        raise CustomException(f"Failed to read CSV: {file_path}", e, code=ErrorCode.DATA)
+
+def csv_record_ranges(file_path, shard_bytes, block_size=1 << 20):
+    """
+    Byte ranges (start, end) that split a CSV into runs of whole records of about
+    `shard_bytes` each; the first range is the header line. A newline ends a
+    record only outside quotes (an even number of '"' before it), so quoted
+    fields spanning lines stay in one range. Only scans bytes, nothing is parsed.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            offset = start = target = 0
+            in_quotes = 0
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                scanned = 0
+                pos = max(target - offset, 0)
+                while pos < len(block):
+                    newline = block.find(b"\n", pos)
+                    if newline < 0:
+                        break
+                    in_quotes ^= block.count(b'"', scanned, newline) & 1
+                    scanned = newline
+                    if in_quotes:
+                        pos = newline + 1
+                        continue
+                    end = offset + newline + 1
+                    yield start, end
+                    start = end
+                    target = end + shard_bytes
+                    pos = target - offset
+                in_quotes ^= block.count(b'"', scanned) & 1
+                offset += len(block)
+            if start < offset:
+                yield start, offset
+    except Exception as e:
+        raise CustomException(f"Failed to split CSV: {file_path}", e, code=ErrorCode.DATA)
+
+class ChunkWriter:
+    """
+    Appends DataFrame chunks to a .csv or .parquet file as they arrive, so
+    large outputs never have to be held in memory. Use as a context manager.
+    Parquet needs pyarrow.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.format = "parquet" if file_path.endswith(".parquet") else "csv"
+        self._parquet_writer = None
+        self._wrote_header = False
+        dirname = os.path.dirname(file_path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+    def write(self, df):
+        try:
+            if self.format == "csv":
+                df.to_csv(self.file_path, mode="a" if self._wrote_header else "w",
+                          header=not self._wrote_header, index=False)
+                self._wrote_header = True
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if self._parquet_writer is None:
+                    self._parquet_writer = pq.ParquetWriter(self.file_path, table.schema)
+                self._parquet_writer.write_table(table)
+        except Exception as e:
+            raise CustomException(f"Failed to write chunk to {self.file_path}", e)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
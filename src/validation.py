@@ -0,0 +1,97 @@
+# src/validation.py
+"""
+Row-level validation for batch scoring.
+
+Scoring paths that take many rows (CSV files, DataFrames) check the numeric
+columns up front instead of letting one bad cell fail the whole transform:
+unparseable or non-finite values are recorded in a ValidationReport, their
+rows are skipped (prediction NaN) and the rest of the batch is scored in one
+call. Missing values are not errors; the preprocessor imputes them.
+"""
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from src.utils import save_json
+
+NOT_A_NUMBER = "not_a_number"
+NON_FINITE = "non_finite"
+
+
+@dataclass
+class ValidationReport:
+    """Counts per column and per code, plus the first `max_examples` failures (row, column, value, code)."""
+    max_examples: int = 20
+    n_rows: int = 0
+    n_invalid: int = 0
+    by_column: dict = field(default_factory=dict)
+    by_code: dict = field(default_factory=dict)
+    examples: list = field(default_factory=list)
+
+    @property
+    def n_valid(self):
+        return self.n_rows - self.n_invalid
+
+    def add(self, column, code, rows, values):
+        self.by_column[column] = self.by_column.get(column, 0) + len(rows)
+        self.by_code[code] = self.by_code.get(code, 0) + len(rows)
+        room = self.max_examples - len(self.examples)
+        for row, value in zip(rows[:room], values[:room]):
+            self.examples.append({"row": int(row), "column": column, "value": str(value), "code": code})
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        self.n_invalid += other.n_invalid
+        for column, n in other.by_column.items():
+            self.by_column[column] = self.by_column.get(column, 0) + n
+        for code, n in other.by_code.items():
+            self.by_code[code] = self.by_code.get(code, 0) + n
+        self.examples.extend(other.examples[:max(self.max_examples - len(self.examples), 0)])
+        return self
+
+    def to_dict(self):
+        return {"n_rows": self.n_rows, "n_valid": self.n_valid, "n_invalid": self.n_invalid,
+                "by_column": self.by_column, "by_code": self.by_code, "examples": self.examples}
+
+    def summary(self):
+        if not self.n_invalid:
+            return f"{self.n_rows} rows, all valid"
+        return f"{self.n_rows} rows, {self.n_invalid} skipped as invalid {self.by_column}"
+
+    def save(self, path):
+        save_json(path, self.to_dict())
+
+
+def validate_frame(df, numeric_columns, report, row_offset=0):
+    """
+    Returns (frame with numeric_columns as float64, boolean mask of valid rows) and
+    records every rejected cell in `report`. Row numbers in the report are
+    positional, shifted by row_offset (the rows of earlier chunks).
+    """
+    invalid = np.zeros(len(df), dtype=bool)
+    converted = {}
+    for column in numeric_columns:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            parse_failed = np.zeros(len(df), dtype=bool)
+        else:
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            parse_failed = np.isnan(numbers) & values.notna().to_numpy()
+            if parse_failed.any():
+                # blank strings count as missing, like an empty CSV field
+                blank = values.iloc[np.flatnonzero(parse_failed)].astype(str).str.strip() == ""
+                parse_failed[np.flatnonzero(parse_failed)[blank.to_numpy()]] = False
+            converted[column] = numbers
+        non_finite = np.isinf(numbers)
+        for code, mask in ((NOT_A_NUMBER, parse_failed), (NON_FINITE, non_finite)):
+            if mask.any():
+                rows = np.flatnonzero(mask)
+                report.add(column, code, (rows + row_offset).tolist(), values.iloc[rows].tolist())
+                invalid |= mask
+    report.n_rows += len(df)
+    report.n_invalid += int(invalid.sum())
+    if converted:
+        df = df.assign(**converted)
+    return df, ~invalid
@@ -0,0 +1,211 @@
+# src/warmup.py
+"""
+Deferred loading of the inference pipeline for the serving processes.
+
+Importing app.py / asgi_app.py no longer imports pandas / sklearn or reads
+the artifacts; PipelineLoader does both the first time the pipeline is needed
+(or ahead of traffic on a background thread) and then runs one throwaway
+prediction so the first real request does not pay for lazy imports and
+first-call setup inside pandas / sklearn.
+
+    loader = PipelineLoader(lambda: PredictPipeline(...), warmup_payload={})
+    loader.start()            # background warm-up
+    loader.get()              # blocks until loaded; raises if loading failed
+    loader.status()           # for readiness probes
+
+With an ArtifactStore (src/artifact_store.py) the factory is called with the
+directory of the current version, and a watcher thread polls the store's
+CURRENT pointer every ARTIFACT_WATCH_SECONDS (default 10, 0 = off). A new
+version is loaded and warmed on that thread while requests keep using the old
+pipeline, then swapped in with one reference assignment. Requests that already
+called get() finish on the pipeline they got. If the new version fails to
+load, the old one keeps serving.
+
+Modes (WARMUP_MODE):
+    background  (default) start loading at import on a daemon thread; requests wait for it.
+                A fork (gunicorn --preload) waits for the load to finish, so workers
+                share the loaded artifacts copy-on-write
+    eager       load synchronously at import (the old behaviour)
+    lazy        load on the first request
+"""
+import concurrent.futures.thread  # noqa: F401  (see _before_fork)
+import os
+import threading
+import time
+from src import metrics
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+WARMUP_MODES = ("background", "eager", "lazy")
+
+
+class PipelineLoader:
+    def __init__(self, factory, warmup_payload=None, store=None, watch_interval=0):
+        """
+        factory() builds the pipeline, factory(artifacts_dir) when a store is given;
+        warmup_payload, if given, is scored once after loading.
+        """
+        self.factory = factory
+        self.warmup_payload = warmup_payload
+        self.store = store
+        self.watch_interval = watch_interval
+        self.version = None
+        self._pipeline = None
+        self._error = None
+        self._thread = None
+        self._watcher = None
+        self._failed_version = None
+        self._swap_callbacks = []
+        self._lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self.timings = {}
+        self.started_at = time.time()
+        os.register_at_fork(before=self._before_fork, after_in_parent=self._after_fork_parent,
+                            after_in_child=self._after_fork)
+
+    def _before_fork(self):
+        # forking while the warm-up thread is mid-import leaves the child waiting forever on module
+        # import locks held by a thread that does not exist there; with gunicorn --preload this
+        # also means every worker inherits the loaded pipeline instead of loading its own.
+        # Fork hooks registered by modules the thread imports meanwhile miss their `before` call
+        # but still get `after_in_parent`; concurrent.futures.thread (pulled in by joblib) is
+        # imported up front so its lock is not released unacquired.
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        # the same goes for a version swap in progress; held until after the fork
+        self._swap_lock.acquire()
+
+    def _after_fork_parent(self):
+        self._swap_lock.release()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        if self._pipeline is None and self._thread is not None:
+            self._thread = None
+            self.start()
+        if self._watcher is not None:
+            self._watcher = None
+            self.watch()
+
+    def _build(self, version):
+        t0 = time.perf_counter()
+        pipeline = self.factory(self.store.path(version)) if self.store is not None else self.factory()
+        t1 = time.perf_counter()
+        if self.warmup_payload is not None:
+            from src.payload import build_raw_from_payload
+            raw = build_raw_from_payload(self.warmup_payload)
+            pipeline.predict_rows([tuple(raw.get(c, "") for c in pipeline.expected_columns)])
+        t2 = time.perf_counter()
+        timings = {"load_seconds": round(t1 - t0, 4), "warmup_seconds": round(t2 - t1, 4)}
+        logger.info(f"Inference pipeline{f' {version}' if version else ''} ready in {t2 - t0:.2f}s "
+                    f"(load {t1 - t0:.2f}s, warm-up {t2 - t1:.2f}s)")
+        return pipeline, timings
+
+    def _load(self):
+        with self._lock:
+            if self._pipeline is not None:
+                return self._pipeline
+            try:
+                version = self.store.current() if self.store is not None else None
+                pipeline, self.timings = self._build(version)
+                self._error = None
+                self.version = version
+                self._pipeline = pipeline
+            except Exception as e:
+                self._error = e
+                logger.exception("Failed to load the inference pipeline")
+                raise
+            return pipeline
+
+    def start(self):
+        """Load on a daemon thread; get() callers block on the same lock until it finishes."""
+        if self._pipeline is None and self._thread is None:
+            self._thread = threading.Thread(target=self._load_quietly, name="pipeline-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _load_quietly(self):
+        try:
+            self._load()
+        except Exception:
+            pass  # recorded in self._error and logged; get() retries
+
+    def get(self):
+        """The pipeline to serve with; call it once per request so the whole request sees one version."""
+        pipeline = self._pipeline
+        return pipeline if pipeline is not None else self._load()
+
+    def on_swap(self, callback):
+        """callback() runs after every version swap (e.g. to drop cached predictions)."""
+        self._swap_callbacks.append(callback)
+
+    def watch(self):
+        """Poll the store for a new current version on a daemon thread (no-op without a store or interval)."""
+        if self.store is not None and self.watch_interval > 0 and self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch_loop, name="artifact-watcher", daemon=True)
+            self._watcher.start()
+        return self
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.watch_interval)
+            try:
+                self.check_for_update()
+            except Exception:
+                logger.exception("Artifact watcher check failed")
+
+    def check_for_update(self):
+        """Load, warm and swap in the store's current version if it differs from the one served."""
+        if self._pipeline is None:
+            return False  # the first load reads CURRENT itself
+        version = self.store.current()
+        if version == self.version or version == self._failed_version:
+            return False
+        with self._swap_lock:
+            logger.info(f"Artifact version {self.version} -> {version}: loading in the background")
+            try:
+                pipeline, timings = self._build(version)
+            except Exception:
+                # remembered so a broken version is not reloaded every poll; publishing another clears it
+                self._failed_version = version
+                metrics.inc("model_swaps_total", result="failed")
+                logger.exception(f"Loading artifact version {version} failed; still serving {self.version}")
+                return False
+            # in-flight requests hold the old pipeline and finish on it
+            self._pipeline, self.version, self.timings = pipeline, version, timings
+            self._failed_version = None
+        metrics.inc("model_swaps_total", result="ok")
+        for callback in self._swap_callbacks:
+            callback()
+        return True
+
+    @property
+    def ready(self):
+        return self._pipeline is not None
+
+    def status(self):
+        state = "ready" if self.ready else ("failed" if self._error is not None else "loading")
+        status = {"status": state, "uptime_seconds": round(time.time() - self.started_at, 3), **self.timings}
+        if self.store is not None:
+            status["version"] = self.version
+        if self._error is not None and not self.ready:
+            status["error"] = str(self._error).splitlines()[0]
+        return status
+
+
+def init_loader(factory, mode=None, warmup_payload=None, store=None, watch_interval=None):
+    """PipelineLoader started according to WARMUP_MODE and watching `store` (see module docstring)."""
+    mode = mode or os.environ.get("WARMUP_MODE", "background")
+    if mode not in WARMUP_MODES:
+        raise ValueError(f"Unknown WARMUP_MODE '{mode}', expected one of {WARMUP_MODES}")
+    if watch_interval is None:
+        watch_interval = float(os.environ.get("ARTIFACT_WATCH_SECONDS", 10))
+    loader = PipelineLoader(factory, warmup_payload=warmup_payload, store=store, watch_interval=watch_interval)
+    if mode == "eager":
+        loader.get()
+    elif mode == "background":
+        loader.start()
+    return loader.watch()